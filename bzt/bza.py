@@ -3,6 +3,7 @@ The idea for this module is to keep it separate from bzt codebase as much as pos
 it may become separate library in the future. Things like imports and logging should be minimal.
 """
 import base64
+import gzip
 import json
 import logging
 import time
@@ -636,19 +637,26 @@ class Session(BZAObject):
         self._request(url, data)
 
     @send_with_retry
-    def send_kpi_data(self, data, is_check_response=True, submit_target=None):
+    def send_kpi_data(self, data, is_check_response=True, submit_target=None, compress=False):
         """
         Sends online data
 
         :type submit_target: str
         :param is_check_response:
         :type data: str
+        :param compress: send body gzipped
         """
         submit_target = self.kpi_target if submit_target is None else submit_target
         url = self.data_address + "/submit.php?session_id=%s&signature=%s&test_id=%s&user_id=%s"
         url %= self['id'], self.data_signature, self['testId'], self['userId']
         url += "&pq=0&target=%s&update=1" % submit_target
         hdr = {"Content-Type": "application/json"}
+        if compress:
+            size = len(data)
+            data = gzip.compress(data.encode("utf-8"))
+            hdr["Content-Encoding"] = "gzip"
+            self.log.debug("KPI data compressed from %s to %s bytes", size, len(data))
+
         response = self._request(url, data, headers=hdr)
 
         if response and 'response_code' in response and response['response_code'] != 200:
@@ -179,6 +179,7 @@ class CLI(object):
                 shutil.copy(os.path.join(RESOURCES_DIR, 'base-bzt-rc.yml'), bzt_rc)
 
             configs.insert(0, bzt_rc)
+            self.engine.base_configs_cache = os.path.expanduser(os.path.join('~', ".bzt", "base-configs-cache.json"))
 
         self.log.info("Starting with configs: %s", configs)
         merged_config = self.engine.configure(configs, not self.options.no_system_configs)
@@ -143,24 +143,33 @@ class Configuration(BetterDict):
         self.tab_replacement_spaces = 0
         self.warn_on_tab_replacement = True
 
-    def load(self, config_files, callback=None):
+    def load(self, config_files, callback=None, parsed=None):
         """
         Load and merge JSON/YAML files into current dict
 
         :type callback: callable
         :type config_files: list[str]
+        :param parsed: documents of already parsed files, file name -> list of documents.
+                       Documents of files that are read get added there.
+        :type parsed: dict
         """
         self.log.debug("Configs: %s", config_files)
         for config_file in config_files:
             try:
-                configs = []
-                with codecs.open(config_file, 'r', encoding='utf-8') as fds:
-                    if self.tab_replacement_spaces:
-                        contents = self._replace_tabs(fds.readlines(), config_file)
-                    else:
-                        contents = fds.read()
-
-                    self._read_yaml_or_json(config_file, configs, contents)
+                if parsed is not None and config_file in parsed:
+                    configs = copy.deepcopy(parsed[config_file])
+                else:
+                    configs = []
+                    with codecs.open(config_file, 'r', encoding='utf-8') as fds:
+                        if self.tab_replacement_spaces:
+                            contents = self._replace_tabs(fds.readlines(), config_file)
+                        else:
+                            contents = fds.read()
+
+                        self._read_yaml_or_json(config_file, configs, contents)
+
+                    if parsed is not None:
+                        parsed[config_file] = copy.deepcopy(configs)
 
                 for config in configs:
                     self.merge(config)
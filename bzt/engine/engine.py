@@ -28,15 +28,15 @@ import threading
 import time
 import traceback
 import uuid
-from distutils.version import LooseVersion
+from concurrent.futures import ThreadPoolExecutor
 from urllib import parse
 
 from bzt import ManualShutdown, get_configs_dir, TaurusConfigError, TaurusInternalException
 from bzt.utils import reraise, load_class, BetterDict, ensure_is_dict, dehumanize_time, is_windows, is_linux
 from bzt.utils import shell_exec, get_full_path, ExceptionalDownloader, get_uniq_name, HTTPClient, Environment
-from bzt.utils import NETWORK_PROBLEMS
+from bzt.utils import NETWORK_PROBLEMS, ChangesWatcher, ToolProbeCache, BaseConfigsCache, LooseVersion
 from .dicts import Configuration
-from .modules import Provisioning, Reporter, Service, Aggregator, EngineModule
+from .modules import Provisioning, Reporter, Service, Aggregator, EngineModule, ScenarioExecutor
 from .names import EXEC, TAURUS_ARTIFACTS_DIR, SETTINGS
 from .templates import Singletone
 from ..environment_helpers import expand_variable_with_os, custom_expandvars, expand_envs_with_os
@@ -64,6 +64,7 @@ class Engine(object):
         self.file_search_paths = []
         self.services = []
         self.__artifacts = []
+        self.__artifacts_lock = threading.RLock()
         self.reporters = []
         self.artifacts_dir = None
         self.log = parent_logger.getChild(self.__class__.__name__)
@@ -79,6 +80,15 @@ class Engine(object):
         self.aggregator.engine = self
         self.interrupted = False
         self.check_interval = 1
+        self.wakeup_on_data = False
+        self.wakeup_interval = 0.1
+        self._watcher = ChangesWatcher()
+        self.tool_probes = None
+        self.base_configs_cache = None  # file to keep discovered and parsed base configs between runs
+        self.package_inventories = {}  # pip command -> PackageInventory, shared by pip installers
+        self.prepare_workers = 1  # modules with independent prepare are prepared in parallel if more than one
+        self.prepare_times = []
+        self.background_workers = []  # network-bound tasks of modules, see BackgroundWorker
         self.stopping_reason = None
         self.engine_loop_utilization = 0
         self.prepared = []
@@ -211,8 +221,18 @@ class Engine(object):
         """
         self.log.info("Preparing...")
         self.unify_config()
-        interval = self.config.get(SETTINGS).get("check-interval", self.check_interval)
-        self.check_interval = dehumanize_time(interval)
+        settings = self.config.get(SETTINGS)
+        self.check_interval = dehumanize_time(settings.get("check-interval", self.check_interval))
+        self.wakeup_on_data = settings.get("wakeup-on-data", self.wakeup_on_data)
+        self.wakeup_interval = dehumanize_time(settings.get("wakeup-interval", self.wakeup_interval))
+        self.prepare_workers = int(settings.get("prepare-workers", self.prepare_workers))
+
+        if settings.get("tool-probe-cache", False):
+            probes_file = get_full_path(settings.get("tool-probe-cache-file", "~/.bzt/tool-probes.json"))
+            self.tool_probes = ToolProbeCache(probes_file, self.log)
+            if settings.get("tool-probe-cache-reset", False):
+                self.log.info("Dropping saved results of tool checks: %s", probes_file)
+                self.tool_probes.invalidate()
 
         try:
             self.__prepare_aggregator()
@@ -225,6 +245,63 @@ class Engine(object):
             self.stopping_reason = exc
             raise
 
+        finally:
+            self.__save_prepare_times()
+
+    def prepare_modules(self, modules, prepared=None):
+        """
+        Prepare modules in given order. Consecutive modules that declare their preparation independent
+        are prepared on thread pool if more than one prepare worker is configured, any other module
+        waits for preceding ones and is prepared alone.
+
+        :type modules: list[EngineModule]
+        :param prepared: list to add modules to right before they start preparing
+        :type prepared: list
+        """
+        batch = []
+        for module in modules:
+            if self.prepare_workers > 1 and module.is_prepare_independent():
+                batch.append(module)
+                continue
+
+            self.__prepare_batch(batch, prepared)
+            batch = []
+            self.__prepare_batch([module], prepared)
+
+        self.__prepare_batch(batch, prepared)
+
+    def __prepare_batch(self, batch, prepared):
+        if prepared is not None:
+            prepared.extend(batch)
+
+        if len(batch) == 1:
+            self.__prepare_module(batch[0])
+        elif batch:
+            self.log.debug("Preparing in parallel: %s", batch)
+            workers = min(self.prepare_workers, len(batch))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prepare") as pool:
+                futures = [pool.submit(self.__prepare_module, module) for module in batch]
+
+            for future in futures:
+                future.result()  # raise the first failure in order of modules
+
+    def __prepare_module(self, module):
+        name = str(module) if isinstance(module, ScenarioExecutor) else module.__class__.__name__
+        start = time.time()
+        try:
+            module.prepare()
+        finally:
+            duration = time.time() - start
+            self.log.debug("Prepare of %s took %.3fs", name, duration)
+            self.prepare_times.append({"module": name, "start": start, "duration": round(duration, 3)})
+
+    def __save_prepare_times(self):
+        if not self.prepare_times or not self.artifacts_dir:
+            return
+
+        with open(self.create_artifact("prepare-times", ".json"), "w") as fds:
+            json.dump(self.prepare_times, fds, indent=1)
+
     def _startup(self):
         modules = self.services + [self.aggregator] + self.reporters + [self.provisioning]  # order matters
         for module in modules:
@@ -302,12 +379,48 @@ class Engine(object):
             self.engine_loop_utilization = diff / self.check_interval
             self.log.debug("Iteration took %.3f sec, sleeping for %.3f sec...", diff, delay)
             if delay > 0:
-                time.sleep(delay)
+                if self.wakeup_on_data:
+                    self._sleep_until_data(delay, self.check_interval / 2.0 - diff)
+                else:
+                    time.sleep(delay)
             prev = time.time()
             if self.interrupted:
                 raise ManualShutdown()
         self.config.dump()
 
+    def _get_watched_processes(self):
+        processes = []
+        for executor in getattr(self.provisioning, "executors", []):
+            process = getattr(executor, "process", None)
+            if process is not None and hasattr(process, "poll"):
+                processes.append(process)
+
+        return processes
+
+    def _sleep_until_data(self, timeout, min_sleep=0):
+        """
+        Sleep until results files grow, executor process exits, timeout expires or engine is interrupted.
+        New data doesn't wake engine up before min_sleep is passed, so checks don't run back-to-back.
+        """
+        start = time.time()
+        deadline = start + timeout
+        earliest = start + min_sleep
+        filenames = [filename for filename in self.aggregator.get_data_files() if filename]
+        while not self.interrupted:
+            now = time.time()
+            remaining = deadline - now
+            if remaining <= 0:
+                break
+
+            if now < earliest:
+                time.sleep(min(self.wakeup_interval, earliest - now, remaining))
+                continue
+
+            time.sleep(min(self.wakeup_interval, remaining))
+            if self._watcher.changed(filenames, self._get_watched_processes()):
+                self.log.debug("New data arrived, waking up")
+                break
+
     def _shutdown(self):
         """
         Shutdown modules
@@ -378,8 +491,9 @@ class Engine(object):
         if not self.artifacts_dir:
             raise TaurusInternalException("Cannot create artifact: no artifacts_dir set up")
 
-        filename = get_uniq_name(self.artifacts_dir, prefix, suffix, self.__artifacts)
-        self.__artifacts.append(filename)
+        with self.__artifacts_lock:
+            filename = get_uniq_name(self.artifacts_dir, prefix, suffix, self.__artifacts)
+            self.__artifacts.append(filename)
         self.log.debug("New artifact filename: %s", filename)
         return filename
 
@@ -399,7 +513,8 @@ class Engine(object):
 
         new_filename = os.path.basename(filename) if target_filename is None else target_filename
         new_name = os.path.join(self.artifacts_dir, new_filename)
-        self.__artifacts.append(new_name)
+        with self.__artifacts_lock:
+            self.__artifacts.append(new_name)
 
         if get_full_path(filename) == get_full_path(new_name):
             self.log.debug("No need to copy %s", filename)
@@ -543,22 +658,69 @@ class Engine(object):
         return filename
 
     def _load_base_configs(self):
+        cache = BaseConfigsCache(self.base_configs_cache, self.log) if self.base_configs_cache else None
         configs = []
         try:
             sys.path.insert(0, os.path.curdir)  # necessary for development mode (running bzt from curdir)
             configs.extend(self._scan_system_configs())
-            configs.extend(self._scan_package_configs())
+            if cache:
+                configs.extend(self.__get_package_configs(cache))
+            else:
+                configs.extend(self._scan_package_configs())
         finally:
             sys.path.pop(0)
         configs.sort(key=os.path.basename)
         self.log.debug("Base configs list: %s", configs)
         if not configs:
             self.log.warning("No base configs were discovered")
-        self.config.load(configs)
 
-    def _scan_package_configs(self):
+        if cache:
+            tabs = self.config.tab_replacement_spaces
+            parsed = cache.get_parsed(configs, tabs)
+            self.config.load(configs, parsed=parsed)
+            cache.put_parsed(parsed, tabs)
+            cache.save()
+        else:
+            self.config.load(configs)
+
+    def __get_package_configs(self, cache):
+        """
+        Current dir changes with every run, so packages are always looked for in leading
+        sys.path entries pointing to it. Results of scanning the rest are taken from cache.
+
+        :type cache: BaseConfigsCache
+        """
+        cwd = os.getcwd()
+        split = 0
+        while split < len(sys.path) and os.path.abspath(sys.path[split] or os.path.curdir) == cwd:
+            split += 1
+        local_paths, search_paths = sys.path[:split], sys.path[split:]
+
+        configs = self._scan_package_configs(path=local_paths)
+        local_modules = set(modname for _, modname, _ in pkgutil.iter_modules(path=local_paths))
+
+        indexes = cache.get_indexes(search_paths)
+        if indexes is None:
+            indexes = {}
+            self._scan_package_configs(path=search_paths, indexes=indexes)
+            cache.put_indexes(search_paths, indexes)
+        else:
+            self.log.debug("Using cached list of package configs")
+
+        for index_path, index_configs in indexes.items():
+            if os.path.basename(os.path.dirname(index_path)) not in local_modules:  # shadowed by local package
+                configs.extend(index_configs)
+
+        return configs
+
+    def _scan_package_configs(self, path=None, indexes=None):
+        """
+        :param path: locations to look for packages in, sys.path is used if None
+        :param indexes: dict to put found bzt-configs.json files into, with configs listed in them
+        :type indexes: dict
+        """
         configs = []
-        for importer, modname, ispkg in pkgutil.iter_modules(path=None):
+        for importer, modname, ispkg in pkgutil.iter_modules(path=path):
             try:
                 if not ispkg:
                     continue
@@ -571,6 +733,9 @@ class Engine(object):
                 if not os.path.exists(index_path):
                     continue
 
+                if indexes is not None:
+                    indexes[index_path] = []  # invalid index is remembered as well to notice when it's fixed
+
                 try:
                     with codecs.open(index_path, 'rb', encoding='utf-8') as fds:
                         index_configs = json.load(fds)
@@ -582,8 +747,10 @@ class Engine(object):
                     self.log.debug("Error: value of bzt-configs.json should be a list (%s)" % index_path)
                     continue
 
-                for config_name in index_configs:
-                    configs.append(os.path.join(importer.path, modname, config_name))
+                index_configs = [os.path.join(importer.path, modname, config_name) for config_name in index_configs]
+                if indexes is not None:
+                    indexes[index_path] = index_configs
+                configs.extend(index_configs)
             except BaseException as exc:
                 self.log.warning("Can't look for package configs in package %r: %s", modname, str(exc))
                 self.log.debug("Traceback: %s", traceback.format_exc())
@@ -627,8 +794,7 @@ class Engine(object):
         err = TaurusConfigError("Please check global config availability or configure provisioning settings")
         cls = self.config.get(Provisioning.PROV, err)
         self.provisioning = self.instantiate_module(cls)
-        self.prepared.append(self.provisioning)
-        self.provisioning.prepare()
+        self.prepare_modules([self.provisioning], self.prepared)
 
     def __prepare_reporters(self):
         """
@@ -649,10 +815,7 @@ class Engine(object):
             if not reporter.should_run():
                 self.reporters.remove(reporter)
 
-        # prepare reporters
-        for module in self.reporters:
-            self.prepared.append(module)
-            module.prepare()
+        self.prepare_modules(self.reporters, self.prepared)
 
     def __prepare_services(self):
         """
@@ -674,10 +837,7 @@ class Engine(object):
                 services.remove(service)
 
         self.services.extend(services)
-
-        for module in self.services:
-            self.prepared.append(module)
-            module.prepare()
+        self.prepare_modules(self.services, self.prepared)
 
     def __singletone_exists(self, instance, mods_list):
         """
@@ -707,8 +867,7 @@ class Engine(object):
         else:
             self.aggregator = self.instantiate_module(cls)
 
-        self.prepared.append(self.aggregator)
-        self.aggregator.prepare()
+        self.prepare_modules([self.aggregator], self.prepared)
 
     def get_http_client(self):
         if self._http_client is None:
@@ -19,13 +19,14 @@ import codecs
 import logging
 import hashlib
 import os
+import threading
 import time
 from collections import namedtuple
 
 from bzt import TaurusConfigError
 from bzt import ToolError
 
-from bzt.utils import numeric_types, Environment, RequiredTool, PIPE, SoapUIScriptConverter
+from bzt.utils import numeric_types, Environment, RequiredTool, PIPE
 from bzt.utils import to_json, BetterDict, ensure_is_dict, dehumanize_time
 from bzt.environment_helpers import expand_envs_with_os
 from .dicts import Scenario
@@ -55,6 +56,13 @@ class EngineModule(object):
         """
         pass
 
+    def is_prepare_independent(self):
+        """
+        Returns True if `prepare` of module doesn't rely on other modules
+        and is safe to run in parallel with them (see `prepare-workers` setting)
+        """
+        return False
+
     def startup(self):
         """
         Startup should be as fast as possible. Launch background processes,
@@ -167,6 +175,14 @@ class Aggregator(EngineModule):
     def converter(data):
         return data
 
+    def get_data_files(self):
+        """
+        Names of results files read by registered readers, engine watches them for 'wakeup-on-data'
+
+        :rtype: list[str]
+        """
+        return []
+
 
 class ScenarioExecutor(EngineModule, HavingInstallableTools):
     """
@@ -181,6 +197,7 @@ class ScenarioExecutor(EngineModule, HavingInstallableTools):
     THRPT = "throughput"
     STEPS = "steps"
     LOAD_FMT = namedtuple("LoadSpec", "concurrency throughput ramp_up hold iterations duration steps")
+    SCENARIOS_LOCK = threading.RLock()  # scenario extraction changes engine config
 
     def __init__(self):
         super(ScenarioExecutor, self).__init__()
@@ -200,6 +217,7 @@ class ScenarioExecutor(EngineModule, HavingInstallableTools):
     def _get_tool(self, tool, **kwargs):
         instance = tool(env=self.env, log=self.log, http_client=self.engine.get_http_client(), **kwargs)
         assert isinstance(instance, RequiredTool)
+        instance.probe_cache = self.engine.tool_probes
 
         return instance
 
@@ -238,6 +256,10 @@ class ScenarioExecutor(EngineModule, HavingInstallableTools):
         if name is None and self._cached_scenario is not None:
             return self._cached_scenario
 
+        with ScenarioExecutor.SCENARIOS_LOCK:
+            return self._get_scenario(name)
+
+    def _get_scenario(self, name):
         scenarios = self.engine.config.get("scenarios", force_set=True)
 
         label = self._get_scenario_label(name, scenarios)
@@ -310,6 +332,8 @@ class ScenarioExecutor(EngineModule, HavingInstallableTools):
         return label
 
     def _extract_scenario_from_soapui(self, base_scenario, script_path):
+        from bzt.xml_utils import SoapUIScriptConverter  # lxml is heavy to import
+
         test_case = base_scenario.get("test-case", None)
         converter = SoapUIScriptConverter(self.log)
         conv_config = converter.convert_script(script_path)
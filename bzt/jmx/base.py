@@ -18,8 +18,8 @@ limitations under the License.
 import logging
 import os
 import traceback
+from functools import lru_cache
 
-from cssselect import GenericTranslator
 from lxml import etree
 from urllib import parse
 
@@ -31,6 +31,19 @@ from bzt.requests_model import has_variable_pattern
 LOG = logging.getLogger("")
 
 
+@lru_cache(maxsize=1024)
+def compile_selector(selector):
+    """
+    Compiled XPath expression for CSS selector, translation and compilation are made once per selector
+
+    :type selector: str
+    :rtype: etree.XPath
+    """
+    from cssselect import GenericTranslator  # it's needed only for the first use of selector
+
+    return etree.XPath(GenericTranslator().css_to_xpath(selector))
+
+
 def try_convert(val, func=int, default=None):
     if val is None:
         res = val
@@ -70,6 +83,46 @@ def cond_float(val, rounding=None):
     return val
 
 
+class ElementIndex(object):
+    """
+    Elements of tree by values of their `testclass` and `testname` attributes.
+    Found elements are checked to be still in tree and have the same attribute value,
+    elements added into tree have to be indexed with `add`.
+    """
+    ATTRIBUTES = ("testclass", "testname")
+
+    def __init__(self, root):
+        self.root = root
+        self.elements = {attr: {} for attr in self.ATTRIBUTES}
+        self.add(root)
+
+    def add(self, node):
+        for element in node.iter(tag=etree.Element):
+            for attr in self.ATTRIBUTES:
+                value = element.get(attr)
+                if value is not None:
+                    self.elements[attr].setdefault(value, []).append(element)
+
+    def find(self, attr, value):
+        """
+        :rtype: list[etree.Element]
+        """
+        elements = self.elements[attr].get(value, [])
+        actual = [elm for elm in elements if elm.get(attr) == value and self.__in_tree(elm)]
+        if len(actual) != len(elements):
+            self.elements[attr][value] = actual
+        return actual
+
+    def __in_tree(self, element):
+        return element is self.root or self.root in element.iterancestors()
+
+    def values(self, attr):
+        """
+        :rtype: list[str]
+        """
+        return [value for value in list(self.elements[attr]) if self.find(attr, value)]
+
+
 class JMX(object):
     """
     A class to manipulate and generate JMX test plans for JMeter
@@ -84,6 +137,7 @@ class JMX(object):
 
     def __init__(self, original=None, test_plan_name="BZT Generated Test Plan"):
         self.log = logging.getLogger(self.__class__.__name__)
+        self.index = None
         if original:
             self.load(original)
         else:
@@ -116,6 +170,8 @@ class JMX(object):
             msg = "XML parsing failed for file %s: %s"
             raise TaurusInternalException(msg % (original, exc))
 
+        self.index = None
+
     def get(self, selector):
         """
         Returns tree elements by CSS selector
@@ -123,9 +179,33 @@ class JMX(object):
         :type selector: str
         :return:
         """
-        expression = GenericTranslator().css_to_xpath(selector)
-        nodes = self.tree.xpath(expression)
-        return nodes
+        return compile_selector(selector)(self.tree)
+
+    def get_by_attr(self, attr, value):
+        """
+        Returns tree elements with given value of `testclass` or `testname` attribute,
+        index of elements is built once for tree. Elements added into tree by `append`
+        are found too, those added directly into tree elements aren't.
+
+        :type attr: str
+        :type value: str
+        :rtype: list[etree.Element]
+        """
+        return self.__get_index().find(attr, value)
+
+    def get_attr_values(self, attr):
+        """
+        Returns all values of `testclass` or `testname` attribute in tree, see `get_by_attr`
+
+        :type attr: str
+        :rtype: list[str]
+        """
+        return self.__get_index().values(attr)
+
+    def __get_index(self):
+        if self.index is None:
+            self.index = ElementIndex(self.tree.getroot())
+        return self.index
 
     def append(self, selector, node):
         """
@@ -142,6 +222,8 @@ class JMX(object):
             raise TaurusInternalException(msg % selector)
 
         container[0].append(node)
+        if self.index is not None:
+            self.index.add(node)
 
     def save(self, filename):
         """
@@ -17,7 +17,6 @@ limitations under the License.
 """
 import os
 import re
-from distutils.version import LooseVersion
 from lxml import etree
 
 from bzt import TaurusInternalException, TaurusConfigError
@@ -27,7 +26,7 @@ from bzt.jmx.base import cond_int
 from bzt.jmx.threadgroups import ThreadGroup, ConcurrencyThreadGroup, ThreadGroupHandler
 from bzt.requests_model import RequestVisitor, has_variable_pattern, HierarchicRequestParser
 from bzt.utils import iteritems, numeric_types
-from bzt.utils import BetterDict, dehumanize_time, ensure_is_dict, load_class, guess_delimiter
+from bzt.utils import BetterDict, dehumanize_time, ensure_is_dict, load_class, guess_delimiter, LooseVersion
 
 
 class RequestCompiler(RequestVisitor):
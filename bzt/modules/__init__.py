@@ -21,7 +21,6 @@ import os
 from bzt import ToolError
 from bzt.engine import ScenarioExecutor
 from bzt.modules.aggregator import ConsolidatingAggregator
-from bzt.modules.console import ExecutorWidget
 from bzt.modules.functional import FunctionalAggregator, FuncSamplesReader, LoadSamplesReader
 from bzt.utils import shutdown_process
 
@@ -141,10 +140,14 @@ class SubprocessedExecutor(ReportableExecutor, TransactionProvider):
         shutdown_process(self.process, self.log)
 
     def _check_tools(self, tools):
+        batches = {}  # tools sharing install_batch are installed with single call of it
         for tool in tools:
             if not tool.check_if_installed():
                 self.log.info("Installing %s...", tool.tool_name)
-                tool.install()
+                batches.setdefault(tool.install_batch, []).append(tool)
+
+        for install_batch, batch in batches.items():
+            install_batch(batch)
 
     def has_results(self):
         return bool(self.reader) and bool(self.reader.read_records)
@@ -168,9 +171,11 @@ class SubprocessedExecutor(ReportableExecutor, TransactionProvider):
         """
         Add progress widget to console screen sidebar
 
-        :rtype: ExecutorWidget
+        :rtype: bzt.modules.console.ExecutorWidget
         """
         if not self.widget:
+            from bzt.modules.console import ExecutorWidget  # urwid is imported only when console is used
+
             label = "%s" % self
             self.widget = ExecutorWidget(self, label)
         return self.widget
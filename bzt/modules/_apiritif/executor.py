@@ -302,6 +302,9 @@ class ApiritifFuncReader(FunctionalResultsReader):
         reader = FuncSamplesReader(report_filename, self.engine, self.log)
         self.readers.append(reader)
 
+    def get_data_files(self):
+        return list(self.filenames)
+
     def read(self, last_pass=False):
         for reader in self.readers:
             for sample in reader.read(last_pass):
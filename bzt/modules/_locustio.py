@@ -23,13 +23,14 @@ from collections import OrderedDict, Counter
 
 from bzt import TaurusConfigError
 from bzt.engine import ScenarioExecutor, Scenario
-from bzt.modules.aggregator import ConsolidatingAggregator, ResultsProvider, DataPoint, KPISet
+from bzt.modules.aggregator import ConsolidatingAggregator, ResultsProvider, DataPoint, KPISet, KPIFramesReader
 from bzt.modules.console import ExecutorWidget
 from bzt.modules.jmeter import JTLReader
 from bzt.modules.services import PythonTool
 from bzt.requests_model import HTTPRequest
-from bzt.utils import iteritems, get_full_path, ensure_is_dict, PythonGenerator, FileReader, CALL_PROBLEMS
+from bzt.utils import iteritems, get_full_path, ensure_is_dict, FileReader, CALL_PROBLEMS
 from bzt.utils import shutdown_process, dehumanize_time, RESOURCES_DIR
+from bzt.xml_utils import PythonGenerator
 
 
 class LocustIOExecutor(ScenarioExecutor):
@@ -64,6 +65,10 @@ class LocustIOExecutor(ScenarioExecutor):
             workers_ldjson = self.engine.create_artifact("locust-workers", ".ldjson")
             self.reader = WorkersReader(workers_ldjson, self.expected_workers, self.log)
             self.env.set({"WORKERS_LDJSON": workers_ldjson})
+        elif self.settings.get("per-second-stats", False):
+            kpi_ldjson = self.engine.create_artifact("locust-kpi", ".ldjson")
+            self.reader = KPIFramesReader(kpi_ldjson, self.log)
+            self.env.set({"KPI_LDJSON": kpi_ldjson})
         else:
             kpi_jtl = self.engine.create_artifact("kpi", ".jtl")
             self.reader = JTLReader(kpi_jtl, self.log)
@@ -171,8 +176,8 @@ class LocustIOExecutor(ScenarioExecutor):
         super(LocustIOExecutor, self).post_process()
 
     def has_results(self):
-        master_results = self.is_master and self.reader.cumulative
-        local_results = not self.is_master and self.reader and self.reader.buffer
+        master_results = isinstance(self.reader, (WorkersReader, KPIFramesReader)) and self.reader.cumulative
+        local_results = isinstance(self.reader, JTLReader) and self.reader.buffer
         if master_results or local_results:
             return True
         else:
@@ -214,17 +219,13 @@ class WorkersReader(ResultsProvider):
         self.join_buffer = {}
         self.num_workers = num_workers
         self.file = FileReader(filename=filename, parent_logger=self.log)
-        self.read_buffer = ""
 
     def _calculate_datapoints(self, final_pass=False):
-        read = self.file.get_bytes(size=1024 * 1024, last_pass=final_pass)
-        if not read or not read.strip():
+        lines = list(self.file.get_complete_lines(size=1024 * 1024, last_pass=final_pass, decode=False))
+        if not lines:
             return
-        self.read_buffer += read
-        while "\n" in self.read_buffer:
-            _line = self.read_buffer[:self.read_buffer.index("\n") + 1]
-            self.read_buffer = self.read_buffer[len(_line):]
-            self.fill_join_buffer(json.loads(_line))
+        for line in lines:
+            self.fill_join_buffer(json.loads(line))
 
         max_full_ts = self.get_max_full_ts()
 
@@ -20,7 +20,7 @@ from math import ceil
 
 from bzt import ToolError
 from bzt.engine import ScenarioExecutor
-from bzt.modules.aggregator import ConsolidatingAggregator, ResultsReader
+from bzt.modules.aggregator import ConsolidatingAggregator, ResultsReader, KPIFramesReader
 from bzt.modules.console import ExecutorWidget
 from bzt.modules.services import RequiredTool
 from bzt.utils import unicode_decode
@@ -49,7 +49,10 @@ class MolotovExecutor(ScenarioExecutor):
         self.stderr = open(self.engine.create_artifact("molotov", ".err"), 'w')
 
         self.report_file_name = self.engine.create_artifact("molotov-report", ".ldjson")
-        self.reader = MolotovReportReader(self.report_file_name, self.log)
+        if self.settings.get("per-second-stats", False):
+            self.reader = KPIFramesReader(self.report_file_name, self.log)
+        else:
+            self.reader = MolotovReportReader(self.report_file_name, self.log)
         if isinstance(self.engine.aggregator, ConsolidatingAggregator):
             self.engine.aggregator.add_underling(self.reader)
 
@@ -93,6 +96,8 @@ class MolotovExecutor(ScenarioExecutor):
         cmdline += [self.get_script_path(required=True)]
 
         self.env.set({"MOLOTOV_TAURUS_REPORT": self.report_file_name})
+        if isinstance(self.reader, KPIFramesReader):
+            self.env.set({"MOLOTOV_TAURUS_KPI_FRAMES": "1"})
         self.env.add_path({"PYTHONPATH": get_full_path(__file__, step_up=3)})
 
         self.process = self._execute(cmdline)
@@ -141,6 +146,9 @@ class MolotovReportReader(ResultsReader):
         self.read_records = 0
         self._concurrency = 0
 
+    def get_file_readers(self):
+        return [self.ldjson_reader.file]
+
     def _read(self, final_pass=False):
         for row in self.ldjson_reader.read(final_pass):
             self.read_records += 1
@@ -22,8 +22,9 @@ import sys
 from bzt import TaurusConfigError
 from bzt.engine import SETTINGS
 from bzt.modules import SubprocessedExecutor
+from bzt.modules.aggregator import KPIFramesReader
 from bzt.modules.services import PythonTool
-from bzt.utils import FileReader, RESOURCES_DIR
+from bzt.utils import FileReader, RESOURCES_DIR, get_full_path
 from bzt.utils import RequiredTool
 
 IGNORED_LINE = re.compile(r"[^,]+,Total:\d+ Passed:\d+ Failed:\d+")
@@ -51,6 +52,11 @@ class PyTestExecutor(SubprocessedExecutor):
 
         self.reporting_setup(suffix=".ldjson")
 
+    def create_load_reader(self, report_file):
+        if self.settings.get("per-second-stats", False):
+            return KPIFramesReader(report_file, self.log)
+        return super(PyTestExecutor, self).create_load_reader(report_file)
+
     def __is_verbose(self):
         engine_verbose = self.engine.config.get(SETTINGS).get("verbose", False)
         executor_verbose = self.settings.get("verbose", engine_verbose)
@@ -78,6 +84,10 @@ class PyTestExecutor(SubprocessedExecutor):
         if load.hold:
             cmdline += ['-d', str(load.hold)]
 
+        if isinstance(self.reader, KPIFramesReader):
+            cmdline += ['--kpi-frames']
+            self.env.add_path({"PYTHONPATH": get_full_path(__file__, step_up=3)})
+
         cmdline += self._additional_args
         cmdline += [self.script]
 
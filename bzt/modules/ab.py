@@ -19,7 +19,6 @@ limitations under the License.
 import logging
 import re
 from math import ceil
-from distutils.version import LooseVersion
 
 from bzt import TaurusConfigError
 from bzt.engine import ScenarioExecutor
@@ -27,6 +26,7 @@ from bzt.modules.aggregator import ConsolidatingAggregator, ResultsReader
 from bzt.modules.console import ExecutorWidget
 from bzt.requests_model import HTTPRequest
 from bzt.utils import iteritems, CALL_PROBLEMS, shutdown_process, RequiredTool, dehumanize_time, FileReader
+from bzt.utils import TimestampParser, LooseVersion
 
 
 class ApacheBenchmarkExecutor(ScenarioExecutor):
@@ -42,6 +42,9 @@ class ApacheBenchmarkExecutor(ScenarioExecutor):
         self.tool = None
         self.scenario = None
 
+    def is_prepare_independent(self):
+        return True
+
     def prepare(self):
         super(ApacheBenchmarkExecutor, self).prepare()
         self.scenario = self.get_scenario()
@@ -170,6 +173,7 @@ class TSVDataReader(ResultsReader):
         self.skipped_header = False
         self.concurrency = None
         self.url_label = None
+        self.timestamps = TimestampParser(int)
 
     def setup(self, concurrency, url_label):
         self.concurrency = concurrency
@@ -191,7 +195,7 @@ class TSVDataReader(ResultsReader):
 
             _url = self.url_label
             _concur = self.concurrency
-            _tstamp = int(log_vals[1])  # timestamp - moment of request sending
+            _tstamp = self.timestamps.parse(log_vals[1])  # timestamp - moment of request sending
             _con_time = float(log_vals[2]) / 1000.0  # connection time
             _etime = float(log_vals[4]) / 1000.0  # elapsed time
             _latency = float(log_vals[5]) / 1000.0  # latency (aka waittime)
@@ -215,6 +219,9 @@ class ApacheBenchmark(RequiredTool):
             return version[0]
 
     def check_if_installed(self):
+        if self._get_probe() is not None:
+            return True
+
         self.log.debug('Trying %s: %s', self.tool_name, self.tool_path)
         try:
             out, err = self.call([self.tool_path, '-V'])
@@ -226,4 +233,5 @@ class ApacheBenchmark(RequiredTool):
         self.log.debug("%s check stdout: %s", self.tool_name, out)
         if err:
             self.log.warning("%s check stderr: %s", self.tool_name, err)
+        self._save_probe()
         return True
@@ -17,20 +17,26 @@ limitations under the License.
 """
 import collections
 import copy
+import json
 import logging
 import math
+import multiprocessing
+import pickle
+import re
+import struct
 import time
+import traceback
 from abc import abstractmethod
 from collections import Counter
 
-import fuzzyset
-from hdrpy import HdrHistogram, RecordedIterator
+import numpy
+from hdrpy import HdrHistogram
 from yaml import SafeDumper
 from yaml.representer import SafeRepresenter
 
 from bzt import TaurusInternalException, TaurusConfigError
 from bzt.engine import Aggregator
-from bzt.utils import iteritems, dehumanize_time, JSONConvertible, is_int
+from bzt.utils import iteritems, dehumanize_time, JSONConvertible, is_int, is_linux, FileReader
 
 log = logging.getLogger('aggregator')
 SAMPLE_STATES = 'success', 'jmeter_errors', 'http_errors'
@@ -41,64 +47,6 @@ AGGREGATED_STATES = (
 )
 
 
-class SinglePassIterator(RecordedIterator):
-    """
-    An iterator to do only one pass on data and calculate all we need inside it.
-    Should do one pass and return:
-    - stddev
-    - percentiles
-    - histogram
-    """
-
-    def __init__(self, histogram, percentiles, mean):
-        super(SinglePassIterator, self).__init__(histogram)
-        assert mean is not None, "Known mean is required"
-        self.perc_levels = list(percentiles)
-        self.perc_levels.sort()
-        self._mean = mean
-        self._init()
-
-    def reset(self, histogram=None):
-        super(SinglePassIterator, self).reset(histogram)
-        self._init()
-
-    def _init(self):
-        self.percentiles = {}
-        self.stdev = 0
-        self.hist_values = {}
-        self._geometric_dev_total = 0.0
-        self._perc_indexes = copy.copy(self.perc_levels)
-
-    def __next__(self):
-        item = super(SinglePassIterator, self).__next__()
-
-        # histogram
-        self.hist_values[item.value_iterated_to] = item.count_at_value_iterated_to
-
-        # stddev
-        dev = (self.histogram._hdr_median_equiv_value(item.value_iterated_to) * 1.0) - self._mean * 1000
-        self._geometric_dev_total += (dev * dev) * item.count_added_in_this_iter_step
-
-        # percentiles
-        self._fill_percentiles()
-
-        return item
-
-    def _fill_percentiles(self):
-        while self._perc_indexes and self._perc_indexes[0] <= self.get_percentile_iterated_to():
-            perc_level = self._perc_indexes.pop(0)
-            self.percentiles[perc_level] = self.value_at_index
-
-    next = __next__
-
-    def has_next(self):
-        has = super(SinglePassIterator, self).has_next()
-        if not has:
-            self.stdev = math.sqrt(self._geometric_dev_total / self.total_count)
-            assert set(self.perc_levels) == set(self.percentiles.keys()), 'Not all percentiles are generated'
-        return has
-
-
 class RespTimesCounter(JSONConvertible):
     def __init__(self, low, high, sign_figures, perc_levels=()):
         super(RespTimesCounter, self).__init__()
@@ -106,14 +54,16 @@ class RespTimesCounter(JSONConvertible):
         self.high = high
         self.sign_figures = sign_figures
         self.histogram = HdrHistogram(low, high, sign_figures)
-        self._ff_iterator = None
         self._perc_levels = perc_levels
         self.known_mean = None
+        self._stats = None  # percentiles and histogram values, calculated on demand and dropped on changes
+        self._sums = (0, 0)  # sum and sum of squares of bucket median values, None if unknown
 
     def __deepcopy__(self, memo):
         new = RespTimesCounter(self.low, self.high, self.sign_figures)
-        new._ff_iterator = self._ff_iterator
         new._perc_levels = self._perc_levels
+        new._stats = self._stats
+        new._sums = self._sums
 
         new.histogram.counts = copy.deepcopy(self.histogram.counts, memo)
         new.histogram.total_count = self.histogram.total_count
@@ -132,31 +82,167 @@ class RespTimesCounter(JSONConvertible):
         item = round(item * 1000.0, 3)
         if item > self.high:
             self.__grow(math.ceil(item / 1000.0) * 1000.0)
-        self._ff_iterator = None
+        self._stats = None
+        self._sums = None  # too expensive to update for every sample, will be recalculated
         self.histogram.record_value(item, count)
 
+    def add_array(self, items):
+        """
+        Record many values at once, bucket indexes are calculated for the whole array
+
+        :type items: numpy.ndarray
+        """
+        items = numpy.round(numpy.asarray(items, dtype=numpy.float64) * 1000.0, 3)
+        items = items[items >= 0]
+        if not len(items):
+            return
+
+        max_item = items.max()
+        if max_item > self.high:
+            self.__grow(math.ceil(max_item / 1000.0) * 1000.0)
+        self._stats = None
+
+        hist = self.histogram
+        indexes = self.__counts_indexes(items.astype(numpy.int64))
+        in_range = indexes < hist.counts_len
+        if not in_range.all():
+            indexes, items = indexes[in_range], items[in_range]
+
+        hist.counts += numpy.bincount(indexes, minlength=hist.counts_len)
+        hist.total_count += len(indexes)
+        hist.min_value = min(hist.min_value, items.min())
+        hist.max_value = max(hist.max_value, items.max())
+
+        if self._sums is not None:
+            medians = self.__median_values(indexes)
+            self._sums = (self._sums[0] + int(medians.sum()), self._sums[1] + int((medians * medians).sum()))
+
+    def __counts_indexes(self, values):
+        """
+        Vectorized version of HdrHistogram._counts_index_for()
+
+        :type values: numpy.ndarray
+        """
+        hist = self.histogram
+        _, pow2ceiling = numpy.frexp(values | hist.sub_bucket_mask)  # bit length of integer
+        bucket_indexes = pow2ceiling - hist.unit_magnitude - (hist.sub_bucket_half_count_magnitude + 1)
+        sub_bucket_indexes = values >> (bucket_indexes + hist.unit_magnitude)
+        bucket_base_indexes = (bucket_indexes + 1) << hist.sub_bucket_half_count_magnitude
+        return bucket_base_indexes + sub_bucket_indexes - hist.sub_bucket_half_count
+
+    def __bucket_ranges(self, indexes):
+        """
+        Vectorized version of HdrHistogram.get_value_from_index() and _hdr_size_of_equiv_value_range()
+
+        :type indexes: numpy.ndarray
+        :return: lowest values and sizes of equivalent value ranges for counts indexes
+        """
+        hist = self.histogram
+        bucket_indexes = (indexes >> hist.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_indexes = (indexes & (hist.sub_bucket_half_count - 1)) + hist.sub_bucket_half_count
+        first_bucket = bucket_indexes < 0
+        sub_bucket_indexes[first_bucket] -= hist.sub_bucket_half_count
+        bucket_indexes[first_bucket] = 0
+        lowest_values = sub_bucket_indexes << (bucket_indexes + hist.unit_magnitude)
+
+        # re-evaluate bucket the same way as HdrHistogram does for values
+        _, pow2ceiling = numpy.frexp(lowest_values | hist.sub_bucket_mask)
+        bucket_indexes = pow2ceiling - hist.unit_magnitude - (hist.sub_bucket_half_count_magnitude + 1)
+        sub_bucket_indexes = lowest_values >> (bucket_indexes + hist.unit_magnitude)
+        bucket_indexes += sub_bucket_indexes >= hist.sub_bucket_count
+        sizes = numpy.left_shift(1, hist.unit_magnitude + bucket_indexes)
+        return lowest_values, sizes
+
+    def __median_values(self, indexes):
+        lowest_values, sizes = self.__bucket_ranges(indexes)
+        return lowest_values + (sizes >> 1)
+
     def merge(self, other):
-        self._ff_iterator = None
+        self._stats = None
+        if self._sums is not None and other._sums is not None:
+            self._sums = (self._sums[0] + other._sums[0], self._sums[1] + other._sums[1])
+        else:
+            self._sums = None
+
         if other.high > self.high:
             self.__grow(other.high)
 
         self.histogram.add(other.histogram)
 
-    def _get_ff(self):
-        if self._ff_iterator is None:
-            self._ff_iterator = SinglePassIterator(self.histogram, self._perc_levels, self.known_mean)
-            for _ in self._ff_iterator:
-                pass  # consume it
-        return self._ff_iterator
+    def get_nonzero_counts(self):
+        """
+        Compact form of histogram: indexes and values of non-empty buckets
+        """
+        counts = self.histogram.counts
+        indexes = numpy.flatnonzero(counts)
+        return indexes, counts[indexes]
+
+    def add_counts(self, indexes, counts, high):
+        """
+        Add bucket values obtained with get_nonzero_counts(), negative counts remove them back
+
+        :param high: highest trackable value of histogram that produced counts
+        """
+        if high > self.high:
+            self.__grow(high)
+        self._stats = None
+        self._sums = None
+        self.histogram.counts[indexes] += counts
+        self.histogram.total_count += int(counts.sum())
+
+    def _get_stats(self):
+        """
+        Calculate percentiles and histogram values in one pass over recorded buckets,
+        results are kept until next change of histogram
+        """
+        if self._stats is None:
+            counts = self.histogram.counts
+            indexes = numpy.flatnonzero(counts)
+            counts = counts[indexes]
+            lowest_values, sizes = self.__bucket_ranges(indexes)
+
+            total = self.histogram.total_count
+            percentiles = {}
+            if len(indexes):
+                reached = 100.0 * numpy.cumsum(counts) / total
+                positions = numpy.searchsorted(reached, self._perc_levels, side='left')
+                for perc_level, position in zip(self._perc_levels, positions.tolist()):
+                    percentiles[perc_level] = lowest_values[min(position, len(indexes) - 1)].item()
+
+            hist_values = dict(zip((lowest_values + sizes - 1).tolist(), counts.tolist()))
+            self._stats = percentiles, hist_values
+
+        return self._stats
+
+    def _get_sums(self):
+        if self._sums is None:
+            counts = self.histogram.counts
+            indexes = numpy.flatnonzero(counts)
+            medians = self.__median_values(indexes)
+            weighted = medians * counts[indexes]
+            self._sums = (int(weighted.sum()), int((weighted * medians).sum()))
+
+        return self._sums
 
     def get_percentiles_dict(self):
-        return self._get_ff().percentiles
+        return self._get_stats()[0]
 
     def get_counts(self):
-        return self._get_ff().hist_values
+        return self._get_stats()[1]
 
     def get_stdev(self):
-        return self._get_ff().stdev / 1000.0
+        """
+        Deviation from known mean, calculated with sums of bucket values and their squares
+        """
+        assert self.known_mean is not None, "Known mean is required"
+        total = self.histogram.total_count
+        if not total:
+            return 0.0
+
+        mean = self.known_mean * 1000
+        values_sum, squares_sum = self._get_sums()
+        dev_total = squares_sum - 2 * mean * values_sum + mean * mean * total
+        return math.sqrt(max(dev_total, 0.0) / total) / 1000.0
 
     def __json__(self):
         return {
@@ -177,6 +263,11 @@ class Concurrency(object):
     def merge(self, src_concurrency, sid):
         pass
 
+    @abstractmethod
+    def merge_sources(self, src_concurrency):
+        # take values of the same sources, for parts of the same second of the same reader
+        pass
+
     @abstractmethod
     def get(self):
         pass
@@ -212,6 +303,9 @@ class UniqueConcurrency(Concurrency):
         concurrency = src_concurrency.concurrencies
         self.add_concurrency(concurrency, sid)
 
+    def merge_sources(self, src_concurrency):
+        self.concurrencies.update(src_concurrency.concurrencies)
+
     def get(self):
         return len(self.concurrencies)
 
@@ -229,6 +323,10 @@ class RegularConcurrency(Concurrency):
         concurrency = src_concurrency.get()
         self.add_concurrency(concurrency, sid)
 
+    def merge_sources(self, src_concurrency):
+        for sid, cnc in iteritems(src_concurrency.concurrencies):
+            self.add_concurrency(cnc, sid)
+
     def get(self):
         return sum(self.concurrencies.values())
 
@@ -286,6 +384,7 @@ class KPISet(dict):
         self[KPISet.RESP_CODES] = Counter()
         self[KPISet.PERCENTILES] = {}
         self.ext_aggregation = ext_aggregation
+        self.shared = False  # set for read-only snapshots that are referenced by several datapoints
 
     def __deepcopy__(self, memo):
         mycopy = KPISet(self.perc_levels, self[KPISet.RESP_TIMES].high, ext_aggregation=self.ext_aggregation)
@@ -361,6 +460,48 @@ class KPISet(dict):
         if byte_count is not None:
             self[self.BYTE_COUNT] += byte_count
 
+    def add_samples(self, block):
+        """
+        Add many samples at once, equivalent of add_sample() for each of them
+
+        :type block: SamplesBlock
+        """
+        count = len(block)
+        if not count:
+            return
+
+        self[self.SAMPLE_COUNT] += count
+
+        trnames, inverse = SamplesBlock.factorize(block.trname)
+        for idx, trname in enumerate(trnames):
+            concurrencies = block.conc if len(trnames) == 1 else block.conc[inverse == idx]
+            self.add_concurrency(concurrencies.max().item(), trname)
+
+        has_rc = numpy.not_equal(block.rc, None)
+        if has_rc.any():
+            self[self.RESP_CODES].update(block.rc[has_rc].tolist())
+
+            # count times only if we have RCs
+            self.sum_cn += block.cn[has_rc].sum().item()
+            self.sum_lt += block.lt[has_rc].sum().item()
+            self.sum_rt += block.rt[has_rc].sum().item()
+
+        has_error = numpy.not_equal(block.error, None)
+        failures = int(has_error.sum())
+        self[self.FAILURES] += failures
+        self[self.SUCCESSES] += count - failures
+        if failures:
+            errors, inverse = SamplesBlock.factorize(block.error[has_error])
+            err_counts = numpy.bincount(inverse)
+            first_indexes = numpy.argsort(inverse, kind='stable')[numpy.cumsum(err_counts) - err_counts]
+            r_codes = block.rc[has_error][first_indexes].tolist()
+            for error, r_code, err_count in zip(errors, r_codes, err_counts.tolist()):
+                item = self.error_item_skel(error, r_code, err_count, KPISet.ERRTYPE_ERROR, Counter(), None)
+                self.inc_list(self[self.ERRORS], ("msg", error), item)
+
+        self[self.RESP_TIMES].add_array(block.rt)
+        self[self.BYTE_COUNT] += block.byte_count.sum().item()
+
     @staticmethod
     def inc_list(values, selector, value):
         """
@@ -428,11 +569,12 @@ class KPISet(dict):
 
         return self
 
-    def merge_kpis(self, src, sid=None):
+    def merge_kpis(self, src, sid=None, same_sources=False):
         """
         Merge other instance into self
 
         :param sid: source ID to use when suming up concurrency
+        :param same_sources: src is collected from the same sources, take max concurrency of each one
         :type src: KPISet
         :return:
         """
@@ -447,7 +589,10 @@ class KPISet(dict):
         self[self.FAILURES] += src[self.FAILURES]
         self[self.BYTE_COUNT] += src[self.BYTE_COUNT]
 
-        self._concurrency.merge(src._concurrency, sid)
+        if same_sources:
+            self._concurrency.merge_sources(src._concurrency)
+        else:
+            self._concurrency.merge(src._concurrency, sid)
 
         if src[self.RESP_TIMES]:
             self[self.RESP_TIMES].merge(src[self.RESP_TIMES])
@@ -534,6 +679,8 @@ class DataPoint(dict):
         """
         for label, val in iteritems(src):
             dest = dst.setdefault(label, KPISet(self.perc_levels, val[KPISet.RESP_TIMES].high))
+            if dest.shared:  # copy-on-write, snapshot can be referenced by other datapoints
+                dest = dst[label] = copy.deepcopy(dest)
             if not isinstance(val, KPISet):
                 val = KPISet.from_dict(val)
                 val.perc_levels = self.perc_levels
@@ -565,40 +712,445 @@ class DataPoint(dict):
             self.recalculate()
 
 
+class SamplesBlock(object):
+    """
+    Columnar portion of samples, reader can yield it from _read() instead of per-sample tuples.
+    All columns are numpy arrays of the same length, string columns have object dtype.
+    """
+    COLUMNS = ('ts', 'label', 'conc', 'rt', 'cn', 'lt', 'rc', 'error', 'trname', 'byte_count')
+
+    def __init__(self, ts, label, conc, rt, cn, lt, rc, error, trname, byte_count):
+        self.ts = ts
+        self.label = label
+        self.conc = conc
+        self.rt = rt
+        self.cn = cn
+        self.lt = lt
+        self.rc = rc
+        self.error = error
+        self.trname = trname
+        self.byte_count = byte_count
+
+    def __len__(self):
+        return len(self.ts)
+
+    def take(self, selector):
+        """
+        :param selector: boolean mask or indexes of samples
+        :rtype: SamplesBlock
+        """
+        return SamplesBlock(*[getattr(self, column)[selector] for column in self.COLUMNS])
+
+    def group_by(self, column):
+        """
+        Split block into parts with the same value in column
+
+        :type column: str
+        :return: pairs of value and SamplesBlock
+        """
+        values, inverse = self.factorize(getattr(self, column))
+        order = numpy.argsort(inverse, kind='stable')
+        start = 0
+        for value, count in zip(values, numpy.bincount(inverse).tolist()):
+            yield value, self.take(order[start:start + count])
+            start += count
+
+    @staticmethod
+    def factorize(column):
+        """
+        Encode column as list of distinct values and array of their indexes.
+        Numeric values are sorted, strings are kept in order of first appearance.
+
+        :type column: numpy.ndarray
+        :rtype: (list, numpy.ndarray)
+        """
+        if column.dtype != object:
+            values, inverse = numpy.unique(column, return_inverse=True)
+            return values.tolist(), inverse
+
+        if len(column) and (column == column[0]).all():  # frequent case, much faster than hashing each value
+            return [column[0]], numpy.zeros(len(column), dtype=numpy.int64)
+
+        codes = {}
+        inverse = numpy.fromiter((codes.setdefault(value, len(codes)) for value in column.tolist()),
+                                 dtype=numpy.int64, count=len(column))
+        return list(codes), inverse
+
+    def samples(self):
+        """
+        Per-sample view in format: label, conc, r_time, con_time, latency, r_code, error, trname, byte_count
+        """
+        return zip(*[getattr(self, column).tolist() for column in self.COLUMNS[1:]])
+
+
+class PointPacker(object):
+    """
+    Compact binary encoding of DataPoint and KPISet, alternative to JSON for passing
+    results between processes and for storing them on disk.
+
+    Message is a table of interned strings (labels, error messages, codes, URLs) followed by body.
+    KPISet scalars are fixed-width fields, non-empty histogram buckets are written as two arrays
+    of index gaps and counts, each one with the smallest sufficient integer width.
+    """
+    MAGIC = b"BZKP\x01"
+    KPI_SCALARS = struct.Struct("<qqqqddddddd?")
+    HIST_HEADER = struct.Struct("<ddBq")
+    DOUBLE = struct.Struct("<d")
+    RECORD_LEN = struct.Struct("<I")
+
+    NONE, INT, FLOAT, STR, TRUE, FALSE = range(6)
+
+    def __init__(self, data=b""):
+        self.strings = {}
+        self.table = []
+        self.body = bytearray()
+        self.data = memoryview(data)
+        self.pos = 0
+
+    @classmethod
+    def pack_point(cls, point):
+        """
+        :type point: DataPoint
+        :rtype: bytes
+        """
+        packer = cls()
+        packer.write_value(point[DataPoint.TIMESTAMP])
+        packer.write_value(point[DataPoint.SOURCE_ID])
+        packer.write_floats(point.perc_levels)
+        for key in (DataPoint.CURRENT, DataPoint.CUMULATIVE):
+            packer.write_varint(len(point[key]))
+            for label, kpiset in iteritems(point[key]):
+                packer.write_value(label)
+                packer.write_kpiset(kpiset)
+
+        return packer.get_bytes()
+
+    @classmethod
+    def unpack_point(cls, data):
+        """
+        :type data: bytes
+        :rtype: DataPoint
+        """
+        packer = cls.__from_bytes(data)
+        point = DataPoint(packer.read_value())
+        point[DataPoint.SOURCE_ID] = packer.read_value()
+        point.perc_levels = packer.read_floats()
+        for key in (DataPoint.CURRENT, DataPoint.CUMULATIVE):
+            for _ in range(packer.read_varint()):
+                label = packer.read_value()
+                point[key][label] = packer.read_kpiset()
+
+        return point
+
+    @classmethod
+    def pack_kpiset(cls, kpiset):
+        """
+        :type kpiset: KPISet
+        :rtype: bytes
+        """
+        packer = cls()
+        packer.write_kpiset(kpiset)
+        return packer.get_bytes()
+
+    @classmethod
+    def unpack_kpiset(cls, data):
+        """
+        :type data: bytes
+        :rtype: KPISet
+        """
+        return cls.__from_bytes(data).read_kpiset()
+
+    @classmethod
+    def dump(cls, points, fds):
+        """
+        Write datapoints into binary file as length-prefixed records
+
+        :type points: list[DataPoint]
+        """
+        for point in points:
+            record = cls.pack_point(point)
+            fds.write(cls.RECORD_LEN.pack(len(record)))
+            fds.write(record)
+
+    @classmethod
+    def load(cls, fds):
+        """
+        Read datapoints written by dump()
+
+        :rtype: collections.Iterable[DataPoint]
+        """
+        while True:
+            header = fds.read(cls.RECORD_LEN.size)
+            if len(header) < cls.RECORD_LEN.size:
+                break
+            record_len, = cls.RECORD_LEN.unpack(header)
+            yield cls.unpack_point(fds.read(record_len))
+
+    @classmethod
+    def __from_bytes(cls, data):
+        if not data.startswith(cls.MAGIC):
+            raise TaurusInternalException("Unknown format of packed results")
+
+        packer = cls(data)
+        packer.pos = len(cls.MAGIC)
+        packer.table = [packer.read_bytes().decode('utf-8') for _ in range(packer.read_varint())]
+        return packer
+
+    def get_bytes(self):
+        header = bytearray(self.MAGIC)
+        self.__append_varint(header, len(self.table))
+        for string in self.table:
+            encoded = string.encode('utf-8')
+            self.__append_varint(header, len(encoded))
+            header += encoded
+
+        return bytes(header + self.body)
+
+    def write_kpiset(self, kpiset):
+        """
+        :type kpiset: KPISet
+        """
+        get = lambda key: kpiset.get(key, no_recalc=True)
+        self.body += self.KPI_SCALARS.pack(
+            get(KPISet.SAMPLE_COUNT), get(KPISet.SUCCESSES), get(KPISet.FAILURES), int(get(KPISet.BYTE_COUNT)),
+            kpiset.sum_rt, kpiset.sum_lt, kpiset.sum_cn,
+            get(KPISet.AVG_RESP_TIME), get(KPISet.AVG_LATENCY), get(KPISet.AVG_CONN_TIME), get(KPISet.STDEV_RESP_TIME),
+            kpiset.ext_aggregation)
+        self.write_floats(kpiset.perc_levels)
+
+        percentiles = get(KPISet.PERCENTILES)
+        self.write_varint(len(percentiles))
+        for level, value in iteritems(percentiles):
+            self.write_value(level)
+            self.write_value(value)
+
+        concurrencies = kpiset._concurrency.concurrencies
+        if kpiset.ext_aggregation:
+            concurrencies = dict.fromkeys(concurrencies, 1)
+        self.write_counter(concurrencies)
+        self.write_counter(get(KPISet.RESP_CODES))
+
+        errors = get(KPISet.ERRORS)
+        self.write_varint(len(errors))
+        for error in errors:
+            for key in ("cnt", "msg", "tag", "rc", "type"):
+                self.write_value(error[key])
+            self.write_counter(error["urls"])
+
+        self.write_histogram(get(KPISet.RESP_TIMES))
+
+    def read_kpiset(self):
+        """
+        :rtype: KPISet
+        """
+        fields = self.KPI_SCALARS.unpack_from(self.data, self.pos)
+        self.pos += self.KPI_SCALARS.size
+        perc_levels = self.read_floats()
+        kpiset = KPISet(perc_levels, ext_aggregation=fields[-1])
+        kpiset[KPISet.SAMPLE_COUNT], kpiset[KPISet.SUCCESSES], kpiset[KPISet.FAILURES] = fields[:3]
+        kpiset[KPISet.BYTE_COUNT] = fields[3]
+        kpiset.sum_rt, kpiset.sum_lt, kpiset.sum_cn = fields[4:7]
+        kpiset[KPISet.AVG_RESP_TIME], kpiset[KPISet.AVG_LATENCY], kpiset[KPISet.AVG_CONN_TIME] = fields[7:10]
+        kpiset[KPISet.STDEV_RESP_TIME] = fields[10]
+
+        percentiles = {}
+        for _ in range(self.read_varint()):
+            level = self.read_value()
+            percentiles[level] = self.read_value()
+        kpiset[KPISet.PERCENTILES] = percentiles
+
+        concurrencies = self.read_counter()
+        if kpiset.ext_aggregation:
+            concurrencies = set(concurrencies)
+        kpiset._concurrency.concurrencies = concurrencies
+        kpiset[KPISet.RESP_CODES] = self.read_counter()
+
+        errors = kpiset[KPISet.ERRORS]
+        for _ in range(self.read_varint()):
+            cnt, msg, tag, r_code, err_type = [self.read_value() for _ in range(5)]
+            errors.append(KPISet.error_item_skel(msg, r_code, cnt, err_type, self.read_counter(), tag))
+
+        kpiset[KPISet.RESP_TIMES] = self.read_histogram(perc_levels)
+        return kpiset
+
+    def write_histogram(self, rtimes):
+        """
+        :type rtimes: RespTimesCounter
+        """
+        hist = rtimes.histogram
+        self.body += self.HIST_HEADER.pack(rtimes.low, rtimes.high, rtimes.sign_figures, int(hist.total_count))
+        self.write_value(hist.min_value)  # float after add_array(), int otherwise
+        self.write_value(hist.max_value)
+        indexes = numpy.flatnonzero(hist.counts)
+        self.write_array(numpy.diff(indexes, prepend=0))
+        self.write_array(hist.counts[indexes])
+
+    def read_histogram(self, perc_levels):
+        """
+        :rtype: RespTimesCounter
+        """
+        low, high, sign_figures, total = self.HIST_HEADER.unpack_from(self.data, self.pos)
+        self.pos += self.HIST_HEADER.size
+        rtimes = RespTimesCounter(low, high, sign_figures, perc_levels)
+        rtimes._sums = None
+
+        hist = rtimes.histogram
+        hist.min_value = self.read_value()
+        hist.max_value = self.read_value()
+        indexes = numpy.cumsum(self.read_array())
+        hist.counts[indexes] = self.read_array()
+        hist.total_count = total
+        return rtimes
+
+    def write_array(self, values):
+        """
+        :type values: numpy.ndarray
+        """
+        width = 1
+        if len(values):
+            max_value = int(values.max())
+            while width < 8 and max_value >> (8 * width):
+                width *= 2
+
+        self.write_varint(len(values))
+        self.body.append(width)
+        self.body += values.astype("<u%d" % width).tobytes()
+
+    def read_array(self):
+        """
+        :rtype: numpy.ndarray
+        """
+        count = self.read_varint()
+        width = self.data[self.pos]
+        values = numpy.frombuffer(self.data, "<u%d" % width, count, self.pos + 1)
+        self.pos += 1 + count * width
+        return values
+
+    def write_counter(self, counter):
+        self.write_varint(len(counter))
+        for key, count in iteritems(counter):
+            self.write_value(key)
+            self.write_value(count)
+
+    def read_counter(self):
+        counter = Counter()
+        for _ in range(self.read_varint()):
+            key = self.read_value()
+            counter[key] = self.read_value()
+        return counter
+
+    def write_floats(self, values):
+        self.write_varint(len(values))
+        for value in values:
+            self.body += self.DOUBLE.pack(value)
+
+    def read_floats(self):
+        count = self.read_varint()
+        values = list(struct.unpack_from("<%dd" % count, self.data, self.pos))
+        self.pos += self.DOUBLE.size * count
+        return values
+
+    def write_value(self, value):
+        if value is None:
+            self.body.append(self.NONE)
+        elif value is True or value is False:
+            self.body.append(self.TRUE if value else self.FALSE)
+        elif isinstance(value, str):
+            index = self.strings.get(value)
+            if index is None:
+                index = self.strings[value] = len(self.table)
+                self.table.append(value)
+            self.body.append(self.STR)
+            self.write_varint(index)
+        elif isinstance(value, (int, numpy.integer)):
+            self.body.append(self.INT)
+            self.write_varint(self.__zigzag(int(value)))
+        else:
+            self.body.append(self.FLOAT)
+            self.body += self.DOUBLE.pack(value)
+
+    def read_value(self):
+        kind = self.data[self.pos]
+        self.pos += 1
+        if kind == self.STR:
+            return self.table[self.read_varint()]
+        elif kind == self.INT:
+            return self.__unzigzag(self.read_varint())
+        elif kind == self.FLOAT:
+            value, = self.DOUBLE.unpack_from(self.data, self.pos)
+            self.pos += self.DOUBLE.size
+            return value
+        elif kind == self.NONE:
+            return None
+        elif kind in (self.TRUE, self.FALSE):
+            return kind == self.TRUE
+
+        raise TaurusInternalException("Wrong value type in packed results: %s" % kind)
+
+    def write_varint(self, value):
+        self.__append_varint(self.body, value)
+
+    def read_varint(self):
+        result = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def read_bytes(self):
+        length = self.read_varint()
+        self.pos += length
+        return bytes(self.data[self.pos - length:self.pos])
+
+    @staticmethod
+    def __append_varint(buf, value):
+        while value >= 0x80:
+            buf.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buf.append(value)
+
+    @staticmethod
+    def __zigzag(value):
+        return value << 1 if value >= 0 else (-value << 1) - 1
+
+    @staticmethod
+    def __unzigzag(value):
+        return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
 SafeDumper.add_representer(KPISet, SafeRepresenter.represent_dict)
 SafeDumper.add_representer(DataPoint, SafeRepresenter.represent_dict)
 
 
-class ResultsProvider(object):
+class KeysGeneralizer(object):
     """
-    :type listeners: list[AggregatorListener]
+    Folds keys (labels, error messages) into limited set of known ones.
+
+    Result of folding is memorized for each key, so repeated keys cost one dict lookup.
+    When the set is filling up, keys that differ from known ones only by numeric or UUID
+    path segments are folded by pattern, fuzzy matching is used as last resort.
     """
+    ID_SEGMENT = re.compile(r'(?<=[/=])(?:\d+|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12})(?=[/?&#;]|$)')
 
-    def __init__(self):
-        super(ResultsProvider, self).__init__()
-        self.cumulative = {}
-        self.track_percentiles = [0.0, 50.0, 90.0, 95.0, 99.0, 99.9, 100.0]
-        self.listeners = []
-        self.buffer_len = 2
-        self.min_buffer_len = 2
-        self.max_buffer_len = float('inf')
-        self.buffer_multiplier = 2
-        self.buffer_scale_idx = None
-        self.histogram_max = 1.0
-        self.known_errors = fuzzyset.FuzzySet(use_levenshtein=True)
-        self.max_error_count = 100
-        self.known_labels = fuzzyset.FuzzySet(use_levenshtein=True)
-        self.generalize_labels = 100
-        self._redundant_aggregation = False
+    def __init__(self, memo_size=10000):
+        import fuzzyset
 
-    def set_aggregation(self, aggregation):
-        self._redundant_aggregation = aggregation
+        self.known = fuzzyset.FuzzySet(use_levenshtein=True)
+        self.patterns = {}
+        self.memo = collections.OrderedDict()
+        self.memo_size = memo_size
+        self.hits = 0
+        self.misses = 0
 
-    @staticmethod
-    def _fuzzy_fold(key, dataset, limit):
+    def __len__(self):
+        return len(self.known)
+
+    def fold(self, key, limit):
         """
         :type key: str
-        :type dataset: fuzzyset.FuzzySet
         :type limit: int
         :rtype: str
         """
@@ -608,29 +1160,77 @@ class ResultsProvider(object):
         if not isinstance(key, str):
             key = key.decode('utf-8')
 
-        if key.lower() in dataset.exact_set:
+        result = self.memo.get(key)
+        if result is not None:
+            self.hits += 1
+            self.memo.move_to_end(key)
+            return result
+
+        self.misses += 1
+        result = self._fold(key, limit)
+        self.memo[key] = result
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+
+        return result
+
+    def _fold(self, key, limit):
+        if key.lower() in self.known.exact_set:
             return key
 
-        size = len(dataset)
+        pattern = self.ID_SEGMENT.sub('*', key)
+        size = len(self.known)
         if size >= limit / 4:
+            if pattern in self.patterns:
+                return self.patterns[pattern]
+
             tolerance = (float(size) / float(limit)) ** 2
             threshold = 1 - tolerance
-            matches = dataset.get(key)
+            matches = self.known.get(key)
             if matches:
                 for score, result in matches:
                     if score >= threshold:
                         return result
             elif tolerance >= 1.0:
-                return next(iter(dataset.exact_set.values()))  # last resort for capping
+                return next(iter(self.known.exact_set.values()))  # last resort for capping
 
-        dataset.add(key)
+        self.known.add(key)
+        if pattern != key:
+            self.patterns.setdefault(pattern, key)
         return key
 
+
+class ResultsProvider(object):
+    """
+    :type listeners: list[AggregatorListener]
+    """
+
+    def __init__(self):
+        super(ResultsProvider, self).__init__()
+        self.cumulative = {}
+        self._cumulative_snapshot = {}
+        self.track_percentiles = [0.0, 50.0, 90.0, 95.0, 99.0, 99.9, 100.0]
+        self.listeners = []
+        self.buffer_len = 2
+        self.min_buffer_len = 2
+        self.max_buffer_len = float('inf')
+        self.buffer_multiplier = 2
+        self.buffer_scale_idx = None
+        self.histogram_max = 1.0
+        self.known_errors = KeysGeneralizer()
+        self.max_error_count = 100
+        self.known_labels = KeysGeneralizer()
+        self.generalize_labels = 100
+        self._redundant_aggregation = False
+
+    def set_aggregation(self, aggregation):
+        self._redundant_aggregation = aggregation
+
     def _generalize_label(self, label):
-        return self._fuzzy_fold(label, self.known_labels, self.generalize_labels)
+        return self.known_labels.fold(label, self.generalize_labels)
 
     def _fold_error(self, error):
-        return self._fuzzy_fold(error, self.known_errors, self.max_error_count)
+        return self.known_errors.fold(error, self.max_error_count)
 
     def add_listener(self, listener):
         """
@@ -640,6 +1240,25 @@ class ResultsProvider(object):
         """
         self.listeners.append(listener)
 
+    def get_file_readers(self):
+        """
+        Readers of files that provider takes data from, most providers keep FileReader in 'file' field
+
+        :rtype: list[FileReader]
+        """
+        file_reader = getattr(self, "file", None)
+        if isinstance(file_reader, FileReader):
+            return [file_reader]
+        return []
+
+    def get_data_files(self):
+        """
+        Names of files that provider reads
+
+        :rtype: list[str]
+        """
+        return [file_reader.name for file_reader in self.get_file_readers()]
+
     def __merge_to_cumulative(self, current):
         """
         Merge current KPISet to cumulative
@@ -654,6 +1273,21 @@ class ResultsProvider(object):
             cumul.merge_kpis(data)
             cumul.recalculate()
 
+    def __get_cumulative_snapshot(self, changed_labels):
+        """
+        Build read-only view of cumulative KPISets for datapoint.
+        Only changed labels are copied, the rest are shared with previous snapshot.
+
+        :type changed_labels: collections.Iterable[str]
+        :rtype: dict[str,KPISet]
+        """
+        for label in changed_labels:
+            snapshot = copy.deepcopy(self.cumulative[label])
+            snapshot.shared = True
+            self._cumulative_snapshot[label] = snapshot
+
+        return dict(self._cumulative_snapshot)
+
     def datapoints(self, final_pass=False):
         """
         Generator object that returns datapoints from the reader
@@ -661,16 +1295,23 @@ class ResultsProvider(object):
         :type final_pass: bool
         """
         for datapoint in self._calculate_datapoints(final_pass):
-            current = datapoint[DataPoint.CURRENT]
-            if datapoint[DataPoint.CUMULATIVE] or not self._ramp_up_exclude():
-                self.__merge_to_cumulative(current)
-                datapoint[DataPoint.CUMULATIVE] = copy.deepcopy(self.cumulative)
-                datapoint.recalculate()
-
+            self._add_to_cumulative(datapoint)
             for listener in self.listeners:
                 listener.aggregated_second(datapoint)
             yield datapoint
 
+    def _add_to_cumulative(self, datapoint):
+        """
+        Merge current KPISets of datapoint into cumulative ones and put their snapshot into datapoint
+
+        :type datapoint: DataPoint
+        """
+        current = datapoint[DataPoint.CURRENT]
+        if datapoint[DataPoint.CUMULATIVE] or not self._ramp_up_exclude():
+            self.__merge_to_cumulative(current)
+            datapoint[DataPoint.CUMULATIVE] = self.__get_cumulative_snapshot(current.keys())
+            datapoint.recalculate()
+
     @abstractmethod
     def _calculate_datapoints(self, final_pass=False):
         """
@@ -749,17 +1390,72 @@ class ResultsReader(ResultsProvider):
 
                 error = self._fold_error(error)
                 self.buffer[t_stamp].append((label, conc, r_time, con_time, latency, r_code, error, trname, byte_count))
+            elif isinstance(result, SamplesBlock):
+                self.__buffer_block(result)
             else:
                 raise TaurusInternalException("Unsupported results from %s reader: %s" % (self, result))
 
+    def __buffer_block(self, block):
+        """
+        Split columnar block into per-second parts, same checks as for single samples are applied
+
+        :type block: SamplesBlock
+        """
+        labels, _ = SamplesBlock.factorize(block.label)
+        ignored = [label for label in labels if any([label.startswith(ignore) for ignore in self.ignored_labels])]
+        if ignored:
+            block = block.take(~numpy.isin(block.label, ignored))
+
+        if not len(block):
+            return
+
+        if block.ts.min() < self.min_timestamp:
+            self.log.debug("Putting samples before %s into it", self.min_timestamp)
+            block.ts = numpy.maximum(block.ts, self.min_timestamp)
+
+        if block.rt.min() < 0:
+            self.log.warning("Negative response time reported by tool, resetting it to zero")
+            block.rt = numpy.maximum(block.rt, 0)
+
+        has_error = numpy.not_equal(block.error, None)
+        if has_error.any():
+            errors, inverse = SamplesBlock.factorize(block.error[has_error])
+            folded = numpy.array([self._fold_error(error) for error in errors], dtype=object)
+            block.error[has_error] = folded[inverse]
+
+        for t_stamp, part in block.group_by('ts'):
+            self.buffer.setdefault(t_stamp, []).append(part)
+
+    def __aggregate_block(self, current, block):
+        """
+        :type current: dict
+        :type block: SamplesBlock
+        """
+        for base_label, part in block.group_by('label'):
+            if base_label == '':
+                base_label = '[empty]'
+
+            if self.generalize_labels:
+                base_label = self._generalize_label(base_label)
+
+            if self._redundant_aggregation:  # mixed label depends on each sample
+                for sample in part.samples():
+                    self.__add_sample(current, base_label, sample[1:])
+            else:
+                self.__get_kpiset(current, base_label).add_samples(part)
+
     def __aggregate_current(self, datapoint, samples):
         """
         :param datapoint: DataPoint
-        :param samples: list of samples
+        :param samples: list of samples and SamplesBlock's
         :return:
         """
         current = datapoint[DataPoint.CURRENT]
         for sample in samples:
+            if isinstance(sample, SamplesBlock):
+                self.__aggregate_block(current, sample)
+                continue
+
             # sample format: label, conc, r_time, con_time, latency, r_code, error, trname, byte_count
             base_label = sample[0]
 
@@ -792,13 +1488,16 @@ class ResultsReader(ResultsProvider):
             # kpis format: conc, r_time, con_time, latency, r_code, error_msg, trname, byte_count
             label = self.get_mixed_label(label=label, rc=kpis[4], msg=kpis[5])
 
+        self.__get_kpiset(current, label).add_sample(kpis)
+
+    def __get_kpiset(self, current, label):
         if label not in current:
             current[label] = KPISet(
                 perc_levels=self.track_percentiles,
                 hist_max_rt=self.__get_rtimes_max(label),
                 ext_aggregation=self._redundant_aggregation)
 
-        current[label].add_sample(kpis)
+        return current[label]
 
     def __get_rtimes_max(self, label):
         if label in self.cumulative:
@@ -862,10 +1561,300 @@ class ResultsReader(ResultsProvider):
             should report possible rests of results
         :rtype: list
         :return: timestamp, label, concurrency, rt, latency, rc, error
+            or SamplesBlock with columns of many samples
         """
         yield
 
 
+class KPIFramesReader(ResultsProvider):
+    """
+    Reads per-second KPI frames written by runners with bzt.resources.kpi_frames.
+    Frames for the same second are merged, the latest second is kept until next one comes.
+    Ignored labels, error folding and late frames are handled the same way as ResultsReader does for samples.
+    """
+
+    def __init__(self, filename, parent_logger):
+        """
+        :type filename: str
+        :type parent_logger: logging.Logger
+        """
+        super(KPIFramesReader, self).__init__()
+        self.log = parent_logger.getChild(self.__class__.__name__)
+        self.file = FileReader(filename=filename, parent_logger=self.log)
+        self.ignored_labels = []
+        self.buffer = {}
+        self.min_timestamp = 0
+        self.read_records = 0
+
+    def _calculate_datapoints(self, final_pass=False):
+        for line in self.file.get_complete_lines(size=1024 * 1024, last_pass=final_pass, decode=False):
+            self.read_records += 1
+            frame = json.loads(line)
+            if frame["ts"] < self.min_timestamp:
+                self.log.debug("Putting frame %s into %s", frame["ts"], self.min_timestamp)
+                frame["ts"] = self.min_timestamp
+
+            point = self.point_from_frame(frame)
+            if not point[DataPoint.CURRENT]:
+                continue  # all labels are ignored
+
+            if frame["ts"] in self.buffer:
+                self.buffer[frame["ts"]].merge_point(point)
+            else:
+                self.buffer[frame["ts"]] = point
+
+        if not self.buffer:
+            return
+
+        max_full_ts = max(self.buffer) if final_pass else max(self.buffer) - 1
+        for timestamp in sorted(self.buffer):
+            if timestamp <= max_full_ts:
+                self.min_timestamp = timestamp + 1
+                point = self.buffer.pop(timestamp)
+                point[DataPoint.SOURCE_ID] = self.file.name + "@" + str(id(self))
+                yield point
+
+    def point_from_frame(self, frame):
+        """
+        :type frame: dict
+        :rtype: DataPoint
+        """
+        point = DataPoint(frame["ts"], self.track_percentiles)
+        current = point[DataPoint.CURRENT]
+        overall = KPISet(self.track_percentiles)
+        for label, stats in iteritems(frame["labels"]):
+            if any([label.startswith(ignore) for ignore in self.ignored_labels]):
+                continue
+
+            kpiset = KPISet(self.track_percentiles)
+            kpiset.add_concurrency(frame["concurrency"], None)
+            kpiset[KPISet.SAMPLE_COUNT] = stats["count"]
+            kpiset[KPISet.FAILURES] = stats["fail"]
+            kpiset[KPISet.SUCCESSES] = stats["count"] - stats["fail"]
+            kpiset[KPISet.BYTE_COUNT] = stats["bytes"]
+            kpiset[KPISet.RESP_CODES].update(stats["rc"])
+            kpiset.sum_rt = stats["sum_rt"]
+            for r_time, count in iteritems(stats["rt"]):
+                kpiset[KPISet.RESP_TIMES].add(float(r_time) / 1000.0, count)
+
+            for msg, count in iteritems(stats["errors"]):
+                msg = self._fold_error(msg)
+                err_item = KPISet.error_item_skel(msg, None, count, KPISet.ERRTYPE_ERROR, Counter(), None)
+                KPISet.inc_list(kpiset[KPISet.ERRORS], ("msg", msg), err_item)
+
+            if label == '':
+                label = '[empty]'
+            if self.generalize_labels:
+                label = self._generalize_label(label)
+
+            if label in current:
+                current[label].merge_kpis(kpiset)
+            else:
+                current[label] = kpiset
+            overall.merge_kpis(kpiset)
+
+        if current:
+            current[''] = overall
+        point.recalculate()
+        return point
+
+
+class UnderlingReader(object):
+    """
+    Reads single underling in forked worker process, so samples of several underlings are parsed
+    and aggregated on several CPU cores. Datapoints are passed back packed with PointPacker.
+
+    Worker has its own copy of underling, reading progress and names of opened files are mirrored
+    into original object since executors look at them to decide if they have results. Labels and errors are folded
+    in engine process, where generalizers are shared by all underlings, and so is cumulative data.
+
+    :type underling: ResultsProvider
+    """
+    POINT, PASS, ERROR, DONE = range(4)
+
+    def __init__(self, underling, interval, context):
+        self.underling = underling
+        self.interval = interval
+        self.points = collections.deque()
+        self.watermark = None  # timestamp of the latest reported datapoint, earlier ones won't come
+        self.idle = False  # nothing was read during check interval
+        self.finished = False
+        self.error = None
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self._final_pass = context.Event()
+        name = "%s reader" % underling.__class__.__name__
+        self.process = context.Process(target=self._run, args=(child_conn,), name=name, daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def _run(self, conn):
+        """
+        Worker process body
+        """
+        listeners = self.underling.listeners
+        self.underling.listeners = []  # they are notified in parent process
+        self.underling.generalize_labels = 0  # raw keys are sent, see _fold_keys()
+        self.underling.max_error_count = 0
+        try:
+            read_amount = self._get_read_amount()
+            empty_passes = 0
+            while True:
+                final_pass = self._final_pass.is_set()
+                had_points = False
+                for point in self.underling.datapoints(final_pass):
+                    had_points = True
+                    point[DataPoint.CUMULATIVE] = {}  # it's built from folded keys in parent process
+                    conn.send((self.POINT, PointPacker.pack_point(point)))
+
+                # data that is read but kept in buffer of underling makes it busy too
+                new_amount = self._get_read_amount()
+                if had_points or new_amount != read_amount:
+                    empty_passes = 0
+                else:
+                    empty_passes += 1
+                read_amount = new_amount
+
+                idle = empty_passes > 1  # there was a wait for interval between empty passes
+                conn.send((self.PASS, (idle, self._get_progress())))
+                if final_pass:
+                    break
+
+                if empty_passes:
+                    self._final_pass.wait(self.interval)
+
+            conn.send((self.DONE, None))
+        except BaseException as exc:
+            try:
+                pickle.dumps(exc)
+            except BaseException:
+                exc = TaurusInternalException("Failed to read %s: %s" % (self.underling, traceback.format_exc()))
+            conn.send((self.ERROR, exc))
+        finally:
+            self.underling.listeners = listeners
+            conn.close()
+
+    def _get_read_amount(self):
+        read_bytes = sum(file_reader.offset for file_reader in self.underling.get_file_readers())
+        return read_bytes, getattr(self.underling, "read_records", None)
+
+    def _get_progress(self):
+        progress = {
+            "buffer": list(getattr(self.underling, "buffer", {})),
+            "files": [file_reader.name for file_reader in self.underling.get_file_readers()],
+        }
+        if hasattr(self.underling, "read_records"):
+            progress["read_records"] = self.underling.read_records
+        return progress
+
+    def _set_progress(self, progress):
+        if "read_records" in progress:
+            self.underling.read_records = progress["read_records"]
+        if hasattr(self.underling, "buffer"):
+            self.underling.buffer = dict.fromkeys(progress["buffer"])  # only timestamps are known here
+
+        # some readers find their files when open them, e.g. Gatling's simulation.log
+        for file_reader, name in zip(self.underling.get_file_readers(), progress["files"]):
+            file_reader.name = name
+
+    def _receive(self, block=False):
+        while not self.finished and (block or self._conn.poll()):
+            try:
+                kind, payload = self._conn.recv()
+            except EOFError:
+                kind, payload = self.ERROR, TaurusInternalException("Reader process of %s died" % self.underling)
+
+            if kind == self.POINT:
+                self._add_point(PointPacker.unpack_point(payload))
+            elif kind == self.PASS:
+                self.idle, progress = payload
+                self._set_progress(progress)
+            else:
+                self.error = payload if kind == self.ERROR else None
+                self.finished = True
+
+    def _add_point(self, point):
+        self._fold_keys(point)
+        self.underling._add_to_cumulative(point)
+        for listener in self.underling.listeners:
+            listener.aggregated_second(point)
+
+        self.watermark = point[DataPoint.TIMESTAMP]
+        self.idle = False
+        self.points.append(point)
+
+    def _fold_keys(self, point):
+        """
+        Fold labels and error messages of datapoint the same way underling does when it's read in engine process
+
+        :type point: DataPoint
+        """
+        current = point[DataPoint.CURRENT]
+        point[DataPoint.CURRENT] = {}
+        for label, kpiset in iteritems(current):
+            errors = kpiset[KPISet.ERRORS]
+            kpiset[KPISet.ERRORS] = []
+            for error in errors:
+                error["msg"] = self.underling._fold_error(error["msg"])
+                KPISet.inc_list(kpiset[KPISet.ERRORS], ("msg", error["msg"]), error)
+
+            if label and self.underling.generalize_labels:
+                label = self._fold_label(label)
+
+            if label in point[DataPoint.CURRENT]:
+                point[DataPoint.CURRENT][label].merge_kpis(kpiset, same_sources=True)
+            else:
+                point[DataPoint.CURRENT][label] = kpiset
+
+        point.recalculate()
+
+    def _fold_label(self, label):
+        if isinstance(self.underling, ResultsReader) and self.underling._redundant_aggregation:
+            base_label, _, state = label.rpartition('-')  # see ResultsReader.get_mixed_label()
+            return self.underling._generalize_label(base_label) + '-' + state
+
+        return self.underling._generalize_label(label)
+
+    def is_reported(self, timestamp):
+        """
+        Check that no more datapoints up to timestamp are expected
+        """
+        if self.finished or self.idle:
+            return True
+
+        if self.watermark is not None and self.watermark >= timestamp:
+            return True
+
+        buffer = getattr(self.underling, "buffer", None)  # timestamps that worker has read, but not reported yet
+        return bool(buffer) and min(buffer) > timestamp
+
+    def request_final_pass(self):
+        self._final_pass.set()
+
+    def stop(self):
+        """
+        Wait for final pass of reader and take the rest of datapoints
+        """
+        self.request_final_pass()
+        self._receive(block=True)
+        self.process.join()
+        self._conn.close()
+
+    def get_points(self):
+        """
+        Take datapoints received so far, reraise reading failure if any
+
+        :rtype: list[DataPoint]
+        """
+        self._receive()
+        if self.error is not None:
+            raise self.error
+
+        points = []
+        while self.points:
+            points.append(self.points.popleft())
+        return points
+
+
 class ConsolidatingAggregator(Aggregator, ResultsProvider):
     """
 
@@ -879,6 +1868,8 @@ class ConsolidatingAggregator(Aggregator, ResultsProvider):
         self.generalize_labels = 500
         self.ignored_labels = ["ignore"]
         self.underlings = []
+        self.parallel_reading = False
+        self._readers = {}
         self.buffer = {}
         self.histogram_max = 5.0
         self._sticky_concurrencies = {}
@@ -963,6 +1954,11 @@ class ConsolidatingAggregator(Aggregator, ResultsProvider):
         self.log.debug(debug_str, self.buffer_scale_idx, self.track_percentiles)
         self.histogram_max = dehumanize_time(self.settings.get("histogram-initial", self.histogram_max))
         self.max_error_count = self.settings.get("max-error-variety", self.max_error_count)
+        self.parallel_reading = self.settings.get("parallel-reading", self.parallel_reading)
+        if self.parallel_reading and not is_linux():
+            # workers are forked from engine process that already runs threads, it's unsafe on MacOS
+            self.log.warning("Parallel reading of results is supported on Linux only")
+            self.parallel_reading = False
 
     def startup(self):
         super(Aggregator, self).startup()
@@ -994,6 +1990,12 @@ class ConsolidatingAggregator(Aggregator, ResultsProvider):
 
         self.underlings.append(underling)
 
+    def get_data_files(self):
+        filenames = []
+        for underling in self.underlings:
+            filenames.extend(underling.get_data_files())
+        return filenames
+
     def check(self):
         """
         Check if there is next aggregate data present
@@ -1013,12 +2015,50 @@ class ConsolidatingAggregator(Aggregator, ResultsProvider):
         for point in self.datapoints(True):
             self.log.debug("Processed datapoint: %s/%s", point[DataPoint.TIMESTAMP], point[DataPoint.SOURCE_ID])
 
+        for name, keys in (("Labels", self.known_labels), ("Errors", self.known_errors)):
+            self.log.debug("%s generalization: %s known, %s memo hits, %s misses", name, len(keys), keys.hits,
+                           keys.misses)
+
+    def _start_readers(self):
+        context = multiprocessing.get_context("fork")
+        for underling in self.underlings:
+            # readers that get files or settings from executor during the run have to stay in engine process
+            if underling not in self._readers and isinstance(underling, (ResultsReader, KPIFramesReader)):
+                self.log.debug("Starting reader process for %s", underling)
+                self._readers[underling] = UnderlingReader(underling, self.engine.check_interval, context)
+
+    def _stop_readers(self):
+        for reader in self._readers.values():
+            reader.request_final_pass()
+
+        for reader in self._readers.values():
+            reader.stop()
+
+    def _process_readers(self, final_pass):
+        if final_pass:
+            self._stop_readers()
+        else:
+            self._start_readers()
+
+        for reader in self._readers.values():
+            for point in reader.get_points():
+                self._put_into_buffer(point)
+
+    def _is_reported(self, timestamp):
+        return all(reader.is_reported(timestamp) for reader in self._readers.values())
+
     def _process_underlings(self, final_pass):
+        if self.parallel_reading:
+            self._process_readers(final_pass)
+
         time_start = time.time()
         has_some_time = lambda x: time.time() - x < self.engine.check_interval
         while final_pass or has_some_time(time_start):
             had_data = False
             for underling in self.underlings:
+                if underling in self._readers:
+                    continue
+
                 for point in underling.datapoints(final_pass):
                     had_data = True
                     self._put_into_buffer(point)
@@ -1058,6 +2098,10 @@ class ConsolidatingAggregator(Aggregator, ResultsProvider):
 
         timestamps = sorted(self.buffer.keys())
         while timestamps and (final_pass or (timestamps[-1] >= timestamps[0] + self.buffer_len)):
+            if not final_pass and not self._is_reported(timestamps[0]):
+                self.log.debug("Waiting for reader processes to report %s", timestamps[0])
+                break
+
             tstamp = timestamps.pop(0)
             self.log.debug("Merging into %s", tstamp)
             points_to_consolidate = self.buffer.pop(tstamp)
@@ -16,10 +16,12 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import copy
+import json
 import logging
 import os
 import platform
 import sys
+import threading
 import time
 import traceback
 import zipfile
@@ -33,6 +35,7 @@ from bzt import TaurusInternalException, TaurusConfigError, TaurusNetworkError
 from bzt.bza import User, Session, Test
 from bzt.engine import Reporter, Singletone
 from bzt.utils import b, humanize_bytes, iteritems, open_browser, BetterDict, to_json, dehumanize_time
+from bzt.utils import BackgroundWorker, ComplexEncoder
 from bzt.modules.aggregator import AggregatorListener, DataPoint, KPISet, ResultsProvider, ConsolidatingAggregator
 from bzt.modules.monitoring import Monitoring, MonitoringListener
 from bzt.modules.blazemeter.project_finder import ProjectFinder
@@ -53,10 +56,14 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
         self.browser_open = 'start'
         self.kpi_buffer = []
         self.send_interval = 30
+        self.sender = None  # :type: BackgroundWorker
+        self._pending = set()  # kinds of data submitted to sender and not picked up yet
+        self._session_lock = threading.RLock()  # sender thread and engine thread share the session
         self._last_status_check = time.time()
         self.send_data = True
         self.upload_artifacts = True
         self.send_monitoring = True
+        self.compress_kpi = False
         self.monitoring_buffer = None
         self.public_report = False
         self.last_dispatch = 0
@@ -78,12 +85,18 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
 
         self.send_interval = dehumanize_time(self.settings.get("send-interval", self.send_interval))
         self.send_monitoring = self.settings.get("send-monitoring", self.send_monitoring)
+        if self.settings.get("send-in-background", False):
+            self.sender = BackgroundWorker("BlazeMeterSender", self.log)
+            self.engine.background_workers.append(self.sender)
         monitoring_buffer_limit = self.settings.get("monitoring-buffer-limit", 500)
         self.monitoring_buffer = MonitoringBuffer(monitoring_buffer_limit, self.log)
         self.browser_open = self.settings.get("browser-open", self.browser_open)
         self.public_report = self.settings.get("public-report", self.public_report)
         self.upload_artifacts = self.parameters.get("upload-artifacts", self.upload_artifacts)
         self._dpoint_serializer.multi = self.settings.get("report-times-multiplier", self._dpoint_serializer.multi)
+        self._dpoint_serializer.changed_only = self.settings.get("send-changed-labels-only",
+                                                                 self._dpoint_serializer.changed_only)
+        self.compress_kpi = self.settings.get("compress-kpi-data", self.compress_kpi)
         token = self.settings.get("token", "")
         if not token:
             self.log.warning("No BlazeMeter API key provided, will upload anonymously")
@@ -143,6 +156,8 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
         """
         super(BlazeMeterUploader, self).startup()
         self._user.log = self.log.getChild(self.__class__.__name__)
+        if self.sender:
+            self.sender.start()
 
         if not self._session:
             url = self._start_online()
@@ -249,16 +264,29 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
             return
 
         self.log.debug("KPI bulk buffer len in post-proc: %s", len(self.kpi_buffer))
-        try:
-            self.log.info("Sending remaining KPI data to server...")
-            if self.send_data:
-                self.__send_data(self.kpi_buffer, False, True)
-                self.kpi_buffer = []
+        if self.sender:
+            self.log.debug("Waiting for %s background sending tasks...", self.sender.queue_depth)
+            if not self.sender.stop(timeout=self._user.timeout * 2):
+                # nothing must be sent after final data, only running task is waited for with session lock
+                dropped = self.sender.clear()
+                self.log.warning("Background sending hasn't finished in time, %s data portions dropped", dropped)
+            try:
+                self.sender.check()
+            except BaseException as exc:
+                self.log.warning("Background sending failed: %s", exc)
+            self.sender = None
 
-            if self.send_monitoring:
-                self.__send_monitoring()
-        finally:
-            self._postproc_phase2()
+        with self._session_lock:  # unfinished background task may still use the session
+            try:
+                self.log.info("Sending remaining KPI data to server...")
+                if self.send_data:
+                    self.__send_data(self.kpi_buffer, False, True)
+                    self.kpi_buffer = []
+
+                if self.send_monitoring:
+                    self.__send_monitoring()
+            finally:
+                self._postproc_phase2()
 
         if self.results_url:
             if self.browser_open in ('end', 'both'):
@@ -335,16 +363,34 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
         Send data if any in buffer
         """
         self.log.debug("KPI bulk buffer len: %s", len(self.kpi_buffer))
+        if self.sender:
+            self.sender.check()
+
         if self.last_dispatch < (time.time() - self.send_interval):
             self.last_dispatch = time.time()
             if self.send_data and len(self.kpi_buffer):
-                self.__send_data(self.kpi_buffer)
-                self.kpi_buffer = []
+                if 'kpi' in self._pending:  # keep data in buffer, it'll be merged into the next batch
+                    self.log.debug("Previous KPI batch is still waiting for sending")
+                else:
+                    self.__send_data(self.kpi_buffer)
+                    self.kpi_buffer = []
 
-            if self.send_monitoring:
+            if self.send_monitoring and 'monitoring' not in self._pending:
                 self.__send_monitoring()
         return super(BlazeMeterUploader, self).check()
 
+    def __submit(self, kind, func, *args, **kwargs):
+        """
+        Send data in background, only one task of each kind can wait in sender queue
+        """
+        self._pending.add(kind)
+        self.sender.submit(self.__send_in_background, kind, func, *args, **kwargs)
+
+    def __send_in_background(self, kind, func, *args, **kwargs):
+        self._pending.discard(kind)
+        with self._session_lock:
+            func(*args, **kwargs)
+
     def __send_data(self, data, do_check=True, is_final=False):
         """
         :type data: list[bzt.modules.aggregator.DataPoint]
@@ -355,7 +401,10 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
         self.engine.aggregator.converter(data)
         serialized = self._dpoint_serializer.get_kpi_body(data, is_final)
 
-        self._session.send_kpi_data(serialized, do_check)
+        if self.sender and not is_final:
+            self.__submit('kpi', self._session.send_kpi_data, serialized, do_check, compress=self.compress_kpi)
+        else:
+            self._session.send_kpi_data(serialized, do_check, compress=self.compress_kpi)
 
     def aggregated_second(self, data):
         """
@@ -374,7 +423,10 @@ class BlazeMeterUploader(Reporter, AggregatorListener, MonitoringListener, Singl
         if not engine_id:
             engine_id = "0"
         data = self.monitoring_buffer.get_monitoring_json(self._session)
-        self._session.send_monitoring_data(engine_id, data)
+        if self.sender:
+            self.__submit('monitoring', self._session.send_monitoring_data, engine_id, data)
+        else:
+            self._session.send_monitoring_data(engine_id, data)
 
     def __format_listing(self, zip_listing):
         lines = []
@@ -529,6 +581,7 @@ class DatapointSerializer(object):
         super(DatapointSerializer, self).__init__()
         self.owner = owner
         self.multi = 1000  # miltiplier factor for reporting
+        self.changed_only = True  # send only labels that got new samples since previous report
 
     def get_kpi_body(self, data_buffer, is_final):
         # - reporting format:
@@ -540,33 +593,69 @@ class DatapointSerializer(object):
         #
         # - elements of 'intervals' are described in __get_interval()
         #   every interval contains info about response codes that were received on it.
-        report_items = BetterDict()
-        if data_buffer:
-            self.owner.first_ts = min(self.owner.first_ts, data_buffer[0][DataPoint.TIMESTAMP])
-            self.owner.last_ts = max(self.owner.last_ts, data_buffer[-1][DataPoint.TIMESTAMP])
+        started = time.time()
+        labels_count = 0
+        chunks = []
+        for label_json in self.__get_labels_json(data_buffer, is_final):
+            if labels_count:
+                chunks.append(",")
+            chunks.append(label_json)
+            labels_count += 1
+
+        tail = {"sourceID": id(self.owner)}
+        if is_final:
+            tail['final'] = True
 
-            # following data is received in the cumulative way
-            for label, kpi_set in iteritems(data_buffer[-1][DataPoint.CUMULATIVE]):
-                report_item = self.__get_label(label, kpi_set)
-                self.__add_errors(report_item, kpi_set)  # 'Errors' tab
-                report_items[label] = report_item
+        body = '{"labels":[' + "".join(chunks) + "]," + self.__dumps(tail)[1:]
+        self.owner.log.debug("KPI body for %s labels: %s bytes, serialized in %.3fs",
+                             labels_count, len(body), time.time() - started)
+        return body
+
+    @staticmethod
+    def __dumps(obj):
+        return json.dumps(obj, separators=(',', ':'), cls=ComplexEncoder)
+
+    def __get_labels_json(self, data_buffer, is_final):
+        """
+        Serialize labels one by one, so only one of them is kept in form of dicts at a time.
+        Only the labels that got new samples are sent, unless it's final report or changed_only is off
+        """
+        if not data_buffer:
+            return
+
+        self.owner.first_ts = min(self.owner.first_ts, data_buffer[0][DataPoint.TIMESTAMP])
+        self.owner.last_ts = max(self.owner.last_ts, data_buffer[-1][DataPoint.TIMESTAMP])
+
+        # following data is received in the cumulative way
+        cumulative = data_buffer[-1][DataPoint.CUMULATIVE]
+        if not cumulative:
+            return
+
+        changed = set()
+        for dpoint in data_buffer:
+            changed.update(dpoint[DataPoint.CURRENT].keys())
+
+        if not changed.issubset(cumulative.keys()):
+            raise TaurusInternalException('Cumulative KPISet is non-consistent')
+
+        if self.changed_only and not is_final:
+            labels = changed
+        else:
+            labels = cumulative.keys()
+
+        for label in sorted(labels):
+            kpi_set = cumulative[label]
+            report_item = self.__get_label(label, kpi_set)
+            self.__add_errors(report_item, kpi_set)  # 'Errors' tab
 
             # fill 'Timeline Report' tab with intervals data
             # intervals are received in the additive way
-            if report_items:
-                for dpoint in data_buffer:
-                    time_stamp = dpoint[DataPoint.TIMESTAMP]
-                    for label, kpi_set in iteritems(dpoint[DataPoint.CURRENT]):
-                        exc = TaurusInternalException('Cumulative KPISet is non-consistent')
-                        report_item = report_items.get(label, exc)
-                        report_item['intervals'].append(self.__get_interval(kpi_set, time_stamp))
-
-        report_items = [report_items[key] for key in sorted(report_items.keys())]  # convert dict to list
-        data = {"labels": report_items, "sourceID": id(self.owner)}
-        if is_final:
-            data['final'] = True
+            for dpoint in data_buffer:
+                if label in dpoint[DataPoint.CURRENT]:
+                    interval = self.__get_interval(dpoint[DataPoint.CURRENT][label], dpoint[DataPoint.TIMESTAMP])
+                    report_item['intervals'].append(interval)
 
-        return to_json(data)
+            yield self.__dumps(report_item)
 
     @staticmethod
     def __add_errors(report_item, kpi_set):
@@ -647,10 +736,13 @@ class DatapointSerializer(object):
         #   {'n': <number of code encounters>,
         #    'f': <number of failed request (e.q. important for assertions)>
         #    'rc': <string value of response code>}
+        rc_failures = defaultdict(list)
+        for err in item[KPISet.ERRORS]:
+            rc_failures[str(err['rc'])].append(err['cnt'])
+
         rc_list = []
         for r_code, cnt in iteritems(item[KPISet.RESP_CODES]):
-            fails = [err['cnt'] for err in item[KPISet.ERRORS] if str(err['rc']) == r_code]
-            rc_list.append({"n": cnt, 'f': fails, "rc": r_code})
+            rc_list.append({"n": cnt, 'f': rc_failures.get(r_code, []), "rc": r_code})
 
         return {
             "ec": item[KPISet.FAILURES],
@@ -29,7 +29,7 @@ from bzt import TaurusInternalException
 from bzt.utils import numeric_types
 from logging import StreamHandler
 from urwid import LineBox, ListBox, RIGHT, CENTER, BOTTOM, CLIP, GIVEN, ProgressBar
-from urwid import Text, Pile, WEIGHT, Filler, Columns, Widget, CanvasCombine
+from urwid import Text, Pile, WEIGHT, Filler, Columns, Widget, CanvasCombine, BaseScreen
 from urwid.decoration import Padding
 from urwid.font import Thin6x6Font
 from urwid.graphics import BigText
@@ -39,9 +39,47 @@ from urwid.widget import Divider
 from bzt.engine import Reporter, Singletone, ScenarioExecutor
 from bzt.modules.aggregator import DataPoint, KPISet, AggregatorListener, ResultsProvider
 from bzt.modules.provisioning import Local
-from bzt.utils import humanize_time, is_windows, DummyScreen
+from bzt.utils import humanize_time, is_windows, LOG
 from bzt.resources.version import VERSION
 
+
+class DummyScreen(BaseScreen):
+    """
+    Null-object for Screen on non-tty output
+    """
+
+    def __init__(self, rows=120, cols=40):
+        super(DummyScreen, self).__init__()
+        self.size = (rows, cols)
+        self.ansi_escape = re.compile(r'\x1b[^m]*m')
+
+    def get_cols_rows(self):
+        """
+        Dummy cols and rows
+
+        :return:
+        """
+        return self.size
+
+    def draw_screen(self, size, canvas):
+        """
+
+        :param size:
+        :type canvas: urwid.Canvas
+        """
+        data = ""
+        for char in canvas.content():
+            line = ""
+            for part in char:
+                if isinstance(part[2], str):
+                    line += part[2]
+                else:
+                    line += part[2].decode()
+            data += "%s│\n" % line
+        data = self.ansi_escape.sub('', data)
+        LOG.info("Screen %sx%s chars:\n%s", size[0], size[1], data)
+
+
 try:
     from bzt.modules.screen import GUIScreen
 except ImportError:
@@ -17,7 +17,7 @@ from abc import abstractmethod
 
 from bzt.engine import Aggregator
 from bzt.modules.aggregator import ResultsReader
-from bzt.utils import BetterDict, iteritems, LDJSONReader
+from bzt.utils import BetterDict, iteritems, LDJSONReader, FileReader
 
 
 class FunctionalAggregator(Aggregator):
@@ -56,6 +56,12 @@ class FunctionalAggregator(Aggregator):
             for listener in self.listeners:
                 listener.aggregated_results(new_results, self.cumulative_results)
 
+    def get_data_files(self):
+        filenames = []
+        for reader in self.underlings:
+            filenames.extend(reader.get_data_files())
+        return filenames
+
     def check(self):
         self.process_readers()
         return False
@@ -133,6 +139,25 @@ class FunctionalResultsReader(object):
         """Yields functional samples"""
         yield
 
+    def get_file_readers(self):
+        """
+        Readers of files that reader takes data from, most readers keep FileReader in 'file' field
+
+        :rtype: list[FileReader]
+        """
+        file_reader = getattr(self, "file", None)
+        if isinstance(file_reader, FileReader):
+            return [file_reader]
+        return []
+
+    def get_data_files(self):
+        """
+        Names of files that reader reads
+
+        :rtype: list[str]
+        """
+        return [file_reader.name for file_reader in self.get_file_readers()]
+
 
 class FunctionalAggregatorListener(object):
     @abstractmethod
@@ -179,6 +204,9 @@ class TestReportReader(object):
                 return parts[2]
         return label
 
+    def get_file_readers(self):
+        return [self.json_reader.file]
+
     def process_path(self, path):
         if isinstance(path, dict):
             test_suite = ".".join(part["value"] for part in path[:-1])
@@ -209,6 +237,9 @@ class LoadSamplesReader(ResultsReader):
         self.report_reader = TestReportReader(filename, parent_logger)
         self.read_records = 0
 
+    def get_file_readers(self):
+        return self.report_reader.get_file_readers()
+
     def extract_sample(self, item):
         if item["status"] == 'SKIPPED':
             return  # we ignore skipped samples to not skew results
@@ -241,6 +272,9 @@ class FuncSamplesReader(FunctionalResultsReader):
         self.engine = engine
         self.read_records = 0
 
+    def get_file_readers(self):
+        return self.report_reader.get_file_readers()
+
     def _write_sample_data_to_artifacts(self, sample_extras):
         if not sample_extras:
             return
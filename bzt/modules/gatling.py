@@ -292,6 +292,9 @@ class GatlingExecutor(ScenarioExecutor):
         cp.extend(self.settings.get("additional-classpath", []))
         return cp
 
+    def is_prepare_independent(self):
+        return True
+
     def prepare(self):
         super(GatlingExecutor, self).prepare()
 
@@ -468,8 +471,9 @@ class GatlingExecutor(ScenarioExecutor):
         required_tools = [self._get_tool(TclLibrary), java, self.tool]
 
         for tool in required_tools:
-            if not tool.check_if_installed():
-                tool.install()
+            with tool.get_lock():
+                if not tool.check_if_installed():
+                    tool.install()
 
     def get_widget(self):
         if not self.widget:
@@ -522,7 +526,6 @@ class DataLogReader(ResultsReader):
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.basedir = basedir
         self.file = FileReader(file_opener=self.open_fds, parent_logger=self.log)
-        self.partial_buffer = ""
         self.delimiter = "\t"
         self.dir_prefix = dir_prefix
         self.guessed_gatling_version = None
@@ -655,16 +658,9 @@ class DataLogReader(ResultsReader):
 
         :param last_pass:
         """
-        lines = self.file.get_lines(size=1024 * 1024, last_pass=last_pass)
+        lines = self.file.get_complete_lines(size=1024 * 1024, last_pass=last_pass)
 
         for line in lines:
-            if not line.endswith("\n"):
-                self.partial_buffer += line
-                continue
-
-            line = "%s%s" % (self.partial_buffer, line)
-            self.partial_buffer = ""
-
             line = line.strip()
             fields = line.split(self.delimiter)
 
@@ -723,6 +719,9 @@ class Gatling(RequiredTool):
         self.tool_dir = get_full_path(self.tool_path, step_up=2)
 
     def check_if_installed(self):
+        if self._get_probe() is not None:
+            return True
+
         self.log.debug("Trying Gatling...")
         try:
             out, err = self.call([self.tool_path, '--help'])
@@ -733,6 +732,7 @@ class Gatling(RequiredTool):
 
         if err:
             self.log.warning("Gatling check stderr: %s", err)
+        self._save_probe()
         return True
 
     def install(self):
@@ -23,27 +23,27 @@ import os
 import re
 import socket
 import tempfile
+import threading
 import time
 import traceback
-from collections import Counter, namedtuple
-from distutils.version import LooseVersion
+from collections import Counter, namedtuple, deque
 from itertools import dropwhile
 from io import StringIO
 
-from cssselect import GenericTranslator
+import numpy
 from lxml import etree
 
 from bzt import TaurusConfigError, ToolError, TaurusInternalException, TaurusNetworkError
 from bzt.engine import Scenario, ScenarioExecutor
 from bzt.engine import SETTINGS
-from bzt.jmx import JMX, JMeterScenarioBuilder, LoadSettingsProcessor, try_convert
-from bzt.modules.aggregator import ResultsReader, DataPoint, KPISet
+from bzt.jmx import JMX, JMeterScenarioBuilder, LoadSettingsProcessor, try_convert, compile_selector
+from bzt.modules.aggregator import ResultsReader, DataPoint, KPISet, SamplesBlock
 from bzt.modules.console import ExecutorWidget
 from bzt.modules.functional import FunctionalResultsReader, FunctionalSample
 from bzt.requests_model import ResourceFilesCollector, has_variable_pattern, HierarchicRequestParser
 from bzt.utils import iteritems, numeric_types, unicode_decode
 from bzt.utils import get_full_path, EXE_SUFFIX, MirrorsManager, ExceptionalDownloader, get_uniq_name, is_windows
-from bzt.utils import BetterDict, guess_csv_dialect, dehumanize_time, CALL_PROBLEMS
+from bzt.utils import BetterDict, guess_csv_dialect, dehumanize_time, CALL_PROBLEMS, LooseVersion
 from bzt.utils import unzip, RequiredTool, JavaVM, shutdown_process, ProgressBarContext, TclLibrary, FileReader
 
 
@@ -90,6 +90,7 @@ class JMeterExecutor(ScenarioExecutor):
     :type sys_properties_file: str
     """
     UDP_PORT_NUMBER = None
+    UDP_PORT_LOCK = threading.Lock()
 
     def __init__(self):
         super(JMeterExecutor, self).__init__()
@@ -200,6 +201,10 @@ class JMeterExecutor(ScenarioExecutor):
 
         return JMeter.VERSION
 
+    def is_prepare_independent(self):
+        # version detected from script is written into module settings shared by all executions
+        return self.settings.get("version", JMeter.VERSION) != "auto"
+
     def prepare(self):
         """
         Preparation for JMeter involves either getting existing JMX
@@ -262,6 +267,7 @@ class JMeterExecutor(ScenarioExecutor):
             err_msg_separator = self.settings.get("error-message-separator")
             self.reader = JTLReader(self.kpi_jtl, self.log, self.log_jtl, err_msg_separator)
             self.reader.is_distributed = len(self.distributed_servers) > 0
+            self.reader.columnar = self.settings.get("columnar-reader", False)
             assert isinstance(self.reader, JTLReader)
             self.engine.aggregator.add_underling(self.reader)
 
@@ -412,7 +418,10 @@ class JMeterExecutor(ScenarioExecutor):
         set management udp port
         :return:
         """
+        with JMeterExecutor.UDP_PORT_LOCK:
+            self.__set_remote_port()
 
+    def __set_remote_port(self):
         if not JMeterExecutor.UDP_PORT_NUMBER:
             JMeterExecutor.UDP_PORT_NUMBER = self.settings.get("shutdown-port", 4445)
         else:
@@ -450,12 +459,11 @@ class JMeterExecutor(ScenarioExecutor):
         :param jmx: JMX
         :return:
         """
-        sel = 'stringProp[name=filename]'
-        xpath = GenericTranslator().css_to_xpath(sel)
+        xpath = compile_selector('stringProp[name=filename]')
 
         listeners = jmx.get('ResultCollector')
         for listener in listeners:
-            file_setting = listener.xpath(xpath)
+            file_setting = xpath(listener)
             if not file_setting or not file_setting[0].text:
                 listener.set("enabled", "false")
 
@@ -566,9 +574,8 @@ class JMeterExecutor(ScenarioExecutor):
         return jmx
 
     def __force_hc4_cookie_handler(self, jmx):
-        selector = "[testclass=CookieManager]"
         fix_counter = 0
-        for node in jmx.get(selector):
+        for node in jmx.get_by_attr('testclass', 'CookieManager'):
             name = "CookieManager.implementation"
             if not node.get(name):
                 val = "org.apache.jmeter.protocol.http.control.HC4CookieHandler"
@@ -772,12 +779,13 @@ class JMeterExecutor(ScenarioExecutor):
         if not isinstance(items, list):
             modifs[action] = [items]
             items = modifs[action]
+        state = 'true' if action == 'enable' else 'false'
         for name in items:
-            candidates = jmx.get("[testname]")
-            for candidate in candidates:
-                if fnmatch.fnmatch(candidate.get('testname'), name):
-                    jmx.set_enabled("[testname='%s']" % candidate.get('testname'),
-                                    True if action == 'enable' else False)
+            for testname in fnmatch.filter(jmx.get_attr_values('testname'), name):
+                elements = jmx.get_by_attr('testname', testname)
+                self.log.debug("Set enabled=%s for elements '%s': %s", state, testname, elements)
+                for element in elements:
+                    element.set('enabled', state)
 
     def install_required_tools(self):
         """
@@ -787,8 +795,9 @@ class JMeterExecutor(ScenarioExecutor):
 
         required_tools = [self._get_tool(JavaVM), self._get_tool(TclLibrary), self.tool]
         for tool in required_tools:
-            if not tool.check_if_installed():
-                tool.install()
+            with tool.get_lock():
+                if not tool.check_if_installed():
+                    tool.install()
 
         self.settings['path'] = self.tool.tool_path
 
@@ -834,9 +843,10 @@ class JTLReader(ResultsReader):
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.csvreader = IncrementalCSVReader(self.log, filename)
         self.read_records = 0
+        self.columnar = False
         if errors_filename:
-            self.errors_reader = JTLErrorsReader(
-                errors_filename, parent_logger, err_msg_separator, label_converter=self.get_mixed_label)
+            self.errors_reader = JTLErrorsReader(errors_filename, parent_logger, err_msg_separator,
+                                                 label_converter=self.get_mixed_label, msg_converter=self._fold_error)
         else:
             self.errors_reader = None
 
@@ -845,6 +855,12 @@ class JTLReader(ResultsReader):
         if self.errors_reader:
             self.errors_reader.set_aggregation(aggregation)
 
+    def get_file_readers(self):
+        file_readers = [self.csvreader.file]
+        if self.errors_reader:
+            file_readers.append(self.errors_reader.file)
+        return file_readers
+
     def _read(self, last_pass=False):
         """
         Generator method that returns next portion of data
@@ -854,6 +870,12 @@ class JTLReader(ResultsReader):
         if self.errors_reader:
             self.errors_reader.read_file(last_pass)
 
+        if self.columnar:
+            block = self._read_block(last_pass)
+            if block:
+                yield block
+            return
+
         for row in self.csvreader.read(last_pass):
             label = unicode_decode(row["label"])
             if self.is_distributed:
@@ -885,6 +907,57 @@ class JTLReader(ResultsReader):
             self.read_records += 1
             yield tstmp, label, concur, rtm, cnn, ltc, rcd, error, trname, byte_count
 
+    def _read_block(self, last_pass=False):
+        """
+        Read all new rows at once and convert them column by column
+
+        :type last_pass: bool
+        :rtype: SamplesBlock
+        """
+        columns = self.csvreader.read_columns(last_pass)
+        if not columns:
+            return None
+
+        count = len(columns["timeStamp"])
+        if self.is_distributed:
+            concur = columns["grpThreads"].astype(numpy.int64)
+            trname = numpy.array([host + thread[:thread.rfind('-')] for host, thread in
+                                  zip(columns["Hostname"], columns["threadName"])], dtype=object)
+        else:
+            concur = columns["allThreads"].astype(numpy.int64)
+            if self._redundant_aggregation:
+                trname = columns["threadName"]
+            else:
+                trname = numpy.full(count, "", dtype=object)
+
+        if "Connect" in columns:
+            cnn = columns["Connect"].astype(numpy.int64) / 1000.0
+        else:
+            cnn = numpy.zeros(count)
+
+        codes, inverse = SamplesBlock.factorize(columns["responseCode"])
+        codes = numpy.array([rcd.split('.')[-1] if rcd.endswith('Exception') else rcd for rcd in codes], dtype=object)
+
+        errors = numpy.where(columns["success"] != "true", columns["responseMessage"], None)
+
+        if "bytes" in columns:
+            byte_count = columns["bytes"].astype(numpy.int64)
+        else:
+            byte_count = numpy.zeros(count, dtype=numpy.int64)
+
+        self.read_records += count
+        return SamplesBlock(
+            ts=columns["timeStamp"].astype(numpy.int64) // 1000,
+            label=columns["label"],
+            conc=concur,
+            rt=columns["elapsed"].astype(numpy.int64) / 1000.0,
+            cn=cnn,
+            lt=columns["Latency"].astype(numpy.int64) / 1000.0,
+            rc=codes[inverse],
+            error=errors,
+            trname=trname,
+            byte_count=byte_count)
+
     def _calculate_datapoints(self, final_pass=False):
         for point in super(JTLReader, self)._calculate_datapoints(final_pass):
             if self.errors_reader:
@@ -1125,9 +1198,9 @@ class IncrementalCSVReader(object):
         self.csv_reader = None
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.indexes = {}
-        self.partial_buffer = ""
         self.file = FileReader(filename=filename, parent_logger=self.log)
         self.read_speed = 1024 * 1024
+        self.skipped_rows = 0
 
     def read(self, last_pass=False):
         """
@@ -1135,27 +1208,70 @@ class IncrementalCSVReader(object):
         yield csv row
         :type last_pass: bool
         """
-        lines = self.file.get_lines(size=self.read_speed, last_pass=last_pass)
+        if self._read_lines(last_pass):
+            self.buffer.seek(0)
+            for row in self.csv_reader:
+                yield row
+
+            self.buffer.seek(0)
+            self.buffer.truncate(0)
+
+    def read_columns(self, last_pass=False):
+        """
+        read data from jtl as columns: dict of field name -> numpy array of strings
+        whole chunk is parsed at once, rows with wrong number of fields are skipped
+        :type last_pass: bool
+        :rtype: dict[str,numpy.ndarray]
+        """
+        data = self.file.get_complete_bytes(size=self.read_speed, last_pass=last_pass, quotechar=self._get_quotechar())
+        if not data:
+            return {}
+
+        self.log.debug("Read: %s bytes (at speed %s)", len(data), self.read_speed)
+        self._tune_speed(len(data))
+
+        if self.csv_reader is None:
+            header, data = data.split("\n", 1)
+            self._analyze_header(header + "\n")
+
+        width = len(self.csv_reader.fieldnames)
+        rows = []
+        skipped = 0
+        for row in csv.reader(StringIO(data), self.csv_reader.dialect):
+            if len(row) == width:
+                rows.append(row)
+            elif row:  # empty lines are skipped by row reader as well
+                skipped += 1
+
+        if skipped:
+            self.skipped_rows += skipped
+            self.log.warning("Skipped %s rows with wrong number of fields in %s (%s in total)",
+                             skipped, self.file.name, self.skipped_rows)
+
+        if not rows:
+            return {}
+
+        table = numpy.array(rows, dtype=object)
+        return {name: table[:, idx] for idx, name in enumerate(self.csv_reader.fieldnames)}
+
+    def _read_lines(self, last_pass):
+        """
+        put complete lines into buffer, detect csv dialect with header line
+
+        :type last_pass: bool
+        :return: number of lines read
+        """
+        lines = self.file.get_complete_lines(size=self.read_speed, last_pass=last_pass, quotechar=self._get_quotechar())
 
         lines_read = 0
         bytes_read = 0
 
         for line in lines:
-            if not line.endswith("\n"):
-                self.partial_buffer += line
-                continue
-
-            line = "%s%s" % (self.partial_buffer, line)
-            self.partial_buffer = ""
-
             lines_read += 1
             bytes_read += len(line)
 
             if self.csv_reader is None:
-                dialect = guess_csv_dialect(line, force_doublequote=True)
-                self.csv_reader = csv.DictReader(self.buffer, [], dialect=dialect)
-                self.csv_reader.fieldnames += line.strip().split(self.csv_reader.dialect.delimiter)
-                self.log.debug("Analyzed header line: %s", self.csv_reader.fieldnames)
+                self._analyze_header(line)
                 continue
 
             self.buffer.write(line)
@@ -1164,12 +1280,18 @@ class IncrementalCSVReader(object):
             self.log.debug("Read: %s lines / %s bytes (at speed %s)", lines_read, bytes_read, self.read_speed)
             self._tune_speed(bytes_read)
 
-            self.buffer.seek(0)
-            for row in self.csv_reader:
-                yield row
+        return lines_read
 
-            self.buffer.seek(0)
-            self.buffer.truncate(0)
+    def _get_quotechar(self):
+        if self.csv_reader is None:
+            return b'"'  # header isn't analyzed yet
+        return self.csv_reader.dialect.quotechar.encode()
+
+    def _analyze_header(self, line):
+        dialect = guess_csv_dialect(line, force_doublequote=True)
+        self.csv_reader = csv.DictReader(self.buffer, [], dialect=dialect)
+        self.csv_reader.fieldnames += line.strip().split(self.csv_reader.dialect.delimiter)
+        self.log.debug("Analyzed header line: %s", self.csv_reader.fieldnames)
 
     def _tune_speed(self, bytes_read):
         if bytes_read >= self.read_speed:
@@ -1178,6 +1300,43 @@ class IncrementalCSVReader(object):
             self.read_speed = max(self.read_speed / 2, 1024 * 1024)
 
 
+class ErrorsTreeBuilder(object):
+    """
+    Parser target that builds top-level samples of errors.jtl one by one,
+    text of bulky elements (response bodies, headers etc.) is dropped without building it into tree
+    """
+    SKIPPED = {'responseData', 'samplerData', 'requestHeader', 'responseHeader', 'cookies', 'queryString'}
+
+    def __init__(self):
+        self.builder = etree.TreeBuilder()
+        self.depth = 0
+        self.skipping = 0
+        self.samples = []
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        if tag in self.SKIPPED:
+            self.skipping += 1
+        self.builder.start(tag, attrib)
+
+    def end(self, tag):
+        self.depth -= 1
+        if tag in self.SKIPPED:
+            self.skipping -= 1
+
+        elem = self.builder.end(tag)
+        if self.depth == 1:  # sample is complete, detach it from root to keep memory low
+            elem.getparent().remove(elem)
+            self.samples.append(elem)
+
+    def data(self, data):
+        if not self.skipping:
+            self.builder.data(data)
+
+    def close(self):
+        return self.builder.close()
+
+
 class JTLErrorsReader(object):
     """
     Reader for errors.jtl, which is in XML max-verbose format
@@ -1185,23 +1344,36 @@ class JTLErrorsReader(object):
     :type filename: str
     :type parent_logger: logging.Logger
     """
-    url_xpath = GenericTranslator().css_to_xpath("java\\.net\\.URL")
+    url_xpath = "descendant-or-self::java.net.URL"  # translation of CSS selector 'java\\.net\\.URL'
 
-    def __init__(self, filename, parent_logger, err_msg_separator=None, label_converter=None):
-        # http://stackoverflow.com/questions/9809469/python-sax-to-lxml-for-80gb-xml/9814580#9814580
+    def __init__(self, filename, parent_logger, err_msg_separator=None, label_converter=None, msg_converter=None):
         super(JTLErrorsReader, self).__init__()
         self.log = parent_logger.getChild(self.__class__.__name__)
-        self.parser = etree.XMLPullParser(events=('end',))
+        self.tree_builder = ErrorsTreeBuilder()
+        self.parser = etree.XMLParser(target=self.tree_builder, huge_tree=True)
         self.file = FileReader(filename=filename, parent_logger=self.log)
-        self.buffer = BetterDict()
+        self.buffer = {}
+        self.timeline = deque()  # sorted timestamps of buffer
         self.failed_processing = False
         self.err_msg_separator = err_msg_separator
         self.label_converter = label_converter
+        self.msg_converter = msg_converter
+        self.url_variety = 100
+        self.known_urls = {}
+        self.parsed_bytes = 0
+        self.parse_time = 0.0
         self._redundant_aggregation = False
 
     def set_aggregation(self, aggregation):
         self._redundant_aggregation = aggregation
 
+    @property
+    def throughput(self):
+        """
+        Parsing speed, bytes per second
+        """
+        return self.parsed_bytes / self.parse_time if self.parse_time else 0.0
+
     def read_file(self, final_pass=False):
         """
         Read the next part of the file
@@ -1213,8 +1385,7 @@ class JTLErrorsReader(object):
             if not read or not read.strip():
                 break
 
-            self.log.debug("Read bytes from error file: %s", len(read))
-
+            start = time.time()
             try:
                 self.parser.feed(read)
             except etree.XMLSyntaxError as exc:
@@ -1222,12 +1393,15 @@ class JTLErrorsReader(object):
                 self.log.debug("Error reading errors.jtl: %s", traceback.format_exc())
                 self.log.warning("Failed to parse errors XML: %s", exc)
 
-            for _, elem in self.parser.read_events():
-                if elem.getparent() is not None and elem.getparent().tag == 'testResults':
-                    self._parse_element(elem)
-                    elem.clear()  # cleanup processed from the memory
-                    while elem.getprevious() is not None:
-                        del elem.getparent()[0]
+            samples = self.tree_builder.samples
+            self.tree_builder.samples = []
+            for elem in samples:
+                self._parse_element(elem)
+
+            self.parse_time += time.time() - start
+            self.parsed_bytes += len(read)
+            self.log.debug("Read bytes from error file: %s, parsing speed: %.1f KB/s",
+                           len(read), self.throughput / 1024)
 
             if not final_pass:
                 break
@@ -1252,19 +1426,28 @@ class JTLErrorsReader(object):
         Get accumulated errors data up to specified timestamp
         """
         result = BetterDict()
-        for t_stamp in sorted(self.buffer.keys()):
-            if t_stamp >= max_ts + 1:
-                break
-            labels = self.buffer.pop(t_stamp)
+        while self.timeline and self.timeline[0] < max_ts + 1:
+            labels = self.buffer.pop(self.timeline.popleft())
             for label, label_data in iteritems(labels):
                 res = result.get(label, [], force_set=True)
                 for err_item in label_data:
-                    KPISet.inc_list(res, ('msg', err_item['msg']), err_item)
+                    self._merge_error(res, err_item)
 
         if result:
             self.log.debug("Got error info for %s, labels: %s", max_ts, result.keys())
         return result
 
+    def _get_buffer(self, t_stamp):
+        buf = self.buffer.get(t_stamp)
+        if buf is None:
+            buf = self.buffer[t_stamp] = {}
+            pos = len(self.timeline)
+            while pos and self.timeline[pos - 1] > t_stamp:  # unordered samples are close to the end
+                pos -= 1
+            self.timeline.insert(pos, t_stamp)
+
+        return buf
+
     def _extract_standard(self, elem):
         t_stamp = int(elem.get("ts")) / 1000.0
         label = elem.get("lb")
@@ -1285,12 +1468,37 @@ class JTLErrorsReader(object):
             else:
                 url_counts = Counter()
 
-        err_item = KPISet.error_item_skel(f_msg, f_rc, 1, f_type, url_counts, f_tag)
-        buf = self.buffer.get(t_stamp, force_set=True)
         if self._redundant_aggregation:
             label = self.label_converter(label=label, rc=r_code, msg=r_msg)
-        KPISet.inc_list(buf.get(label, [], force_set=True), ("msg", f_msg), err_item)
-        KPISet.inc_list(buf.get('', [], force_set=True), ("msg", f_msg), err_item)
+
+        if self.msg_converter:
+            f_msg = self.msg_converter(f_msg)
+
+        known_urls = self.known_urls.setdefault(label, set())
+        for url in list(url_counts):
+            if url not in known_urls:
+                if len(known_urls) < self.url_variety:
+                    known_urls.add(url)
+                else:
+                    del url_counts[url]
+
+        buf = self._get_buffer(t_stamp)
+        for key in (label, ''):
+            err_item = KPISet.error_item_skel(f_msg, f_rc, 1, f_type, Counter(url_counts), f_tag)
+            self._merge_error(buf.setdefault(key, []), err_item)
+
+    @staticmethod
+    def _merge_error(errors, err_item):
+        """
+        Cheaper version of KPISet.inc_list() for items owned by reader, they aren't copied
+        """
+        for item in errors:
+            if item['msg'] == err_item['msg']:
+                item['cnt'] += err_item['cnt']
+                item['urls'].update(err_item['urls'])
+                return
+
+        errors.append(err_item)
 
     def _extract_nonstandard(self, elem):
         t_stamp = int(elem.findtext("timeStamp")) / 1000.0
@@ -1438,6 +1646,9 @@ class JMeter(RequiredTool):
         return False
 
     def run_and_check(self):
+        if self._get_probe() is not None:
+            return True
+
         self.log.debug("Trying JMeter..")
         jmlog = tempfile.NamedTemporaryFile(prefix="jmeter", suffix="log", delete=False)
 
@@ -1455,6 +1666,7 @@ class JMeter(RequiredTool):
             jmlog.close()
 
         self.log.debug("JMeter check: %s / %s", out, err)
+        self._save_probe()
         return True
 
     def _pmgr_call(self, params):
@@ -1466,6 +1678,17 @@ class JMeter(RequiredTool):
             self.log.warning("Script %s not found" % jmx_file)
             return
 
+        with self.get_lock():  # plugins manager changes installation
+            self.__install_for_jmx(jmx_file)
+
+    def __install_for_jmx(self, jmx_file):
+        jmx_classes = self.__get_jmx_classes(jmx_file)
+        probe = self._get_probe() or {}
+        checked_classes = set(probe.get("jmx_classes", [])) if probe.get("plugins") == self.__get_plugins() else set()
+        if probe and jmx_classes <= checked_classes:
+            self.log.debug("Plugins for %s were detected and installed already", jmx_file)
+            return
+
         params = ["install-for-jmx", jmx_file]
 
         try:
@@ -1482,6 +1705,28 @@ class JMeter(RequiredTool):
         if out and "Plugins manager will apply some modifications" in out:
             time.sleep(5)  # allow for modifications to complete
 
+        plugins = self.__get_plugins()
+        if None not in jmx_classes:
+            if probe.get("plugins") == plugins:
+                jmx_classes |= checked_classes
+            self._save_probe(plugins=plugins, jmx_classes=sorted(jmx_classes))
+
+    @staticmethod
+    def __get_jmx_classes(jmx_file):
+        """
+        Plugins required by script are defined by classes of its elements
+        """
+        try:
+            return set(str(value) for value in etree.parse(jmx_file).xpath("//@testclass | //@guiclass"))
+        except etree.XMLSyntaxError:
+            return {None}  # let plugins manager deal with it, don't remember it
+
+    def __get_plugins(self):
+        ext_dir = os.path.join(get_full_path(self.tool_path, step_up=2), 'lib', 'ext')
+        if not os.path.isdir(ext_dir):
+            return []
+        return sorted(file_name for file_name in os.listdir(ext_dir) if file_name.endswith('.jar'))
+
     def __install_jmeter(self, dest):
         if self.download_link:
             jmeter_dist = self._download(use_link=True)
@@ -13,6 +13,8 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from collections import deque
+
 from bzt import TaurusConfigError, ToolError
 from bzt.modules import ScenarioExecutor
 from bzt.modules.console import ExecutorWidget
@@ -30,6 +32,9 @@ class K6Executor(ScenarioExecutor):
         self.k6 = None
         self.kpi_file = None
 
+    def is_prepare_independent(self):
+        return True
+
     def prepare(self):
         super(K6Executor, self).prepare()
         self.install_required_tools()
@@ -91,86 +96,78 @@ class K6Executor(ScenarioExecutor):
     def install_required_tools(self):
         self.k6 = self._get_tool(K6, config=self.settings)
         self.k6.tool_name = self.k6.tool_name.lower()
-        if not self.k6.check_if_installed():
-            self.k6.install()
+        with self.k6.get_lock():
+            if not self.k6.check_if_installed():
+                self.k6.install()
 
     def resource_files(self):
         return [self.get_script_path(required=True)]
 
 
 class K6LogReader(ResultsReader):
+    """
+    Reads k6 CSV output, request metrics are paired with iteration ones (vus, data_received) in order of appearance
+    """
+    REQUEST_METRICS = {'http_req_duration': 4, 'http_req_connecting': 5, 'http_req_tls_handshaking': 6}
+    LAST_REQUEST_METRIC = 'http_req_waiting'
+
     def __init__(self, filename, parent_logger):
         super(K6LogReader, self).__init__()
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.file = FileReader(filename=filename, parent_logger=self.log)
-        self.data = {'timestamp': [], 'label': [], 'r_code': [], 'error_msg': [], 'http_req_duration': [],
-                     'http_req_connecting': [], 'http_req_tls_handshaking': [], 'http_req_waiting': [], 'vus': [],
-                     'data_received': []}
         self.position = {'timestamp': None, 'metric_value': None, 'error': None,
                          'expected_response': None, 'name': None, 'status': None}
+        self.request = None  # in-flight request: timestamp, label, r_code, error, duration, connecting, tls
+        self.requests = deque()  # complete requests: the same with waiting time at the end
+        self.vus = deque()
+        self.data_received = deque()
 
     def _read(self, last_pass=False):
-        self.lines = list(self.file.get_lines(size=1024 * 1024, last_pass=last_pass))
-
-        for line in self.lines:
-            if line.startswith("metric_name"):
-                parts = line[:-1].split(",")
-                self.position['timestamp'] = parts.index('timestamp')
-                self.position['metric_value'] = parts.index('metric_value')
-                self.position['error'] = parts.index('error')
-                self.position['expected_response'] = parts.index('expected_response')
-                self.position['name'] = parts.index('name')
-                self.position['status'] = parts.index('status')
-            elif line.startswith("http_reqs"):
-                self.data['timestamp'].append(int(line.split(',')[self.position['timestamp']]))
-                self.data['label'].append(line.split(',')[self.position['name']])
-                self.data['r_code'].append(line.split(',')[self.position['status']])
-                error = line.split(',')[self.position['error']]
-                if not error and line.split(',')[self.position['expected_response']] == 'false':
-                    error = f"Response code: {line.split(',')[self.position['status']]}"
-                self.data['error_msg'].append(error)
-            elif line.startswith("http_req_duration"):
-                self.data['http_req_duration'].append(float(line.split(',')[self.position['metric_value']]))
-            elif line.startswith("http_req_connecting"):
-                self.data['http_req_connecting'].append(float(line.split(',')[self.position['metric_value']]))
-            elif line.startswith("http_req_tls_handshaking"):
-                self.data['http_req_tls_handshaking'].append(float(line.split(',')[self.position['metric_value']]))
-            elif line.startswith("http_req_waiting"):
-                self.data['http_req_waiting'].append(float(line.split(',')[self.position['metric_value']]))
-            elif line.startswith("vus") and not line.startswith("vus_max"):
-                self.data['vus'].append(int(float(line.split(',')[self.position['metric_value']])))
-            elif line.startswith("data_received"):
-                self.data['data_received'].append(float(line.split(',')[self.position['metric_value']]))
-
-            if self.data['vus'] and len(self.data['data_received']) >= self.data['vus'][0] and \
-                    len(self.data['http_req_waiting']) >= self.data['vus'][0]:
-                for i in range(self.data['vus'][0]):
-                    kpi_set = (
-                        self.data['timestamp'][0],
-                        self.data['label'][0],
-                        self.data['vus'][0],
-                        self.data['http_req_duration'][0] / 1000,
-                        (self.data['http_req_connecting'][0] + self.data['http_req_tls_handshaking'][0]) / 1000,
-                        self.data['http_req_waiting'][0] / 1000,
-                        self.data['r_code'][0],
-                        None if not self.data['error_msg'][0] else self.data['error_msg'][0],
-                        '',
-                        self.data['data_received'][0])
-
-                    for key in self.data.keys():
-                        if key != 'vus':
-                            self.data[key].pop(0)
-
-                    yield kpi_set
-
-                self.data['vus'].pop(0)
+        position = self.position
+        for line in self.file.get_complete_lines(size=1024 * 1024, last_pass=last_pass):
+            parts = line.rstrip("\n").split(",")
+            metric = parts[0]
+            if metric == "metric_name":
+                for key in position:
+                    position[key] = parts.index(key)
+            elif metric == "http_reqs":
+                status = parts[position['status']]
+                error = parts[position['error']]
+                if not error and parts[position['expected_response']] == 'false':
+                    error = f"Response code: {status}"
+                self.request = [int(parts[position['timestamp']]), parts[position['name']], status, error or None,
+                                0.0, 0.0, 0.0]
+            elif metric in self.REQUEST_METRICS:
+                if self.request is not None:
+                    self.request[self.REQUEST_METRICS[metric]] = float(parts[position['metric_value']])
+            elif metric == self.LAST_REQUEST_METRIC:
+                if self.request is not None:
+                    self.request.append(float(parts[position['metric_value']]))
+                    self.requests.append(self.request)
+                    self.request = None
+            elif metric == "vus":
+                self.vus.append(int(float(parts[position['metric_value']])))
+            elif metric == "data_received":
+                self.data_received.append(float(parts[position['metric_value']]))
+            else:
+                continue
+
+            while self.vus and len(self.data_received) >= self.vus[0] and len(self.requests) >= self.vus[0]:
+                vus = self.vus.popleft()
+                for _ in range(vus):
+                    t_stamp, label, r_code, error, duration, connecting, tls, waiting = self.requests.popleft()
+                    yield (t_stamp, label, vus, duration / 1000, (connecting + tls) / 1000, waiting / 1000,
+                           r_code, error, '', self.data_received.popleft())
 
 
 class K6(RequiredTool):
     def __init__(self, config=None, **kwargs):
-        super(K6, self).__init__(installable=False, **kwargs)
+        super(K6, self).__init__(tool_path="k6", installable=False, **kwargs)
 
     def check_if_installed(self):
+        if self._get_probe() is not None:
+            return True
+
         self.log.debug('Checking K6 Framework: %s' % self.tool_path)
         try:
             out, err = self.call(['k6', 'version'])
@@ -181,4 +178,5 @@ class K6(RequiredTool):
         if err:
             out += err
         self.log.debug("K6 output: %s", out)
+        self._save_probe()
         return True
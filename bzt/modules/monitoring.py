@@ -1,7 +1,9 @@
 """ Monitoring service subsystem """
+import os
 import select
 import socket
 import subprocess
+import threading
 import time
 import traceback
 from abc import abstractmethod
@@ -16,7 +18,7 @@ from bzt import TaurusNetworkError, TaurusInternalException, TaurusConfigError
 from bzt.engine import Service, Singletone
 from bzt.modules.console import PrioritizedWidget
 from bzt.modules.passfail import FailCriterion
-from bzt.utils import iteritems, b, stream_decode, dehumanize_time, BetterDict
+from bzt.utils import iteritems, b, stream_decode, dehumanize_time, BetterDict, BackgroundWorker
 
 
 class Monitoring(Service, Singletone):
@@ -29,6 +31,7 @@ class Monitoring(Service, Singletone):
         super(Monitoring, self).__init__()
         self.listeners = []
         self.clients = []
+        self.logs = None
         self.client_classes = {
             'server-agent': ServerAgentClient,
             'graphite': GraphiteClient,
@@ -39,9 +42,15 @@ class Monitoring(Service, Singletone):
         assert isinstance(listener, MonitoringListener)
         self.listeners.append(listener)
 
+    def is_prepare_independent(self):
+        return True
+
     def prepare(self):
         super(Monitoring, self).prepare()
-        clients = (param for param in self.parameters if param not in ('run-at', 'module'))
+        if not self.logs:
+            self.logs = MonitoringLogs(self.log, self.engine, self.parameters.get("logs", {}))
+
+        clients = (param for param in self.parameters if param not in ('run-at', 'module', 'logs'))
         for client_name in clients:
             if client_name in self.client_classes:
                 client_class = self.client_classes[client_name]
@@ -63,6 +72,7 @@ class Monitoring(Service, Singletone):
                             config.merge(cfg)
 
                 client = client_class(self.log, label, config, self.engine)
+                client.logs = self.logs
                 self.clients.append(client)
                 client.connect()
 
@@ -84,6 +94,8 @@ class Monitoring(Service, Singletone):
     def shutdown(self):
         for client in self.clients:
             client.disconnect()
+        if self.logs:
+            self.logs.close()
         super(Monitoring, self).shutdown()
 
     def get_widget(self):
@@ -99,11 +111,29 @@ class MonitoringListener(object):
 
 
 class MonitoringClient(object):
+    """
+    :type logs: MonitoringLogs
+    """
     def __init__(self, parent_log, engine):
         self.log = parent_log.getChild(self.__class__.__name__)
         self.engine = engine
         self._last_check = 0  # the last check was long time ago
+        self.logs = None  # shared by clients of Monitoring service
         self.logs_file = None
+        self._logs_channel = None
+        self._own_logs = False
+
+    def _open_logs(self, prefix, source, fields):
+        if not self.logs:
+            self.logs = MonitoringLogs(self.log, self.engine)
+            self._own_logs = True
+
+        self._logs_channel = self.logs.open(prefix, source, fields)
+        self.logs_file = self._logs_channel.filename
+
+    def _close_logs(self):
+        if self._own_logs:
+            self.logs.close()
 
     def connect(self):
         pass
@@ -119,12 +149,129 @@ class MonitoringClient(object):
         pass
 
 
+class MonitoringLogs(object):
+    """
+    CSV logs of monitoring clients. Files are kept open and flushed not more often than once per flush interval,
+    all of them are flushed and closed on shutdown. Optionally logs of all sources go into single file
+    with 'ts,source,metric,value' columns and files are rotated when they reach the size limit.
+    """
+    CONSOLIDATED_PREFIX = "monitoring_logs"
+
+    def __init__(self, parent_logger, engine, settings=None):
+        settings = settings or {}
+        self.log = parent_logger.getChild(self.__class__.__name__)
+        self.engine = engine
+        self.flush_interval = dehumanize_time(settings.get("flush-interval", "5s"))
+        self.consolidated = settings.get("consolidated", False)
+        self.rotate_size = float(settings.get("rotate-size", 0)) * 1024 * 1024  # megabytes
+        self._files = {}
+        self._lock = threading.Lock()  # rows may come from background workers
+        self._last_flush = time.time()
+        self._closed = False
+
+    def open(self, prefix, source, fields):
+        """
+        Register log of monitoring source, its header is written immediately
+
+        :type prefix: str
+        :type source: str
+        :type fields: list[str]
+        :rtype: MonitoringLogChannel
+        """
+        if self.consolidated:
+            prefix, header = self.CONSOLIDATED_PREFIX, ['ts', 'source', 'metric', 'value']
+        else:
+            header = ['ts'] + list(fields)
+
+        with self._lock:
+            if prefix not in self._files:
+                self._files[prefix] = MonitoringLogFile(self.engine, prefix, header)
+
+        return MonitoringLogChannel(self, self._files[prefix], source, fields)
+
+    def write(self, channel, timestamp, values, fields=None):
+        if self.consolidated:
+            fields = channel.fields if fields is None else fields
+            rows = [[timestamp, channel.source, field, value] for field, value in zip(fields, values)]
+        else:
+            rows = [[timestamp] + list(values)]
+
+        with self._lock:
+            if self._closed:
+                self.log.debug("Monitoring logs are closed, rows of %s dropped", channel.source)
+                return
+
+            log_file = channel.log_file
+            log_file.writer.writerows(rows)
+            if self.rotate_size and log_file.fds.tell() >= self.rotate_size:
+                log_file.rotate()
+
+            if time.time() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        for log_file in self._files.values():
+            log_file.fds.flush()
+        self._last_flush = time.time()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                for log_file in self._files.values():
+                    log_file.fds.close()
+                self._closed = True
+
+
+class MonitoringLogFile(object):
+    def __init__(self, engine, prefix, header):
+        self.engine = engine
+        self.prefix = prefix
+        self.header = header
+        self.filename = None
+        self.fds = None
+        self.writer = None
+        self.rotate()
+
+    def rotate(self):
+        if self.fds:
+            self.fds.close()
+
+        self.filename = self.engine.create_artifact(self.prefix, ".csv")
+        self.fds = open(self.filename, "a", newline='')
+        self.writer = csv.writer(self.fds, delimiter=',')
+        self.writer.writerow(self.header)
+        self.fds.flush()
+
+
+class MonitoringLogChannel(object):
+    def __init__(self, logs, log_file, source, fields):
+        """
+        :type logs: MonitoringLogs
+        :type log_file: MonitoringLogFile
+        """
+        self.logs = logs
+        self.log_file = log_file
+        self.filename = log_file.filename
+        self.source = source
+        self.fields = fields
+
+    def write(self, timestamp, values, fields=None):
+        """
+        :param fields: names of values if they differ from fields of channel
+        """
+        self.logs.write(self, timestamp, values, fields)
+
+
 class LocalClient(MonitoringClient):
     """
     :type monitor: LocalMonitor
     """
-    AVAILABLE_METRICS = ['cpu', 'mem', 'disk-space', 'engine-loop', 'bytes-recv',
-                         'bytes-sent', 'disk-read', 'disk-write', 'conn-all']
+    AVAILABLE_METRICS = ['cpu', 'mem', 'disk-space', 'engine-loop', 'bytes-recv', 'bytes-sent', 'disk-read',
+                         'disk-write', 'conn-all', 'bg-queue', 'bg-dropped', 'executors-cpu', 'executors-rss']
 
     def __init__(self, parent_log, label, config, engine=None):
         super(LocalClient, self).__init__(parent_log, engine)
@@ -188,11 +335,16 @@ class LocalClient(MonitoringClient):
         self.interval = dehumanize_time(self.config.get("interval", self.engine.check_interval))
 
         if self.config.get("logging", False):
-            self.logs_file = self.engine.create_artifact("local_monitoring_logs", ".csv")
-            with open(self.logs_file, "a", newline='') as mon_logs:
-                logs_writer = csv.writer(mon_logs, delimiter=',')
-                metrics = ['ts'] + sorted([metric for metric in good_list])
-                logs_writer.writerow(metrics)
+            self._open_logs("local_monitoring_logs", self.label, sorted(good_list))
+
+    def start(self):
+        if self.config.get("background", True):
+            self.monitor.start(self.interval)
+
+    def disconnect(self):
+        if self.monitor:
+            self.monitor.stop()
+        self._close_logs()
 
     def get_data(self):
         now = time.time()
@@ -202,11 +354,9 @@ class LocalClient(MonitoringClient):
             self._cached_data = []
             metric_values = self._get_resource_stats()
 
-            if self.logs_file:
-                with open(self.logs_file, "a", newline='') as mon_logs:
-                    line = [str(round(now))] + [str(metric_values[x]) for x in sorted(metric_values.keys())]
-                    logs_writer = csv.writer(mon_logs, delimiter=',')
-                    logs_writer.writerow(line)
+            if self._logs_channel:
+                names = sorted(metric_values.keys())
+                self._logs_channel.write(str(round(now)), [str(metric_values[x]) for x in names], names)
 
             for name in self.metrics:
                 self._cached_data.append({
@@ -218,6 +368,13 @@ class LocalClient(MonitoringClient):
 
 
 class LocalMonitor(object):
+    """
+    Collects local resource stats. Once started, collection runs in separate thread every interval
+    and the latest stats are just picked up by resource_stats(), so engine loop is never blocked by it.
+    """
+    PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+    TCP_ESTABLISHED = "01"  # connection state code in /proc/net/tcp*
+
     def __init__(self, parent_logger, metrics, engine):
         if not engine:
             raise TaurusInternalException('Local monitor requires valid engine instance')
@@ -225,17 +382,46 @@ class LocalMonitor(object):
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.metrics = metrics
         self.engine = engine
-        self._disk_counters = None
-        self._net_counters = None
-        self._last_check = None
+        self._processes = {}  # pid -> psutil.Process, cpu percent of process is measured since previous call
+        self._latest = None  # stats are replaced as a whole by sampling thread, never modified in place
+        self._sampler = None
+        self._stopping = threading.Event()
+
+        # prime counters, so first stats are measured since monitor creation
+        self._disk_counters = self.__get_disk_counters()
+        self._net_counters = self.__get_net_counters()
+        self.__get_cpu_percent()
+        self._last_check = time.time()
+
+    def start(self, interval):
+        """
+        Collect stats in background thread every interval
+        """
+        self._latest = self._take_stats()
+        self._stopping.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(interval,), name="LocalMonitor", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        if self._sampler:
+            self._stopping.set()
+            self._sampler.join(5)
+            self._sampler = None
+
+    def _sample(self, interval):
+        while not self._stopping.wait(interval):
+            try:
+                self._latest = self._take_stats()
+            except BaseException:
+                self.log.debug("Failed to collect local stats: %s", traceback.format_exc())
 
     def resource_stats(self):
-        if not self._last_check:
-            self._disk_counters = self.__get_disk_counters()
-            self._net_counters = self.__get_net_counters()
-            self._last_check = time.time()
-            time.sleep(0.2)  # small enough for human, big enough for machine
+        if self._sampler:
+            return self._latest
+
+        return self._take_stats()
 
+    def _take_stats(self):
         now = time.time()
         interval = now - self._last_check
         self._last_check = now
@@ -258,23 +444,35 @@ class LocalMonitor(object):
         if 'engine-loop' in self.metrics:
             result['engine-loop'] = self.engine.engine_loop_utilization
 
+        if 'bg-queue' in self.metrics:
+            result['bg-queue'] = sum(worker.queue_depth for worker in self.engine.background_workers)
+
+        if 'bg-dropped' in self.metrics:
+            result['bg-dropped'] = sum(worker.dropped for worker in self.engine.background_workers)
+
         if 'conn-all' in self.metrics:
             try:
-                # take all connections without address resolution
-                output = subprocess.check_output(['netstat', '-an'])
-                output_lines = stream_decode(output).split('\n')  # in py3 stream has 'bytes' type
-                est_lines = [line for line in output_lines if line.find('EST') != -1]
-                result['conn-all'] = len(est_lines)
+                result['conn-all'] = self.__get_connections_count()
             except BaseException as exc:
                 self.log.debug("Failed to get connections info: %s", exc)
                 result['conn-all'] = 0
 
+        if 'executors-cpu' in self.metrics or 'executors-rss' in self.metrics:
+            cpu, rss = self.__get_executors_usage()
+            if 'executors-cpu' in self.metrics:
+                result['executors-cpu'] = cpu
+            if 'executors-rss' in self.metrics:
+                result['executors-rss'] = rss
+
         if 'cpu' in self.metrics:
             result['cpu'] = self.__get_cpu_percent()
 
+        if interval <= 0:
+            interval = None  # nothing is measurable yet, all rates are zero
+
         if 'bytes-recv' in self.metrics or 'bytes-sent' in self.metrics:
             net = self.__get_net_counters()
-            if net is not None:
+            if net is not None and interval:
                 tx_bytes = int((net.bytes_sent - self._net_counters.bytes_sent) / float(interval))
                 rx_bytes = int((net.bytes_recv - self._net_counters.bytes_recv) / float(interval))
                 self._net_counters = net
@@ -289,7 +487,7 @@ class LocalMonitor(object):
 
         if 'disk-read' in self.metrics or 'disk-write' in self.metrics:
             disk = self.__get_disk_counters()
-            if disk is not None:
+            if disk is not None and interval:
                 dru = int((disk.read_bytes - self._disk_counters.read_bytes) / float(interval))
                 dwu = int((disk.write_bytes - self._disk_counters.write_bytes) / float(interval))
                 self._disk_counters = disk
@@ -304,6 +502,70 @@ class LocalMonitor(object):
 
         return result
 
+    def __get_connections_count(self):
+        """
+        Count established TCP connections, /proc is read line by line where it's available
+        """
+        tables = [path for path in self.PROC_NET_TCP if os.path.exists(path)]
+        if tables:
+            count = 0
+            for path in tables:
+                with open(path) as fds:
+                    next(fds, None)  # header
+                    for line in fds:
+                        fields = line.split(None, 4)
+                        if len(fields) > 3 and fields[3] == self.TCP_ESTABLISHED:
+                            count += 1
+            return count
+
+        try:
+            connections = psutil.net_connections(kind='tcp')
+        except psutil.AccessDenied:  # psutil requires root for it on some platforms (e.g. MacOS)
+            output = subprocess.check_output(['netstat', '-an'])
+            return len([line for line in stream_decode(output).split('\n') if line.find('EST') != -1])
+
+        return len([conn for conn in connections if conn.status == psutil.CONN_ESTABLISHED])
+
+    def __get_executors_pids(self):
+        pids = set()
+        for executor in getattr(self.engine.provisioning, "executors", []):
+            process = getattr(executor, "process", None)
+            pid = getattr(process, "pid", None)
+            if not isinstance(pid, int):
+                continue
+
+            try:
+                pids.add(pid)
+                pids.update(child.pid for child in psutil.Process(pid).children(recursive=True))
+            except psutil.Error as exc:
+                self.log.debug("Failed to get processes of %s: %s", executor, exc)
+
+        return pids
+
+    def __get_executors_usage(self):
+        """
+        Get CPU percent and RSS bytes summarized for processes of executors and their children (JVM, Locust, etc.)
+        """
+        pids = self.__get_executors_pids()
+        for pid in set(self._processes) - pids:
+            self._processes.pop(pid)
+
+        cpu = 0.0
+        rss = 0
+        for pid in pids:
+            try:
+                if pid not in self._processes:
+                    self._processes[pid] = psutil.Process(pid)
+
+                process = self._processes[pid]
+                cpu += process.cpu_percent()  # it's 0.0 for the first call
+                rss += process.memory_info().rss
+            except psutil.Error as exc:
+                self.log.debug("Failed to get usage of process %s: %s", pid, exc)
+                self._processes.pop(pid, None)
+
+        return cpu, rss
+
     def __get_mem_info(self):
         try:
             return psutil.virtual_memory().percent
@@ -366,20 +628,24 @@ class GraphiteClient(MonitoringClient):
         self.address = self.config.get("address", exc)
         self.timeout = int(dehumanize_time(self.config.get("timeout", "5s")))
         self.interval = int(dehumanize_time(self.config.get("interval", "5s")))     # interval for client
-        self._cached_data = None
+        self._cached_data = []
         self.url = self._get_url()
+        self.fetcher = None
 
         if label:
             self.host_label = label
         else:
             self.host_label = self.address.replace('http://', '').replace('/', '').replace(':', '_')
 
+        if self.config.get("fetch-in-background", False):
+            # only the latest request matters, the one waiting in queue is replaced by newer
+            self.fetcher = BackgroundWorker("GraphiteFetcher-%s" % self.host_label, self.log, queue_size=1)
+            self.engine.background_workers.append(self.fetcher)
+
+    def connect(self):
         if self.config.get("logging", False):
-            self.logs_file = self.engine.create_artifact("Graphite_logs_{}".format(self.host_label), ".csv")
-            with open(self.logs_file, "a", newline='') as sa_logs:
-                logs_writer = csv.writer(sa_logs, delimiter=',')
-                metrics = ['ts'] + [metric for metric in self.config.get("metrics")]
-                logs_writer.writerow(metrics)
+            metrics = [metric for metric in self.config.get("metrics")]
+            self._open_logs("Graphite_logs_{}".format(self.host_label), self.host_label, metrics)
 
     def _get_url(self):
         exc = TaurusConfigError('Graphite client requires metrics list')
@@ -413,32 +679,50 @@ class GraphiteClient(MonitoringClient):
             self.log.warning("Fail to receive metrics from %s", self.address)
             return []
 
-    def get_data(self):
-        now = time.time()
+    def start(self):
+        if self.fetcher:
+            self.fetcher.start()
 
-        if now > self._last_check + self.interval:
-            self._cached_data = []
-            self._last_check = now
-            json_list = self._get_response()
-            data_line = [now]
+    def disconnect(self):
+        if self.fetcher:
+            self.fetcher.stop(timeout=self.timeout)
+        self._close_logs()
 
-            for element in json_list:
-                item = {
-                    'ts': now,
-                    'source': '%s' % self.host_label}
+    def _fetch_data(self, now):
+        json_list = self._get_response()
+        data_line = []
+        targets = []
+        cached_data = []
+
+        for element in json_list:
+            item = {
+                'ts': now,
+                'source': '%s' % self.host_label}
+
+            for datapoint in reversed(element['datapoints']):
+                if datapoint[0] is not None:
+                    item[element['target']] = datapoint[0]
+                    data_line.append(datapoint[0])
+                    targets.append(element['target'])
+                    break
+
+            cached_data.append(item)
+
+        if self._logs_channel:
+            self._logs_channel.write(now, data_line, targets)
 
-                for datapoint in reversed(element['datapoints']):
-                    if datapoint[0] is not None:
-                        item[element['target']] = datapoint[0]
-                        data_line.append(datapoint[0])
-                        break
+        self._cached_data = cached_data
 
-                self._cached_data.append(item)
+    def get_data(self):
+        now = time.time()
 
-            if self.logs_file:
-                with open(self.logs_file, "a", newline='') as g_logs:
-                    logs_writer = csv.writer(g_logs, delimiter=',')
-                    logs_writer.writerow(data_line)
+        if now > self._last_check + self.interval:
+            self._last_check = now
+            if self.fetcher:
+                self.fetcher.check()
+                self.fetcher.submit(self._fetch_data, now)
+            else:
+                self._fetch_data(now)
 
         return self._cached_data
 
@@ -487,11 +771,8 @@ class ServerAgentClient(MonitoringClient):
             raise TaurusNetworkError(msg)
 
         if self.config.get("logging", False):
-            self.logs_file = self.engine.create_artifact("SAlogs_{}_{}".format(self.address, self.port), ".csv")
-            with open(self.logs_file, "a", newline='') as sa_logs:
-                logs_writer = csv.writer(sa_logs, delimiter=',')
-                metrics = ['ts'] + sorted([metric for metric in self._result_fields])
-                logs_writer.writerow(metrics)
+            source = self.host_label if self.host_label else '%s:%s' % (self.address, self.port)
+            self._open_logs("SAlogs_{}_{}".format(self.address, self.port), source, sorted(self._result_fields))
 
     def disconnect(self):
         self.log.debug("Closing connection with agent at %s:%s...", self.address, self.port)
@@ -501,6 +782,7 @@ class ServerAgentClient(MonitoringClient):
             self.log.warning("Error during disconnecting from agent at %s:%s: %s", self.address, self.port, exc)
         finally:
             self.socket.close()
+            self._close_logs()
 
     def start(self):
         self.socket.send(b("interval:%s\n" % self.interval))
@@ -534,11 +816,8 @@ class ServerAgentClient(MonitoringClient):
                 item['source'] = source
                 res.append(item)
 
-                if self.logs_file:
-                    with open(self.logs_file, "a", newline='') as sa_logs:
-                        line = [str(round(item['ts']))] + line[:-1].split("\t")
-                        logs_writer = csv.writer(sa_logs, delimiter=',')
-                        logs_writer.writerow(line)
+                if self._logs_channel:
+                    self._logs_channel.write(str(round(item['ts'])), line[:-1].split("\t"), self._result_fields)
 
         return res
 
@@ -20,15 +20,15 @@ import logging
 import re
 import sys
 from abc import abstractmethod
-from collections import OrderedDict
+from collections import deque
 
 from urwid import Pile, Text
 
 from bzt import AutomatedShutdown, TaurusConfigError
 from bzt.engine import Reporter, EngineModule
-from bzt.modules.aggregator import KPISet, DataPoint, AggregatorListener, ResultsProvider
+from bzt.modules.aggregator import KPISet, DataPoint, AggregatorListener, ResultsProvider, RespTimesCounter
 from bzt.modules.console import PrioritizedWidget
-from bzt.utils import viewvalues, iteritems, load_class, dehumanize_time, get_bytes_count, BetterDict
+from bzt.utils import iteritems, load_class, dehumanize_time, get_bytes_count, BetterDict
 
 
 class CriteriaProcessor(AggregatorListener):
@@ -42,6 +42,7 @@ class CriteriaProcessor(AggregatorListener):
         if isinstance(feeder, EngineModule):
             self.engine = feeder.engine
         self.criteria = []
+        self.current_criteria = []  # the ones that look into each second, not into cumulative results
         self.last_datapoint = None
         self.log = logging.getLogger(__name__)
 
@@ -60,6 +61,8 @@ class CriteriaProcessor(AggregatorListener):
             if isinstance(idx, str):
                 crit_instance.message = idx
             self.criteria.append(crit_instance)
+            if isinstance(crit_instance, DataCriterion) and crit_instance.selector != DataPoint.CUMULATIVE:
+                self.current_criteria.append(crit_instance)
 
         if isinstance(feeder, ResultsProvider):
             feeder.add_listener(self)
@@ -71,10 +74,8 @@ class CriteriaProcessor(AggregatorListener):
         :type data: bzt.modules.aggregator.DataPoint
         """
         self.last_datapoint = data
-        for crit in self.criteria:
-            if isinstance(crit, DataCriterion):
-                if crit.selector != DataPoint.CUMULATIVE:
-                    crit.aggregated_second(data)
+        for crit in self.current_criteria:
+            crit.aggregated_second(data)
 
     def check(self):
         res = False
@@ -166,7 +167,8 @@ class FailCriterion(object):
     def __init__(self, config, owner):
         self.owner = owner
         self.config = config
-        self.agg_buffer = OrderedDict()
+        self.agg_buffer = deque()  # (timestamp, value) pairs within timeframe
+        self._window_sum = 0
         if not 'threshold' in config:
             raise TaurusConfigError("Criteria string is malformed in its threshold part.")
         self.percentage = str(config['threshold']).endswith('%')
@@ -231,8 +233,7 @@ class FailCriterion(object):
             self._end = tstmp
             self.trigger()
         elif self.window_logic == 'over' and state:
-            min_buffer_tstmp = min(self.agg_buffer.keys())
-            self._start = min_buffer_tstmp
+            self._start = self.agg_buffer[0][0]
             self._end = tstmp
             if self.get_counting() >= self.window:
                 self.trigger()
@@ -283,23 +284,33 @@ class FailCriterion(object):
         else:
             raise TaurusConfigError("Unsupported window logic: %s" % logic)
 
-    def _get_windowed_points(self, tstmp, value):
-        self.agg_buffer[tstmp] = value
-        keys = list(self.agg_buffer.keys())
-        for tstmp_old in keys:
-            if tstmp_old <= tstmp - self.window:
-                del self.agg_buffer[tstmp_old]
-                continue
-            break
+    def _slide_window(self, tstmp, value):
+        """
+        Put value into the window, drop the ones that went out of timeframe
 
-        return viewvalues(self.agg_buffer)
+        :return: list of dropped values
+        """
+        dropped = []
+        if self.agg_buffer and self.agg_buffer[-1][0] == tstmp:
+            dropped.append(self.agg_buffer.pop()[1])  # the same second came again, replace its value
+
+        self.agg_buffer.append((tstmp, value))
+        while self.agg_buffer and self.agg_buffer[0][0] <= tstmp - self.window:
+            dropped.append(self.agg_buffer.popleft()[1])
+
+        return dropped
 
     def _within_aggregator_sum(self, tstmp, value):
-        return sum(self._get_windowed_points(tstmp, value))
+        dropped = self._slide_window(tstmp, value)
+        if len(self.agg_buffer) == 1:
+            self._window_sum = value  # don't let float rounding errors pile up
+        else:
+            self._window_sum += value - sum(dropped)
+
+        return self._window_sum
 
     def _within_aggregator_avg(self, tstmp, value):
-        points = self._get_windowed_points(tstmp, value)
-        return sum(points) / len(points)
+        return self._within_aggregator_sum(tstmp, value) / len(self.agg_buffer)
 
     def get_counting(self):
         return self._end - self._start + 1
@@ -325,6 +336,12 @@ class DataCriterion(FailCriterion):
         super(DataCriterion, self).__init__(config, owner)
         self.label = config.get('label', '')
         self.selector = DataPoint.CURRENT if self.window > 0 else DataPoint.CUMULATIVE
+        self.perc_level = None
+        self._window_hist = None  # merged response times of all seconds within timeframe
+        if self.window_logic in ('within', 'over') and self._is_percentile(config['subject']):
+            self.perc_level = float(config['subject'][1:])
+            self.get_value = lambda x: x
+            self.agg_logic = self._within_aggregator_perc
 
     def aggregated_second(self, data):
         """
@@ -379,7 +396,7 @@ class DataCriterion(FailCriterion):
                 return lambda x: 100.0 * x[KPISet.FAILURES] / x[KPISet.SAMPLE_COUNT]
             else:
                 return lambda x: x[KPISet.FAILURES]
-        elif subject.startswith('p') and re.compile(r"p1?\d?\d(\.\d?)?").match(subject):
+        elif self._is_percentile(subject):
             if percentage:
                 raise TaurusConfigError("Percentage threshold is not applicable for %s" % subject)
             level = str(float(subject[1:]))
@@ -397,6 +414,36 @@ class DataCriterion(FailCriterion):
         else:
             raise TaurusConfigError("Unsupported fail criteria subject: %s" % subject)
 
+    @staticmethod
+    def _is_percentile(subject):
+        return subject.startswith('p') and re.compile(r"p1?\d?\d(\.\d?)?").match(subject)
+
+    def _within_aggregator_perc(self, tstmp, kpiset):
+        """
+        Percentile of all samples within timeframe, taken from merged histograms of seconds.
+        Falls back to average of seconds' percentiles if there are no histograms (e.g. cloud results)
+        """
+        rtimes = kpiset[KPISet.RESP_TIMES]
+        if self._window_hist is None:
+            self._window_hist = RespTimesCounter(rtimes.low, rtimes.high, rtimes.sign_figures, (self.perc_level,))
+
+        level = str(self.perc_level)
+        perc_value = kpiset[KPISet.PERCENTILES].get(level, 0)
+        indexes, counts = rtimes.get_nonzero_counts()
+        value = (perc_value, indexes, counts, rtimes.high)
+        self._window_hist.add_counts(indexes, counts, rtimes.high)
+
+        dropped = self._slide_window(tstmp, value)
+        for perc_old, indexes_old, counts_old, high_old in dropped:
+            self._window_hist.add_counts(indexes_old, -counts_old, high_old)
+        self._window_sum += perc_value - sum(old[0] for old in dropped)
+
+        percentiles = self._window_hist.get_percentiles_dict()
+        if self.perc_level in percentiles:
+            return percentiles[self.perc_level] / 1000.0
+
+        return self._window_sum / len(self.agg_buffer)
+
     def _get_aggregator_functor(self, logic, subj):
         if logic in ('within', "over") and not self.percentage:
             if subj in ('hits',) or subj.startswith('succ') or subj.startswith('fail') or subj.startswith('rc'):
@@ -67,9 +67,8 @@ class Local(Provisioning):
 
     def prepare(self):
         super(Local, self).prepare()
-        for executor in self.executors:
-            self.log.debug("Preparing executor: %s", executor)
-            executor.prepare()
+        self.log.debug("Preparing executors: %s", self.executors)
+        self.engine.prepare_modules(self.executors)
 
     def startup(self):
         self.start_time = time.time()
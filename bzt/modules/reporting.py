@@ -22,6 +22,7 @@ import time
 from collections import Counter, OrderedDict
 from datetime import datetime
 
+from lxml import etree
 from terminaltables import AsciiTable
 
 from bzt import TaurusInternalException, TaurusConfigError
@@ -30,7 +31,7 @@ from bzt.modules.aggregator import DataPoint, KPISet, AggregatorListener, Result
 from bzt.modules.blazemeter import BlazeMeterUploader, CloudProvisioning
 from bzt.modules.functional import FunctionalAggregatorListener
 from bzt.modules.passfail import PassFailStatus
-from bzt.utils import etree, iteritems, get_full_path
+from bzt.utils import iteritems, get_full_path
 
 
 class FinalStatus(Reporter, AggregatorListener, FunctionalAggregatorListener):
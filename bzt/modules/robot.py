@@ -21,6 +21,7 @@ import yaml
 
 from bzt import TaurusConfigError
 from bzt.modules import SubprocessedExecutor
+from bzt.modules.aggregator import KPIFramesReader
 from bzt.modules.services import PythonTool
 from bzt.utils import RequiredTool, CALL_PROBLEMS
 from bzt.utils import get_full_path, RESOURCES_DIR
@@ -43,6 +44,11 @@ class RobotExecutor(SubprocessedExecutor):
             files.append(scenario["variables"])
         return files
 
+    def create_load_reader(self, report_file):
+        if self.settings.get("per-second-stats", False):
+            return KPIFramesReader(report_file, self.log)
+        return super(RobotExecutor, self).create_load_reader(report_file)
+
     def prepare(self):
         super(RobotExecutor, self).prepare()
         self.install_required_tools()
@@ -101,6 +107,10 @@ class RobotExecutor(SubprocessedExecutor):
         cmdline += ['--outputfile', self.output_file]
         cmdline += ['--logfile', self.log_file]
 
+        if isinstance(self.reader, KPIFramesReader):
+            cmdline += ['--kpi-frames']
+            self.env.add_path({"PYTHONPATH": get_full_path(__file__, step_up=3)})
+
         user_cmd = self.settings.get("cmdline")
         if user_cmd:
             cmdline.append("--cmdline")
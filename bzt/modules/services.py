@@ -17,8 +17,11 @@ limitations under the License.
 """
 
 import copy
+import importlib.util
 import json
 import os
+import re
+import threading
 import time
 import zipfile
 import sys
@@ -34,6 +37,11 @@ from bzt.utils import get_stacktrace, communicate, BetterDict, TaurusCalledProce
 from bzt.utils import get_full_path, shutdown_process, shell_exec, RequiredTool, is_windows
 from bzt.utils import replace_in_config, JavaVM, Node, CALL_PROBLEMS, exec_and_communicate
 
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:  # python 3.7 doesn't have it, 'pip list' is used instead
+    importlib_metadata = None
+
 if not is_windows():
     try:
         from pyvirtualdisplay.smartdisplay import SmartDisplay as Display
@@ -41,6 +49,101 @@ if not is_windows():
         from pyvirtualdisplay import Display
 
 
+class PackageInventory(object):
+    """
+    Python distributions available for interpreter, shared by pip installers of one run.
+    Distributions of current interpreter are read in-process, for other pip commands 'pip list' is used.
+    Inventory is read once and has to be invalidated when packages are installed or removed.
+    """
+    LOCK = threading.RLock()
+
+    def __init__(self, pip_cmd, parent_logger):
+        self.pip_cmd = pip_cmd
+        self.in_process = importlib_metadata is not None and pip_cmd == [sys.executable, "-m", "pip"]
+        self.log = parent_logger.getChild(self.__class__.__name__)
+        self.lock = threading.RLock()
+        self.installed = None
+        self.pip_checked = False
+
+    @staticmethod
+    def get(engine, pip_cmd):
+        """
+        :rtype: PackageInventory
+        """
+        with PackageInventory.LOCK:
+            key = tuple(pip_cmd)
+            if key not in engine.package_inventories:
+                engine.package_inventories[key] = PackageInventory(list(pip_cmd), engine.log)
+            return engine.package_inventories[key]
+
+    @staticmethod
+    def normalize(name):
+        return re.sub(r"[-_.]+", "-", name).lower()
+
+    @staticmethod
+    def get_paths():
+        """
+        Paths where interpreter launched by Taurus looks for packages, in order of priority
+        """
+        paths = os.environ.get("PYTHONPATH", "").split(os.pathsep) + sys.path
+        unique = []
+        for path in paths:
+            if path and path not in unique:
+                unique.append(path)
+        return unique
+
+    def check_pip(self):
+        with self.lock:
+            if self.pip_checked:
+                return
+
+            if self.in_process:
+                available = importlib.util.find_spec("pip") is not None
+            else:
+                try:
+                    exec_and_communicate(self.pip_cmd + ["--version"])
+                    available = True
+                except TaurusCalledProcessError as exc:
+                    self.log.debug(exc)
+                    available = False
+
+            if not available:
+                raise TaurusInternalException("pip module not found for interpreter %s" % self.pip_cmd[0])
+            self.pip_checked = True
+
+    def _read_installed(self):
+        installed = {}
+        for dist in importlib_metadata.distributions(path=self.get_paths()):
+            name = dist.metadata["Name"]
+            if name:
+                installed.setdefault(self.normalize(name), dist.version)  # the first one shadows others
+        return installed
+
+    def _list_installed(self):
+        out, _ = exec_and_communicate(self.pip_cmd + ["list"])
+        out = out.split('\n')[2:-1]
+        return {self.normalize(line.split(' ')[0]): line.strip().split(' ')[-1] for line in out}
+
+    def get_installed(self):
+        """
+        :return: normalized package name -> version
+        :rtype: dict[str,str]
+        """
+        with self.lock:
+            if self.installed is None:
+                start = time.time()
+                self.installed = self._read_installed() if self.in_process else self._list_installed()
+                self.log.debug("Found %s python packages in %.3fs", len(self.installed), time.time() - start)
+            return self.installed
+
+    def get_version(self, package):
+        return self.get_installed().get(self.normalize(package))
+
+    def invalidate(self):
+        with self.lock:
+            self.installed = None
+
+
 class PipInstaller(Service):
     def __init__(self, packages=None, temp_flag=True):
         super(PipInstaller, self).__init__()
@@ -52,25 +155,24 @@ class PipInstaller(Service):
         self.interpreter = sys.executable
         self.pip_cmd = [self.interpreter, "-m", "pip"]
 
+    def get_inventory(self):
+        """
+        :rtype: PackageInventory
+        """
+        return PackageInventory.get(self.engine, self.pip_cmd)
+
     def _check_pip(self):
-        cmdline = self.pip_cmd + ["--version"]
-        try:
-            exec_and_communicate(cmdline)
-        except TaurusCalledProcessError as exc:
-            self.log.debug(exc)
-            raise TaurusInternalException("pip module not found for interpreter %s" % self.interpreter)
+        self.get_inventory().check_pip()
 
     def _get_installed(self):
-        cmdline = self.pip_cmd + ["list"]
-        out, _ = exec_and_communicate(cmdline)
-        out = out.split('\n')[2:-1]
-        return dict(zip([line.split(' ')[0] for line in out], [line.strip().split(' ')[-1] for line in out]))
+        return self.get_inventory().get_installed()
 
     def _missed(self, packages):
         installed = self._get_installed()
         missed = []
         for package in packages:
-            if package not in installed or package in self.versions and installed[package] != self.versions[package]:
+            version = installed.get(PackageInventory.normalize(package))
+            if version is None or package in self.versions and version != self.versions[package]:
                 missed.append(package)
         return missed
 
@@ -135,15 +237,52 @@ class PipInstaller(Service):
                          for package in self.versions.keys() if package in self.packages}
         return False if self.packages else True
 
-    def install(self):
-        if not self.packages:
-            self.log.debug("Nothing to install")
-            return
-        cmdline = self.pip_cmd + ["install", "-t", self.target_dir]
+    def get_requirements(self):
+        requirements = []
         for package in self.packages:
             version = self.versions.get(package, None)
-            cmdline += [f"{package}=={version}"] if version else [package]
-        cmdline += ["--upgrade"]
+            requirements.append(f"{package}=={version}" if version else package)
+        return requirements
+
+    def install(self):
+        self.install_batch([self])
+
+    @staticmethod
+    def install_batch(installers):
+        """
+        Install missed packages of several installers, packages going to the same place
+        are installed with single pip call unless their versions conflict
+
+        :type installers: list[PipInstaller]
+        """
+        batches = []  # [first installer, {package: version}]
+        for installer in installers:
+            if not installer.packages:
+                installer.log.debug("Nothing to install")
+                continue
+
+            for batch in batches:
+                first, versions = batch
+                same_place = (first.pip_cmd, first.target_dir) == (installer.pip_cmd, installer.target_dir)
+                if same_place and all(versions.get(package, version) == version
+                                      for package, version in installer.versions.items()):
+                    for package in installer.packages:
+                        versions.setdefault(package, None)
+                    versions.update(installer.versions)
+                    break
+            else:
+                batches.append([installer, {package: installer.versions.get(package, None)
+                                            for package in installer.packages}])
+
+        for installer, versions in batches:
+            requirements = [f"{package}=={version}" if version else package for package, version in versions.items()]
+            inventory = installer.get_inventory()
+            with inventory.lock:
+                installer._pip_install(requirements)
+                inventory.invalidate()
+
+    def _pip_install(self, requirements):
+        cmdline = self.pip_cmd + ["install", "-t", self.target_dir] + requirements + ["--upgrade"]
         self.log.debug("pip-installer cmdline: '%s'" % ' '.join(cmdline))
         try:
             out, err = exec_and_communicate(cmdline)
@@ -165,8 +304,7 @@ class PipInstaller(Service):
             self.log.debug("pip-installer stderr:\n%s" % err)
 
     def get_version(self, package):
-        installed = self._get_installed()
-        return installed[package]
+        return self.get_inventory().get_version(package)
 
     def post_process(self):
         # might be forbidden on win as tool still work
@@ -174,6 +312,7 @@ class PipInstaller(Service):
             self.log.debug("remove packages: %s" % self.packages)
 
             shutil.rmtree(self.target_dir)  # it removes all content of directory in reality, not only self.packages
+            self.get_inventory().invalidate()
 
 
 class PythonTool(RequiredTool):
@@ -200,11 +339,23 @@ class PythonTool(RequiredTool):
         return result
 
     def install(self):
-        if self.dry_install:
-            self.log.info(f"Dry installation for {self.tool_name}")
-            return
-        self.log.debug(f"Installing {self.tool_name}.")
-        self.installer.install()
+        self.install_batch([self])
+
+    @staticmethod
+    def install_batch(tools):
+        """
+        Missed packages of all python tools are installed together
+        :type tools: list[PythonTool]
+        """
+        installers = []
+        for tool in tools:
+            if tool.dry_install:
+                tool.log.info(f"Dry installation for {tool.tool_name}")
+            else:
+                tool.log.debug(f"Installing {tool.tool_name}.")
+                installers.append(tool.installer)
+
+        PipInstaller.install_batch(installers)
 
     def get_version(self):
         return self.installer.get_version(self.PACKAGES[0])
@@ -377,6 +528,9 @@ class AppiumLoader(Service):
         self.appium_python = None
         self.appium_server = None
 
+    def is_prepare_independent(self):
+        return True
+
     def prepare(self):
         self.startup_timeout = self.settings.get('timeout', 30)
         self.addr = self.settings.get('addr', '127.0.0.1')
@@ -17,7 +17,6 @@ limitations under the License.
 """
 
 import logging
-import time
 from math import ceil
 
 from bzt import TaurusConfigError, ToolError
@@ -26,6 +25,7 @@ from bzt.modules.aggregator import ConsolidatingAggregator, ResultsReader
 from bzt.modules.console import ExecutorWidget
 from bzt.requests_model import HTTPRequest
 from bzt.utils import iteritems, CALL_PROBLEMS, shutdown_process, RequiredTool, dehumanize_time, FileReader
+from bzt.utils import TimestampParser
 
 
 class SiegeExecutor(ScenarioExecutor):
@@ -38,6 +38,9 @@ class SiegeExecutor(ScenarioExecutor):
         self.tool = None
         self.scenario = None
 
+    def is_prepare_independent(self):
+        return True
+
     def prepare(self):
         super(SiegeExecutor, self).prepare()
         self.scenario = self.get_scenario()
@@ -180,6 +183,7 @@ class DataLogReader(ResultsReader):
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.file = FileReader(filename=filename, parent_logger=self.log)
         self.concurrency = None
+        self.timestamps = TimestampParser.from_format("%Y-%m-%d %H:%M:%S")
 
     def _read(self, last_pass=False):
         lines = self.file.get_lines(size=1024 * 1024, last_pass=last_pass)
@@ -199,8 +203,7 @@ class DataLogReader(ResultsReader):
             _rsize = int(log_vals[4])  # 4. size of response
             _url = log_vals[5]  # 6. long or short URL value
             # _url_id = int(log_vals[7])    # 7. url number
-            _tstamp = time.strptime(log_vals[7], "%Y-%m-%d %H:%M:%S")
-            _tstamp = int(time.mktime(_tstamp))  # 8. moment of request sending
+            _tstamp = self.timestamps.parse(log_vals[7])  # 8. moment of request sending
 
             _con_time = 0
             _latency = 0
@@ -217,6 +220,9 @@ class Siege(RequiredTool):
         super(Siege, self).__init__(tool_path=tool_path, installable=False, **kwargs)
 
     def check_if_installed(self):
+        if self._get_probe() is not None:
+            return True
+
         self.log.debug("Trying %s: %s", self.tool_name, self.tool_path)
         try:
             out, err = self.call([self.tool_path, "-h"])
@@ -227,4 +233,5 @@ class Siege(RequiredTool):
         if err:
             out += err
         self.log.debug("%s output: %s", self.tool_name, out)
+        self._save_probe()
         return True
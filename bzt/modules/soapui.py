@@ -1 +1 @@
-from bzt.utils import SoapUIScriptConverter     # backward compatibility
+from bzt.xml_utils import SoapUIScriptConverter     # backward compatibility
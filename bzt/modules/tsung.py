@@ -23,12 +23,15 @@ import traceback
 from urllib import parse
 from shutil import which
 
+from lxml import etree
+
 from bzt import TaurusConfigError, ToolError, TaurusInternalException
 from bzt.engine import ScenarioExecutor
 from bzt.modules.aggregator import ConsolidatingAggregator, ResultsReader
 from bzt.modules.console import ExecutorWidget
 from bzt.requests_model import HTTPRequest
-from bzt.utils import CALL_PROBLEMS, shutdown_process, RequiredTool, dehumanize_time, FileReader, etree, iteritems
+from bzt.utils import CALL_PROBLEMS, shutdown_process, RequiredTool, dehumanize_time, FileReader, iteritems
+from bzt.utils import TimestampParser
 
 
 class TsungExecutor(ScenarioExecutor):
@@ -162,9 +165,12 @@ class TsungStatsReader(ResultsReader):
         self.stats_file = FileReader(parent_logger=self.log, file_opener=self.open_stats)
         self.log_file = FileReader(parent_logger=self.log, file_opener=self.open_log)
         self.delimiter = ";"
-        self.partial_buffer = ""
         self.skipped_header = False
         self.concurrency = 0
+        self.timestamps = TimestampParser(int)
+
+    def get_file_readers(self):
+        return [self.stats_file, self.log_file]
 
     def open_stats(self, filename):
         return self.open_file(ext='dump')
@@ -210,24 +216,17 @@ class TsungStatsReader(ResultsReader):
         self.log.debug("Reading Tsung results")
 
         self._read_concurrency(last_pass)
-        lines = self.stats_file.get_lines(size=1024 * 1024, last_pass=last_pass)
+        lines = self.stats_file.get_complete_lines(size=1024 * 1024, last_pass=last_pass)
 
         for line in lines:
-            if not line.endswith("\n"):
-                self.partial_buffer += line
-                continue
-
             if not self.skipped_header and line.startswith("#"):
                 self.skipped_header = True
                 continue
 
-            line = "%s%s" % (self.partial_buffer, line)
-            self.partial_buffer = ""
-
             line = line.strip()
             fields = line.split(self.delimiter)
 
-            tstamp = int(float(fields[0]))
+            tstamp = self.timestamps.parse(fields[0].partition('.')[0])
             url = fields[4] + fields[5]
             rstatus = fields[6]
             rsize = int(fields[7])
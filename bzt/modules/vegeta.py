@@ -21,7 +21,7 @@ from bzt.modules import ScenarioExecutor
 from bzt.modules.console import ExecutorWidget
 from bzt.modules.aggregator import ResultsReader, ConsolidatingAggregator
 from bzt.utils import RequiredTool, CALL_PROBLEMS, FileReader, shutdown_process, get_full_path, is_windows, is_mac, \
-    untar
+    untar, TimestampParser
 
 
 class VegetaExecutor(ScenarioExecutor):
@@ -129,6 +129,7 @@ class VegetaLogReader(ResultsReader):
         super(VegetaLogReader, self).__init__()
         self.log = parent_logger.getChild(self.__class__.__name__)
         self.file = FileReader(filename=filename, parent_logger=self.log)
+        self.timestamps = TimestampParser(int)
 
     def _read(self, last_pass=False):
         lines = self.file.get_lines(size=1024 * 1024, last_pass=last_pass)
@@ -136,7 +137,7 @@ class VegetaLogReader(ResultsReader):
         for line in lines:
             log_vals = [val.strip() for val in line.split(',')]
 
-            _tstamp = int(log_vals[0][:10])
+            _tstamp = self.timestamps.parse(log_vals[0][:10])
             _url = log_vals[10]
             _concur = 1
             _etime = float(log_vals[2]) / 1000000000.0
@@ -167,6 +168,9 @@ class Vegeta(RequiredTool):
         super(Vegeta, self).__init__(tool_path=self.tool_path, download_link=download_link, version=version, **kwargs)
 
     def check_if_installed(self):
+        if self._get_probe() is not None:
+            return True
+
         self.log.debug('Checking Vegeta Framework: %s' % self.tool_path)
         try:
             out, err = self.call([self.tool_path, '-version'])
@@ -177,6 +181,7 @@ class Vegeta(RequiredTool):
         if err:
             out += err
         self.log.debug("Vegeta output: %s", out)
+        self._save_probe()
         return True
 
     def install(self):
@@ -0,0 +1,149 @@
+"""
+Per-second KPI frames: compact results format for runners owned by Taurus.
+Module has no dependencies besides standard library, so runners can use it in any environment.
+
+Each line of results file is JSON object holding aggregated stats for one second:
+{"ts": 1600000000, "concurrency": 10, "labels": {"label": {"count": 10, "fail": 1, "sum_rt": 3.1, "bytes": 1000,
+"rt": {"120": 9, "1500": 1}, "rc": {"200": 9, "500": 1}, "errors": {"message": 1}}}}
+
+"sum_rt" is sum of response times in seconds, "rt" is histogram of response times in milliseconds,
+with values reduced to HDR bucket precision (3 significant figures). Several frames can share the same
+timestamp when samples come late, reader has to merge them.
+
+Copyright 2017 BlazeMeter Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+   http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import time
+from collections import Counter
+
+HDR_SUB_BUCKET_BITS = 11  # 3 significant figures give 2048 sub-buckets
+
+
+def hdr_bucket(value):
+    """
+    Lowest value equivalent to given one in HDR histogram with 3 significant figures
+
+    :type value: int
+    :rtype: int
+    """
+    shift = value.bit_length() - HDR_SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return (value >> shift) << shift
+
+
+class LabelStats(object):
+    __slots__ = ("count", "fail", "sum_rt", "bytes", "rt", "rc", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.fail = 0
+        self.sum_rt = 0.0
+        self.bytes = 0
+        self.rt = Counter()
+        self.rc = Counter()
+        self.errors = Counter()
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "fail": self.fail,
+            "sum_rt": round(self.sum_rt, 6),
+            "bytes": self.bytes,
+            "rt": self.rt,
+            "rc": self.rc,
+            "errors": self.errors,
+        }
+
+
+class KPIFramesWriter(object):
+    """
+    Aggregates samples per second and label, writes frames for complete seconds
+    not more often than once per flush interval
+
+    :type fhd: io.TextIOBase
+    """
+    TEST_STATUS_CODES = {  # same as in results of functional tests
+        "PASSED": "200",
+        "SKIPPED": "300",
+        "FAILED": "400",
+        "BROKEN": "500",
+    }
+
+    def __init__(self, fhd, flush_interval=1.0):
+        self.fhd = fhd
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+        self.max_second = None
+        self.seconds = {}  # second -> [concurrency, {label -> LabelStats}]
+
+    def add_sample(self, timestamp, label, r_time, r_code=None, error=None, byte_count=0, concurrency=1):
+        """
+        :param timestamp: sample start time, seconds
+        :param r_time: response time, seconds
+        :param error: error message for failed sample, None if successful
+        """
+        second = int(timestamp)
+        if second not in self.seconds:
+            self.seconds[second] = [0, {}]
+            if self.max_second is None or second > self.max_second:
+                self.max_second = second
+
+        sec_stats = self.seconds[second]
+        sec_stats[0] = max(sec_stats[0], concurrency)
+        stats = sec_stats[1].get(label)
+        if stats is None:
+            stats = sec_stats[1][label] = LabelStats()
+
+        stats.count += 1
+        stats.sum_rt += r_time
+        stats.bytes += byte_count or 0
+        stats.rt[hdr_bucket(int(round(r_time * 1000)))] += 1
+        if r_code is not None:
+            stats.rc[r_code] += 1
+        if error is not None:
+            stats.fail += 1
+            stats.errors[error] += 1
+
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def add_test_result(self, start_time, test_case, duration, status, error_msg=None):
+        """
+        Record result of test case the same way test samples are read in load mode
+        """
+        if status == "SKIPPED":
+            return  # we ignore skipped samples to not skew results
+
+        error = error_msg if status in ("FAILED", "BROKEN") else None
+        self.add_sample(start_time, test_case, duration, self.TEST_STATUS_CODES.get(status, "UNKNOWN"), error)
+
+    def flush(self, final=False):
+        """
+        Write frames for complete seconds, all seconds are written on final flush
+        """
+        frames = []
+        for second in sorted(self.seconds):
+            if final or second < self.max_second:
+                concurrency, labels = self.seconds.pop(second)
+                frame = {"ts": second, "concurrency": concurrency, "labels": {}}
+                for label, stats in labels.items():
+                    frame["labels"][label] = stats.to_dict()
+                frames.append(json.dumps(frame))
+
+        if frames:
+            self.fhd.write("\n".join(frames) + "\n")
+            self.fhd.flush()
+        self.last_flush = time.time()
@@ -4,20 +4,78 @@ import json
 import os
 import sys
 import time
-from collections import OrderedDict
 
+import gevent
 from locust import main, events
 from locust.exception import StopUser
 from requests.exceptions import HTTPError
 
+from bzt.resources.kpi_frames import KPIFramesWriter
 from bzt.utils import guess_csv_dialect
 
+JTL_FIELDS = ('timeStamp', 'label', 'method', 'elapsed', 'bytes', 'responseCode', 'responseMessage', 'success',
+              'allThreads', 'Latency')
+
+
+class BufferedWriter(object):
+    """
+    Keeps records in memory and writes them in batches,
+    either when buffer is full or when flush interval has passed.
+    Without new records, LocustStarter flushes buffer periodically
+    """
+
+    def __init__(self, fhd, buffer_size=1000, flush_interval=1.0):
+        self.fhd = fhd
+        self.buffer = []
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+
+    def add(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.buffer_size or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _write(self, records):
+        pass
+
+    def flush(self, final=False):
+        if self.buffer:
+            self._write(self.buffer)
+            self.buffer = []
+            self.fhd.flush()
+        self.last_flush = time.time()
+
+
+class CSVWriter(BufferedWriter):
+    def __init__(self, fhd, **kwargs):
+        super(CSVWriter, self).__init__(fhd, **kwargs)
+        self.writer = csv.writer(fhd, dialect=guess_csv_dialect(",".join(JTL_FIELDS)))
+        self.writer.writerow(JTL_FIELDS)
+
+    def _write(self, records):
+        self.writer.writerows(records)
+
+
+class FramesWriter(KPIFramesWriter):
+    def add(self, record):
+        t_stamp, label, _, elapsed, byte_count, rcode, rmsg, success, concurrency, _ = record
+        error = None if success == 'true' else rmsg
+        self.add_sample(t_stamp / 1000.0, label, elapsed / 1000.0, rcode, error, byte_count, concurrency)
+
+    def flush(self, final=False):
+        # samples are stamped with current time, so all seconds before the current one are complete
+        if self.max_second is not None:
+            self.max_second = max(self.max_second, int(time.time()))
+        super(FramesWriter, self).flush(final)
+
 
 class LocustStarter(object):
     def __init__(self):
         super(LocustStarter, self).__init__()
         self.fhd = None
         self.writer = None
+        self.flusher = None
         self.runner = None
         self.locust_start_time = None
         self.locust_stop_time = None
@@ -53,38 +111,31 @@ class LocustStarter(object):
         if isinstance(response_time, float):
             response_time = int(round(response_time))
 
-        return OrderedDict([
-            ('allThreads', self.runner.user_count if self.runner else 0),
-            ('timeStamp', "%d" % (time.time() * 1000)),
-            ('label', name),
-            ('method', request_type),
-            ('elapsed', response_time),
-            ('bytes', response_length),
-            ('responseCode', rcode),
-            ('responseMessage', rmsg),
-            ('success', 'true' if exc is None else 'false'),
-            ('Latency', 0),
-        ])
+        # order of JTL_FIELDS
+        return (int(time.time() * 1000), name, request_type, response_time, response_length, rcode, rmsg,
+                'true' if exc is None else 'false', self.runner.user_count if self.runner else 0, 0)
 
     def __on_init(self, **args):
         if 'runner' in args:
             self.runner = args['runner']
 
-    def __on_request_success(self, request_type, name, response_time, response_length, **args):
-        self.num_requests -= 1
-        self.writer.writerow(self.__getrec(request_type, name, response_time, response_length))
-        self.fhd.flush()
-        self.__check_limits()
+        if self.writer and not self.flusher:
+            self.flusher = gevent.spawn(self.__flush_periodically)
 
-    def __on_request_failure(self, request_type, name, response_time, exception, response_length=0, **args):
+    def __flush_periodically(self):
+        # records of slow or stopped test must not wait in buffer for the next request
+        while True:
+            gevent.sleep(self.writer.flush_interval)
+            self.writer.flush()
+
+    def __on_request(self, request_type, name, response_time, response_length=0, exception=None, **args):
         self.num_requests -= 1
-        self.writer.writerow(self.__getrec(request_type, name, response_time, response_length, exception))
-        self.fhd.flush()
+        self.writer.add(self.__getrec(request_type, name, response_time, response_length, exception))
         self.__check_limits()
 
     def __on_exception(self, locust_instance, exception, tb, **args):
         del locust_instance, tb
-        self.__on_request_failure('', '', 0, exception)
+        self.__on_request('', '', 0, exception=exception)
 
     def __on_worker_report(self, client_id, data, **args):
         if data['stats'] or data['errors']:
@@ -98,6 +149,12 @@ class LocustStarter(object):
 
     def __on_quit(self, **args):
         self.locust_stop_time = time.time()
+        if self.flusher:
+            self.flusher.kill(block=False)
+            self.flusher = None
+
+        if self.writer:
+            self.writer.flush(final=True)
 
     def execute(self):
         events.init.add_listener(self.__on_init)
@@ -106,24 +163,26 @@ class LocustStarter(object):
         events.quitting.add_listener(self.__on_quit)
 
         if os.getenv("JTL"):    # regular locust worker
-            fname = os.getenv("JTL")
-            self.fhd = open(fname, 'wt')
-            fieldnames = list(self.__getrec(None, None, None, None).keys())
-            dialect = guess_csv_dialect(",".join(fieldnames))
-            self.writer = csv.DictWriter(self.fhd, fieldnames=fieldnames, dialect=dialect)
-            self.writer.writeheader()
-            events.request.add_listener(self.__on_request_success)
-            events.request.add_listener(self.__on_request_failure)
+            self.fhd = open(os.getenv("JTL"), 'wt')
+            self.writer = CSVWriter(self.fhd)
+            events.request.add_listener(self.__on_request)
+        elif os.getenv("KPI_LDJSON"):  # regular locust worker with per-second stats
+            self.fhd = open(os.getenv("KPI_LDJSON"), 'wt')
+            self.writer = FramesWriter(self.fhd)
+            events.request.add_listener(self.__on_request)
         elif os.getenv("WORKERS_LDJSON"):   # master of distributed mode
             fname = os.getenv("WORKERS_LDJSON")
             self.fhd = open(fname, 'wt')
             self.writer = None
         else:
-            raise ValueError("Please specify JTL or WORKERS_LDJSON environment variable")
-
-        main.main()
-
-        self.fhd.close()
+            raise ValueError("Please specify JTL, KPI_LDJSON or WORKERS_LDJSON environment variable")
+
+        try:
+            main.main()
+        finally:
+            if self.writer:
+                self.writer.flush()
+            self.fhd.close()
 
 
 if __name__ == '__main__':
@@ -21,17 +21,35 @@ import time
 
 import molotov
 
+from bzt.resources.kpi_frames import KPIFramesWriter
 
 report_file = open(os.environ["MOLOTOV_TAURUS_REPORT"], 'w')
+frames_writer = KPIFramesWriter(report_file) if os.environ.get("MOLOTOV_TAURUS_KPI_FRAMES") else None
 samples = dict()
 scenarios = dict()
+workers_count = 0
 
 
 def write_report_item(item):
+    if frames_writer is not None:
+        write_frames_item(item)
+        return
+
     report_file.write(json.dumps(item) + "\n")
     report_file.flush()
 
 
+def write_frames_item(item):
+    global workers_count
+    if item["type"] == "workers":
+        workers_count = item["value"]
+    elif item["type"] == "scenario_success":
+        frames_writer.add_sample(item["ts"], item["name"], item["duration"], "200", concurrency=workers_count)
+    elif item["type"] == "scenario_failure":
+        frames_writer.add_sample(item["ts"], item["name"], item["duration"], item["exception"], item["errorMessage"],
+                                 concurrency=workers_count)
+
+
 @molotov.events()
 async def handle_request(event, **info):
     if event == 'sending_request':
@@ -104,4 +122,6 @@ async def print_test_case(event, **info):
 @molotov.global_teardown()
 def close_file():
     if not report_file.closed:
+        if frames_writer is not None:
+            frames_writer.flush(final=True)
         report_file.close()
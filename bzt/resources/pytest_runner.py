@@ -26,9 +26,11 @@ from apiritif.samples import Sample, ApiritifSampleExtractor
 
 
 class RecordingPlugin(object):
-    def __init__(self, report_path):
+    def __init__(self, report_path, kpi_frames=False):
         self._report_path = report_path
         self._report_fds = None
+        self._kpi_frames = kpi_frames
+        self._frames_writer = None
         self.test_count = 0
         self.failed_tests = 0
         self.passed_tests = 0
@@ -40,9 +42,14 @@ class RecordingPlugin(object):
     def prepare(self):
         if self._report_fds is None:
             self._report_fds = open(self._report_path, 'w')
+            if self._kpi_frames:
+                from bzt.resources.kpi_frames import KPIFramesWriter
+                self._frames_writer = KPIFramesWriter(self._report_fds)
 
     def post_process(self):
         if self._report_fds is not None:
+            if self._frames_writer is not None:
+                self._frames_writer.flush(final=True)
             self._report_fds.close()
             self._report_fds = None
 
@@ -50,6 +57,11 @@ class RecordingPlugin(object):
         if self._report_fds is None:
             raise ValueError("Plugin wasn't prepared")
 
+        if self._frames_writer is not None:
+            self._frames_writer.add_test_result(sample.start_time, sample.test_case, sample.duration, sample.status,
+                                                sample.error_msg)
+            return
+
         self._report_fds.write("%s\n" % json.dumps(sample.to_dict()))
         self._report_fds.flush()
 
@@ -143,8 +155,8 @@ class RecordingPlugin(object):
             self._report_sample(test_name)
 
 
-def run_pytest(argv, report_path, iteration_limit, duration_limit):
-    plugin = RecordingPlugin(report_path)
+def run_pytest(argv, report_path, iteration_limit, duration_limit, kpi_frames=False):
+    plugin = RecordingPlugin(report_path, kpi_frames)
     plugin.prepare()
     start_time = int(time.time())
     iteration = 0
@@ -182,6 +194,7 @@ if __name__ == '__main__':
     parser.add_option('-r', '--report-file', action='store', default='report.ldjson')
     parser.add_option('-i', '--iterations', action='store', default=0)
     parser.add_option('-d', '--duration', action='store', default=0)
+    parser.add_option('--kpi-frames', action='store_true', default=False)
     opts, args = parser.parse_args()
 
     opts.iterations = int(opts.iterations)
@@ -193,5 +206,5 @@ if __name__ == '__main__':
         else:
             opts.iterations = 1
 
-    run_pytest(args, opts.report_file, int(opts.iterations), float(opts.duration))
+    run_pytest(args, opts.report_file, int(opts.iterations), float(opts.duration), opts.kpi_frames)
 
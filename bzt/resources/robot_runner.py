@@ -12,9 +12,11 @@ from robot import run
 class TaurusListener:
     ROBOT_LISTENER_API_VERSION = 2
 
-    def __init__(self, report_filename):
+    def __init__(self, report_filename, kpi_frames=False):
         self._report_filename = report_filename
         self._report_file = None
+        self._kpi_frames = kpi_frames
+        self._frames_writer = None
         self._test_count = 0
         self._passed_tests = 0
         self._failed_tests = 0
@@ -22,9 +24,14 @@ class TaurusListener:
 
     def prepare(self):
         self._report_file = open(self._report_filename, 'wt')
+        if self._kpi_frames:
+            from bzt.resources.kpi_frames import KPIFramesWriter
+            self._frames_writer = KPIFramesWriter(self._report_file)
 
     def post_process(self):
         if self._report_file is not None:
+            if self._frames_writer is not None:
+                self._frames_writer.flush(final=True)
             self._report_file.close()
 
     def get_test_count(self):
@@ -44,6 +51,11 @@ class TaurusListener:
         if self._report_file is None:
             raise ValueError("Plugin wasn't prepared")
 
+        if self._frames_writer is not None:
+            self._frames_writer.add_test_result(sample.start_time, sample.test_case, sample.duration, sample.status,
+                                                sample.error_msg)
+            return
+
         self._report_file.write("%s\n" % json.dumps(sample.to_dict()))
         self._report_file.flush()
 
@@ -82,8 +94,9 @@ class TaurusListener:
         self._current_suite = None
 
 
-def run_robot(targets, report_file, iteration_limit, duration_limit, variablefile, outputfile, logfile, include, cmdline):
-    listener = TaurusListener(report_file)
+def run_robot(targets, report_file, iteration_limit, duration_limit, variablefile, outputfile, logfile, include, cmdline,
+              kpi_frames=False):
+    listener = TaurusListener(report_file, kpi_frames)
     listener.prepare()
     stdout = StringIO()
     stderr = StringIO()
@@ -131,6 +144,7 @@ if __name__ == '__main__':
     parser.add_option('-l', '--logfile', action='store', default=None)
     parser.add_option('--include', action='store', default=None)
     parser.add_option('--cmdline', action='store', default=None)
+    parser.add_option('--kpi-frames', action='store_true', default=False)
     opts, args = parser.parse_args()
     if opts.include is not None:
         opts.include = opts.include.split(',')
@@ -144,4 +158,4 @@ if __name__ == '__main__':
             opts.iterations = 1
 
     run_robot(args, opts.report_file, int(opts.iterations), float(opts.duration), opts.variablefile,
-              opts.outputfile, opts.logfile, opts.include, opts.cmdline)
+              opts.outputfile, opts.logfile, opts.include, opts.cmdline, opts.kpi_frames)
@@ -22,7 +22,8 @@ from optparse import OptionParser
 from bzt import TaurusInternalException
 from bzt.cli import CLI
 from bzt.engine import Configuration
-from bzt.utils import SoapUIScriptConverter, iteritems
+from bzt.utils import iteritems
+from bzt.xml_utils import SoapUIScriptConverter
 
 
 class SoapUI2YAML(object):
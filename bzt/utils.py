@@ -39,15 +39,16 @@ import subprocess
 import sys
 import tarfile
 import tempfile
+import threading
 import time
 import traceback
 import webbrowser
 import zipfile
 from abc import abstractmethod
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
 from contextlib import contextmanager
-from distutils.version import LooseVersion
-from io import IOBase
+from functools import lru_cache
+from io import IOBase, StringIO, BytesIO
 from ssl import SSLError
 from subprocess import CalledProcessError, PIPE, check_output, STDOUT
 from urllib import parse
@@ -55,23 +56,36 @@ from urllib.error import URLError
 from urllib.request import url2pathname
 from webbrowser import GenericBrowser
 
-import psutil
-import requests
-import requests.adapters
-from lxml import etree
 from progressbar import ProgressBar, Percentage, Bar, ETA
-from requests.exceptions import ReadTimeout
-from urwid import BaseScreen
+# psutil, requests and lxml take long to import, they're imported by functions using them
 
 from bzt import TaurusInternalException, TaurusNetworkError, ToolError, TaurusConfigError
 
 LOG = logging.getLogger("")
 CALL_PROBLEMS = (CalledProcessError, OSError)
-NETWORK_PROBLEMS = (IOError, URLError, SSLError, ReadTimeout, TaurusNetworkError)
+NETWORK_PROBLEMS = (IOError, URLError, SSLError, TaurusNetworkError)  # requests exceptions are IOErrors
 numeric_types = (int, float, complex)
 viewvalues = operator.methodcaller("values")
 
 
+def __getattr__(name):
+    """
+    Objects that used to be imported here eagerly are loaded on first access
+    """
+    if name == "etree":
+        from lxml import etree
+        return etree
+    elif name == "DummyScreen":
+        from bzt.modules.console import DummyScreen
+        return DummyScreen
+    elif name == "LocalFileAdapter":
+        return _get_local_file_adapter_class()
+    elif name in ("PythonGenerator", "SoapUIScriptConverter"):
+        from bzt import xml_utils
+        return getattr(xml_utils, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
 def unicode_decode(string, errors="strict"):
     if isinstance(string, bytes):
         return string.decode("utf-8", errors)
@@ -165,6 +179,59 @@ def get_files_recursive(dir_name, exclude_mask=''):
                 yield os.path.join(root, _file)
 
 
+class LooseVersion(object):
+    """
+    Version compared by its numeric and alphabetic components,
+    behaves like distutils.version.LooseVersion that is expensive to import
+
+    :type version: list
+    """
+    COMPONENT_RE = re.compile(r'(\d+ | [a-z]+ | \.)', re.VERBOSE)
+
+    def __init__(self, vstring):
+        self.vstring = vstring
+        self.version = []
+        for component in self.COMPONENT_RE.split(vstring):
+            if component and component != '.':
+                self.version.append(int(component) if component.isdigit() else component)
+
+    def __str__(self):
+        return self.vstring
+
+    def __repr__(self):
+        return "LooseVersion ('%s')" % self.vstring
+
+    def _cmp(self, other):
+        if isinstance(other, str):
+            other = LooseVersion(other)
+        elif not isinstance(other, LooseVersion):
+            return NotImplemented
+
+        if self.version == other.version:
+            return 0
+        return -1 if self.version < other.version else 1
+
+    def __eq__(self, other):
+        res = self._cmp(other)
+        return res if res is NotImplemented else res == 0
+
+    def __lt__(self, other):
+        res = self._cmp(other)
+        return res if res is NotImplemented else res < 0
+
+    def __le__(self, other):
+        res = self._cmp(other)
+        return res if res is NotImplemented else res <= 0
+
+    def __gt__(self, other):
+        res = self._cmp(other)
+        return res if res is NotImplemented else res > 0
+
+    def __ge__(self, other):
+        res = self._cmp(other)
+        return res if res is NotImplemented else res >= 0
+
+
 def parse_java_version(versions):
     if versions:
         version = versions[0]
@@ -522,6 +589,8 @@ def shell_exec(args, cwd=None, stdout=PIPE, stderr=PIPE, stdin=PIPE, shell=False
         "env": env
     }
 
+    import psutil
+
     if is_windows():
         if pgrp:
             kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
@@ -634,6 +703,36 @@ class Environment(object):
             method(*args, **kwargs)
 
 
+class TimestampParser(object):
+    """
+    Converts timestamp strings of results files into numbers. Consecutive lines mostly share
+    the same second, so last conversion is remembered and recent ones are kept in small LRU cache.
+
+    :param converter: function to convert string into timestamp
+    """
+
+    def __init__(self, converter, cache_size=256):
+        self.converter = lru_cache(maxsize=cache_size)(converter)
+        self.last_value = None
+        self.last_result = None
+
+    def parse(self, value):
+        if value != self.last_value:
+            self.last_result = self.converter(value)
+            self.last_value = value
+        return self.last_result
+
+    @staticmethod
+    def from_format(fmt):
+        """
+        Parser of local time strings in given format, results are integer epoch seconds
+
+        :type fmt: str
+        :rtype: TimestampParser
+        """
+        return TimestampParser(lambda value: int(time.mktime(time.strptime(value, fmt))))
+
+
 class FileReader(object):
     SYS_ENCODING = locale.getpreferredencoding()
 
@@ -656,6 +755,7 @@ class FileReader(object):
         self.decoder = codecs.lookup(self.cp).incrementaldecoder()
         self.fallback_decoder = codecs.lookup(self.SYS_ENCODING).incrementaldecoder(errors='ignore')
         self.offset = 0
+        self._chunk = bytearray()  # reusable read buffer
 
     def _readlines(self, hint=None):
         # get generator instead of list (in regular readlines())
@@ -727,6 +827,71 @@ class FileReader(object):
             else:
                 return _bytes
 
+    @staticmethod
+    def _get_complete_length(data, length, quotechar=None):
+        """
+        Length of complete lines in data, with quotechar given newline inside quotes doesn't complete line
+
+        :type data: bytearray or bytes
+        :type quotechar: bytes
+        """
+        end = data.rfind(b"\n", 0, length) + 1
+        if quotechar:
+            in_quotes = data.count(quotechar, 0, end) % 2
+            while end and in_quotes:  # last newline is inside quoted field, step back line by line
+                start = data.rfind(b"\n", 0, end - 1) + 1
+                in_quotes ^= data.count(quotechar, start, end) % 2
+                end = start
+
+        return end
+
+    def get_complete_bytes(self, size=-1, last_pass=False, decode=True, quotechar=None):
+        """
+        Read chunk of complete lines. Incomplete last line isn't consumed, it's read again on next call,
+        so it's never copied and concatenated. Data is read into reusable buffer and split in bytes,
+        only complete part is decoded.
+
+        :param size: amount of bytes to read, it's doubled if there is no complete line in it
+        :param last_pass: read everything till the end of file
+        :param decode: return str instead of bytes
+        :param quotechar: CSV quote char, lines are split only outside of quoted fields
+        :type quotechar: bytes
+        """
+        if not self.is_ready():
+            return "" if decode else b""
+
+        size = -1 if last_pass else int(size)
+        self.fds.seek(self.offset)
+        if size < 0:
+            data = self.fds.read()
+            length = len(data)
+        else:
+            while True:
+                if len(self._chunk) < size:
+                    self._chunk = bytearray(size)
+                data = self._chunk
+                length = self.fds.readinto(memoryview(data)[:size])
+                if length < size or self._get_complete_length(data, length, quotechar):
+                    break
+
+                size *= 2  # line is longer than chunk, try bigger one
+                self.fds.seek(self.offset)
+
+        end = self._get_complete_length(data, length, quotechar)
+        self.offset += end
+        if decode:
+            return self._decode(memoryview(data)[:end]) if end else ""
+        else:
+            return bytes(memoryview(data)[:end])
+
+    def get_complete_lines(self, size=-1, last_pass=False, decode=True, quotechar=None):
+        """
+        Generator of complete lines, see get_complete_bytes()
+        """
+        data = self.get_complete_bytes(size, last_pass, decode, quotechar)
+        if data:
+            yield from StringIO(data) if decode else BytesIO(data)
+
     def __del__(self):
         self.close()
 
@@ -735,6 +900,129 @@ class FileReader(object):
             self.fds.close()
 
 
+class ChangesWatcher(object):
+    """
+    Remembers sizes and modification times of files and return codes of processes,
+    tells if anything of them has changed since previous call
+    """
+
+    def __init__(self):
+        self.states = {}
+
+    @staticmethod
+    def _get_file_state(filename):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+
+        return stat.st_size, stat.st_mtime_ns
+
+    def changed(self, filenames=(), processes=()):
+        """
+        :type filenames: list[str]
+        :type processes: list[subprocess.Popen]
+        :rtype: bool
+        """
+        states = {filename: self._get_file_state(filename) for filename in filenames}
+        for process in processes:
+            states[process] = process.poll()
+
+        changed = any(self.states.get(key) != state for key, state in states.items())
+        self.states = states
+        return changed
+
+
+class BackgroundWorker(threading.Thread):
+    """
+    Runs submitted calls one by one in separate thread, so slow network operations
+    don't delay engine loop. Queue is bounded: if it's full, the oldest task is dropped.
+    Exception of failed task is re-raised by next check() call from owner thread.
+    """
+
+    def __init__(self, name, parent_logger, queue_size=10):
+        super(BackgroundWorker, self).__init__(name=name, daemon=True)
+        self.log = parent_logger.getChild(self.__class__.__name__)
+        self.queue_size = queue_size
+        self.tasks = deque()
+        self.busy = False
+        self.done = 0
+        self.dropped = 0
+        self._exc_info = None
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    @property
+    def queue_depth(self):
+        return len(self.tasks) + int(self.busy)
+
+    def submit(self, func, *args, **kwargs):
+        with self._condition:
+            if len(self.tasks) >= self.queue_size:
+                self.tasks.popleft()
+                self.dropped += 1
+                self.log.warning("Queue of %s is full, the oldest task dropped", self.name)
+
+            self.tasks.append((func, args, kwargs))
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self.tasks and not self._stopping:
+                    self._condition.wait()
+
+                if not self.tasks:
+                    return
+
+                func, args, kwargs = self.tasks.popleft()
+                self.busy = True
+
+            try:
+                func(*args, **kwargs)
+            except BaseException as exc:
+                self.log.debug("Task of %s failed: %s", self.name, traceback.format_exc())
+                if not self._exc_info:
+                    self._exc_info = exc, sys.exc_info()
+            finally:
+                self.busy = False
+                self.done += 1
+
+    def clear(self):
+        """
+        Drop tasks waiting in queue, running task isn't interrupted
+
+        :return: number of dropped tasks
+        """
+        with self._condition:
+            count = len(self.tasks)
+            self.tasks.clear()
+            self.dropped += count
+
+        return count
+
+    def check(self):
+        if self._exc_info:
+            exc, exc_info = self._exc_info
+            self._exc_info = None
+            reraise(exc_info, exc)
+
+    def stop(self, timeout=None):
+        """
+        Let queued tasks finish and stop the thread
+
+        :return: True if thread has finished
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+        if self.is_alive():
+            self.join(timeout)
+
+        return not self.is_alive()
+
+
 def ensure_is_dict(container, key, sub_key):
     """
     Ensure that dict item is dict, convert if needed
@@ -1087,6 +1375,7 @@ def shutdown_process(process_obj, log_obj, send_sigterm=True):
         log_obj.info(msg, process_obj.pid, kill_signal, time_limit - count)
         try:
             if is_windows():
+                import psutil
                 cur_pids = psutil.pids()
                 if process_obj.pid in cur_pids:
                     jm_proc = psutil.Process(process_obj.pid)
@@ -1100,59 +1389,70 @@ def shutdown_process(process_obj, log_obj, send_sigterm=True):
             log_obj.debug("Failed to terminate process: %s", exc)
 
 
-class LocalFileAdapter(requests.adapters.BaseAdapter):
+@lru_cache(maxsize=None)
+def _get_local_file_adapter_class():
     """
-    Protocol Adapter to allow HTTPClient to GET file:// URLs
+    Adapter class is built on first use, so requests is imported only when needed
     """
+    import requests.adapters
 
-    @staticmethod
-    def _chkpath(method, path):
-        """Return an HTTP status for the given filesystem path."""
-        if method.lower() in ('put', 'delete'):
-            return 501, "Not Implemented"
-        elif method.lower() not in ('get', 'head'):
-            return 405, "Method Not Allowed"
-        elif os.path.isdir(path):
-            return 400, "Path Not A File"
-        elif not os.path.isfile(path):
-            return 404, "File Not Found"
-        elif not os.access(path, os.R_OK):
-            return 403, "Access Denied"
-        else:
-            return 200, "OK"
-
-    def send(self, req, **kwargs):  # pylint: disable=unused-argument
-        """Return the file specified by the given request
+    class LocalFileAdapter(requests.adapters.BaseAdapter):
+        """
+        Protocol Adapter to allow HTTPClient to GET file:// URLs
         """
-        path = os.path.normcase(os.path.normpath(url2pathname(req.path_url)))
-        response = requests.Response()
 
-        response.status_code, response.reason = self._chkpath(req.method, path)
-        if response.status_code == 200 and req.method.lower() != 'head':
-            try:
-                response.raw = open(path, 'rb')
-            except (OSError, IOError) as err:
-                response.status_code = 500
-                response.reason = str(err)
+        @staticmethod
+        def _chkpath(method, path):
+            """Return an HTTP status for the given filesystem path."""
+            if method.lower() in ('put', 'delete'):
+                return 501, "Not Implemented"
+            elif method.lower() not in ('get', 'head'):
+                return 405, "Method Not Allowed"
+            elif os.path.isdir(path):
+                return 400, "Path Not A File"
+            elif not os.path.isfile(path):
+                return 404, "File Not Found"
+            elif not os.access(path, os.R_OK):
+                return 403, "Access Denied"
+            else:
+                return 200, "OK"
 
-        if isinstance(req.url, bytes):
-            response.url = req.url.decode('utf-8')
-        else:
-            response.url = req.url
+        def send(self, req, **kwargs):  # pylint: disable=unused-argument
+            """Return the file specified by the given request
+            """
+            path = os.path.normcase(os.path.normpath(url2pathname(req.path_url)))
+            response = requests.Response()
 
-        response.request = req
-        response.connection = self
+            response.status_code, response.reason = self._chkpath(req.method, path)
+            if response.status_code == 200 and req.method.lower() != 'head':
+                try:
+                    response.raw = open(path, 'rb')
+                except (OSError, IOError) as err:
+                    response.status_code = 500
+                    response.reason = str(err)
 
-        return response
+            if isinstance(req.url, bytes):
+                response.url = req.url.decode('utf-8')
+            else:
+                response.url = req.url
 
-    def close(self):
-        pass
+            response.request = req
+            response.connection = self
+
+            return response
+
+        def close(self):
+            pass
+
+    return LocalFileAdapter
 
 
 class HTTPClient(object):
     def __init__(self):
+        import requests
+
         self.session = requests.Session()
-        self.session.mount('file://', LocalFileAdapter())
+        self.session.mount('file://', _get_local_file_adapter_class()())
         self.log = logging.getLogger(self.__class__.__name__)
         self.proxy_settings = None
 
@@ -1209,6 +1509,8 @@ class HTTPClient(object):
                         reporthook(count, block_size, total)
 
     def download_file(self, url, filename, reporthook=None, data=None, timeout=None):
+        import requests
+
         headers = None
         try:
             with self.session.get(url, stream=True, data=data, timeout=timeout) as conn:
@@ -1228,6 +1530,8 @@ class HTTPClient(object):
         return filename, headers
 
     def request(self, method, url, *args, **kwargs):
+        import requests
+
         self.log.debug('Making HTTP request %s %s', method, url)
         try:
             return self.session.request(method, url, *args, **kwargs)
@@ -1264,12 +1568,219 @@ class ExceptionalDownloader(object):
         return result
 
 
+class ToolProbeCache(object):
+    """
+    Persistent results of successful tool checks, to avoid launching tools on every run.
+    Entries are keyed by tool name and path, they are valid while version requested for tool,
+    size and modification time of tool file stay the same.
+    """
+
+    def __init__(self, filename, parent_logger=None):
+        self.filename = filename
+        self.log = (parent_logger or LOG).getChild(self.__class__.__name__)
+        self.entries = None
+        self.lock = threading.Lock()
+
+    def __load(self):
+        if self.entries is None:
+            self.entries = {}
+            if os.path.isfile(self.filename):
+                try:
+                    with open(self.filename) as fds:
+                        self.entries = json.load(fds)
+                except (OSError, ValueError) as exc:
+                    self.log.debug("Failed to read tool probes from %s: %s", self.filename, exc)
+
+    def __save(self):
+        dirname = os.path.dirname(self.filename)
+        try:
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            tmp_name = "%s.%s.tmp" % (self.filename, os.getpid())
+            with open(tmp_name, 'w') as fds:
+                json.dump(self.entries, fds, indent=1, sort_keys=True)
+            os.replace(tmp_name, self.filename)
+        except OSError as exc:
+            self.log.debug("Failed to save tool probes into %s: %s", self.filename, exc)
+
+    @staticmethod
+    def _get_file_state(tool_path):
+        path = shutil.which(tool_path) if tool_path else None
+        if path is None:
+            return None
+        stat = os.stat(path)
+        return [os.path.realpath(path), stat.st_size, stat.st_mtime_ns]
+
+    def get(self, tool_name, tool_path, tool_version):
+        """
+        :param tool_version: version requested for tool
+        :return: data saved for the tool, None if there's no valid entry
+        :rtype: dict
+        """
+        key = "%s:%s" % (tool_name, tool_path)
+        with self.lock:
+            self.__load()
+            entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        if entry.get("state") != self._get_file_state(tool_path) or entry.get("version") != tool_version:
+            self.log.debug("Tool probe for %s is outdated", key)
+            return None
+
+        return entry.get("data")
+
+    def put(self, tool_name, tool_path, tool_version, **data):
+        state = self._get_file_state(tool_path)
+        if state is None:
+            return
+
+        key = "%s:%s" % (tool_name, tool_path)
+        with self.lock:
+            self.__load()
+            self.entries[key] = {"state": state, "version": tool_version, "data": data}
+            self.__save()
+
+    def invalidate(self, tool_name=None):
+        """
+        Drop saved probes of tool, or all of them if no tool name is given
+        """
+        with self.lock:
+            self.__load()
+            prefix = "%s:" % tool_name if tool_name else ""
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                self.entries.pop(key)
+            self.__save()
+
+
+class BaseConfigsCache(object):
+    """
+    Persistent results of base configs discovery and parsing. List of discovered configs is valid
+    while search paths and modification times of their directories stay the same, parsed documents
+    of config file are valid while its size and modification time stay the same.
+    Index file added into package that has been found already doesn't change state of search paths,
+    so it's not noticed until cache file is removed.
+    """
+
+    def __init__(self, filename, parent_logger=None):
+        self.filename = filename
+        self.log = (parent_logger or LOG).getChild(self.__class__.__name__)
+        self.entries = None
+        self.changed = False
+
+    @staticmethod
+    def _get_path_state(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def __load(self):
+        if self.entries is None:
+            self.entries = {"discovery": None, "parsed": {}}
+            if os.path.isfile(self.filename):
+                try:
+                    with open(self.filename) as fds:
+                        self.entries.update(json.load(fds))
+                except (OSError, ValueError) as exc:
+                    self.log.debug("Failed to read base configs cache from %s: %s", self.filename, exc)
+
+    def save(self):
+        if not self.changed:
+            return
+
+        dirname = os.path.dirname(self.filename)
+        try:
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            tmp_name = "%s.%s.tmp" % (self.filename, os.getpid())
+            with open(tmp_name, 'w') as fds:
+                json.dump(self.entries, fds)
+            os.replace(tmp_name, self.filename)
+            self.changed = False
+        except (OSError, TypeError, ValueError) as exc:
+            self.log.debug("Failed to save base configs cache into %s: %s", self.filename, exc)
+
+    def _get_search_state(self, search_paths):
+        return [[path, self._get_path_state(path)] for path in search_paths]
+
+    def get_indexes(self, search_paths):
+        """
+        :param search_paths: locations of packages, like sys.path
+        :return: bzt-configs.json files found in the same paths by previous discovery -> lists of configs
+        :rtype: dict[str,list[str]]
+        """
+        self.__load()
+        entry = self.entries.get("discovery")
+        if not entry or entry.get("paths") != self._get_search_state(search_paths):
+            return None
+
+        indexes = {}
+        for index_file, state, configs in entry.get("indexes", []):
+            if self._get_path_state(index_file) != state:
+                return None
+            indexes[index_file] = configs
+
+        return indexes
+
+    def put_indexes(self, search_paths, indexes):
+        """
+        :type indexes: dict[str,list[str]]
+        """
+        self.__load()
+        self.entries["discovery"] = {
+            "paths": self._get_search_state(search_paths),
+            "indexes": [[index_file, self._get_path_state(index_file), configs]
+                        for index_file, configs in indexes.items()]}
+        self.changed = True
+
+    def get_parsed(self, config_files, tab_replacement_spaces):
+        """
+        :return: config file -> list of documents parsed from it, only for files that weren't changed
+        :rtype: dict
+        """
+        self.__load()
+        parsed = {}
+        for config_file in config_files:
+            entry = self.entries["parsed"].get(config_file)
+            if entry and entry.get("tabs") == tab_replacement_spaces \
+                    and entry.get("state") == self._get_path_state(config_file):
+                parsed[config_file] = entry["documents"]
+        return parsed
+
+    def put_parsed(self, parsed, tab_replacement_spaces):
+        """
+        :param parsed: config file -> list of documents parsed from it
+        """
+        self.__load()
+        for config_file, documents in parsed.items():
+            entry = self.entries["parsed"].get(config_file)
+            if entry is not None and entry["documents"] is documents:
+                continue
+
+            try:
+                if json.loads(json.dumps(documents)) != documents:  # e.g. dates and non-string keys
+                    continue
+            except (TypeError, ValueError):
+                continue
+
+            self.entries["parsed"][config_file] = {"state": self._get_path_state(config_file),
+                                                   "tabs": tab_replacement_spaces, "documents": documents}
+            self.changed = True
+
+
 class RequiredTool(object):
     """
     Abstract required tool
     """
     VERSION = None
     DOWNLOAD_LINK = None
+    _LOCKS = {}
+    _LOCKS_GUARD = threading.Lock()
 
     def __init__(self, log=None, tool_path="", download_link="", http_client=None,
                  env=None, version=None, installable=True, mandatory=True, dry_install=False):
@@ -1287,10 +1798,58 @@ class RequiredTool(object):
         self.log = log.getChild(self.tool_name)
 
         self.env = env or Environment(self.log)
+        self.probe_cache = None  # type: ToolProbeCache
+        self._probe_version = None
 
     def _get_version(self, output):
         return
 
+    def _get_probe(self):
+        """
+        Data saved by previous successful check of the same tool,
+        checks can skip launching tool if it's found
+
+        :rtype: dict
+        """
+        self._probe_version = self.version
+        if self.probe_cache is None:
+            return None
+
+        data = self.probe_cache.get(self.tool_name, self.tool_path, self._probe_version)
+        if data is not None:
+            self.log.debug("Found result of previous check for %s: %s", self.tool_path, data)
+            if data.get("version"):
+                self.version = data["version"]
+        return data
+
+    def _save_probe(self, **data):
+        """
+        Remember successful check of tool, detected version is saved as well
+        """
+        if self.probe_cache is not None:
+            self.probe_cache.put(self.tool_name, self.tool_path, self._probe_version, version=self.version, **data)
+
+    def get_lock(self):
+        """
+        Lock shared by all instances of the same tool, modules prepared in parallel
+        hold it to check and install tool
+
+        :rtype: threading.RLock
+        """
+        with RequiredTool._LOCKS_GUARD:
+            return RequiredTool._LOCKS.setdefault((self.tool_name, self.tool_path), threading.RLock())
+
+    @staticmethod
+    def install_batch(tools):
+        """
+        Install several tools at once, tools of the same kind share this method
+        and can override it to install together
+
+        :type tools: list[RequiredTool]
+        """
+        for tool in tools:
+            tool.install()
+
     def call(self, *args, **kwargs):
         mixed_env = self.env.get()
         mixed_env.update(kwargs.get("env", {}))
@@ -1365,6 +1924,9 @@ class JavaVM(RequiredTool):
         return version
 
     def check_if_installed(self):
+        if self._get_probe() is not None:
+            return True
+
         cmd = [self.tool_path, '-version']
         self.log.debug("Trying %s: %s", self.tool_name, cmd)
         try:
@@ -1378,6 +1940,7 @@ class JavaVM(RequiredTool):
         if err:
             out += err
         self.log.debug("%s output: %s", self.tool_name, out)
+        self._save_probe()
         return True
 
 
@@ -1591,112 +2154,6 @@ def platform_bitness():
 EXE_SUFFIX = ".bat" if is_windows() else ".sh"
 
 
-class DummyScreen(BaseScreen):
-    """
-    Null-object for Screen on non-tty output
-    """
-
-    def __init__(self, rows=120, cols=40):
-        super(DummyScreen, self).__init__()
-        self.size = (rows, cols)
-        self.ansi_escape = re.compile(r'\x1b[^m]*m')
-
-    def get_cols_rows(self):
-        """
-        Dummy cols and rows
-
-        :return:
-        """
-        return self.size
-
-    def draw_screen(self, size, canvas):
-        """
-
-        :param size:
-        :type canvas: urwid.Canvas
-        """
-        data = ""
-        for char in canvas.content():
-            line = ""
-            for part in char:
-                if isinstance(part[2], str):
-                    line += part[2]
-                else:
-                    line += part[2].decode()
-            data += "%s│\n" % line
-        data = self.ansi_escape.sub('', data)
-        LOG.info("Screen %sx%s chars:\n%s", size[0], size[1], data)
-
-
-class PythonGenerator(object):
-    IMPORTS = ''
-    INDENT_STEP = 4
-
-    def __init__(self, scenario):
-        self.root = etree.Element("PythonCode")
-        self.tree = etree.ElementTree(self.root)
-        self.log = scenario.engine.log.getChild(self.__class__.__name__)
-        self.scenario = scenario
-
-    def add_imports(self):
-        imports = etree.Element("imports")
-        imports.text = self.IMPORTS
-        return imports
-
-    @abstractmethod
-    def build_source_code(self):
-        pass
-
-    @staticmethod
-    def gen_class_definition(class_name, inherits_from, indent=0):
-        def_tmpl = "class {class_name}({inherits_from}):"
-        class_def_element = etree.Element("class_definition", indent=str(indent))
-        class_def_element.text = def_tmpl.format(class_name=class_name, inherits_from="".join(inherits_from))
-        return class_def_element
-
-    @staticmethod
-    def gen_method_definition(method_name, params, indent=None):
-        if indent is None:
-            indent = PythonGenerator.INDENT_STEP
-
-        def_tmpl = "def {method_name}({params}):"
-        method_def_element = etree.Element("method_definition", indent=str(indent))
-        method_def_element.text = def_tmpl.format(method_name=method_name, params=",".join(params))
-        return method_def_element
-
-    @staticmethod
-    def gen_decorator_statement(decorator_name, indent=None):
-        if indent is None:
-            indent = PythonGenerator.INDENT_STEP
-
-        def_tmpl = "@{decorator_name}"
-        decorator_element = etree.Element("decorator_statement", indent=str(indent))
-        decorator_element.text = def_tmpl.format(decorator_name=decorator_name)
-        return decorator_element
-
-    @staticmethod
-    def gen_statement(statement, indent=None):
-        if indent is None:
-            indent = PythonGenerator.INDENT_STEP * 2
-
-        statement_elem = etree.Element("statement", indent=str(indent))
-        statement_elem.text = statement
-        return statement_elem
-
-    def gen_comment(self, comment, indent=None):
-        return self.gen_statement("# %s" % comment, indent=indent)
-
-    def save(self, filename):
-        with codecs.open(filename, 'w', encoding='utf-8') as fds:
-            for child in self.root.iter():
-                if child.text is not None:
-                    indent = int(child.get('indent', "0"))
-                    fds.write(" " * indent + child.text + "\n")
-
-    def gen_new_line(self, indent=0):
-        return self.gen_statement("", indent=indent)
-
-
 def str_representer(dumper, data):
     """ Representer for PyYAML that dumps multiline strings as | scalars """
     if len(data.splitlines()) > 1:
@@ -1724,19 +2181,16 @@ class LDJSONReader(object):
         self.file = FileReader(filename=filename,
                                file_opener=lambda f: open(f, 'rb'),
                                parent_logger=self.log)
-        self.partial_buffer = ""
 
     def read(self, last_pass=False):
-        lines = self.file.get_lines(size=1024 * 1024, last_pass=last_pass)
-
-        for line in lines:
-            if not last_pass and not line.endswith("\n"):
-                self.partial_buffer += line
-                continue
-            line = "%s%s" % (self.partial_buffer, line)
-            self.partial_buffer = ""
+        for line in self.file.get_complete_lines(size=1024 * 1024, last_pass=last_pass):
             yield json.loads(line)
 
+        if last_pass:
+            tail = self.file.get_bytes(last_pass=True)  # last line without line break
+            if tail and tail.strip():
+                yield json.loads(tail)
+
 
 def get_host_ips(filter_loopbacks=True):
     """
@@ -1744,6 +2198,8 @@ def get_host_ips(filter_loopbacks=True):
 
     :param filter_loopbacks: filter out loopback addresses
     """
+    import psutil
+
     ips = []
     for _, interfaces in iteritems(psutil.net_if_addrs()):
         for iface in interfaces:
@@ -1823,526 +2279,3 @@ def parse_think_time(think_time, full=False):
         return res.group(2).lower()  # make it simple!
     else:
         return [res.group(i + 1).lower() for i in range(3)]
-
-
-class SoapUIScriptConverter(object):
-    NAMESPACES = dict(con="http://eviware.com/soapui/config")
-
-    def __init__(self, parent_log):
-        self.log = parent_log.getChild(self.__class__.__name__)
-        self.tree = None
-        self.interface = None
-
-    def load(self, path):
-        try:
-            self.tree = etree.ElementTree()
-            self.tree.parse(path)
-        except BaseException as exc:
-            msg = "XML parsing failed for file %s: %s"
-            raise TaurusInternalException(msg % (path, exc))
-
-    def _extract_headers(self, config_elem):
-        headers_settings = config_elem.find(
-            './/con:settings/con:setting[@id="com.eviware.soapui.impl.wsdl.WsdlRequest@request-headers"]',
-            namespaces=self.NAMESPACES)
-        if headers_settings is None:
-            return None
-        headers = etree.fromstring(headers_settings.text)
-        if "{" + self.NAMESPACES['con'] + "}" + "entry" == headers.tag:
-            entries = [headers]
-        else:
-            entries = headers.findall(".//con:entry", namespaces=self.NAMESPACES)
-
-        headers = {entry.get('key'): entry.get('value')
-                   for entry in entries}
-        return headers
-
-    def _extract_assertions(self, config_elem):
-        assertions = []
-        assertion_tags = config_elem.findall('.//con:assertion', namespaces=self.NAMESPACES)
-        for assertion in assertion_tags:
-            # TODO: XPath assertions / JSONPath assertions ?
-            if assertion.get('type') in ('Simple Contains', 'Simple NotContains'):
-                subject = assertion.findtext('./con:configuration/token', namespaces=self.NAMESPACES)
-                use_regex = assertion.findtext('./con:configuration/useRegEx', namespaces=self.NAMESPACES)
-                negate = assertion.get('type') == 'Simple NotContains'
-
-                assertions.append({"contains": [subject],
-                                   "subject": "body",
-                                   "regexp": use_regex == "true",
-                                   "not": negate,
-                                   })
-        return assertions
-
-    def _extract_http_request(self, test_step):
-        config = test_step.find('./con:config', namespaces=self.NAMESPACES)
-
-        request = {
-            "label": test_step.get('name'),
-            "url": config.find('.//con:endpoint', namespaces=self.NAMESPACES).text}
-
-        method = config.get('method')
-
-        if method is not None and method != "GET":
-            request["method"] = method
-
-        headers = self._extract_headers(config)
-        assertions = self._extract_assertions(config)
-
-        if headers:
-            request["headers"] = headers
-
-        if assertions:
-            request["assert"] = assertions
-
-        body = config.findtext('./con:request', namespaces=self.NAMESPACES)
-
-        if body is not None:
-            request["body"] = body
-
-        params = config.findall('./con:parameters/con:parameter', namespaces=self.NAMESPACES)
-
-        if params:
-            body = {}
-            for param in params:
-                key = param.findtext("./con:name", namespaces=self.NAMESPACES)
-                value = param.findtext("./con:value", namespaces=self.NAMESPACES)
-                body[key] = value
-            request["body"] = body
-
-        return request
-
-    def _extract_soap_endpoint(self, interface_name, operation_name):
-        interface = self.tree.find("//con:interface[@name='%s']" % interface_name, namespaces=self.NAMESPACES)
-        if interface is None:
-            self.log.warning("Can't find intreface %s for operation %s, skipping", interface_name, operation_name)
-            return None
-
-        interface_endpoint = interface.findtext("./con:endpoints/con:endpoint", namespaces=self.NAMESPACES)
-
-        operation = interface.find(".//con:operation[@name='%s']" % operation_name, namespaces=self.NAMESPACES)
-        if operation is None:
-            self.log.warning("Can't find operation %s for interface %s, skipping", operation_name, interface_name)
-            return None
-
-        operation_endpoint = operation.findtext(".//con:endpoint", namespaces=self.NAMESPACES)
-
-        if operation_endpoint is not None:
-            return operation_endpoint
-        elif interface_endpoint is not None:
-            return interface_endpoint
-        else:
-            self.log.warning("Can't find endpoint for %s:%s", interface_name, operation_name)
-            return None
-
-    def _extract_soap_request(self, test_step):
-        label = test_step.get('name')
-        config = test_step.find('./con:config', namespaces=self.NAMESPACES)
-        body = config.findtext('./con:request/con:request', namespaces=self.NAMESPACES)
-
-        interface = config.findtext('./con:interface', namespaces=self.NAMESPACES)
-        operation = config.findtext('./con:operation', namespaces=self.NAMESPACES)
-        self.log.debug("Extracting SOAP request, interface=%r, operation=%r", interface, operation)
-        endpoint = self._extract_soap_endpoint(interface, operation)
-
-        if endpoint is None:
-            return
-
-        request = {
-            "url": endpoint,
-            "label": label,
-            "method": "POST",
-            "headers": {
-                "Content-Type": "text/xml; charset=utf-8",
-            }
-        }
-
-        if body:
-            request["body"] = body
-
-        return request
-
-    def _calc_base_address(self, test_step):
-        config = test_step.find('./con:config', namespaces=self.NAMESPACES)
-        service = config.get('service')
-        interfaces = self.tree.xpath('//con:interface', namespaces=self.NAMESPACES)
-        for interface in interfaces:
-            if interface.get("name") == service:
-                endpoint = interface.find('.//con:endpoints/con:endpoint', namespaces=self.NAMESPACES)
-                if endpoint is not None:
-                    service = endpoint.text
-                    break
-        return service
-
-    def _extract_rest_request(self, test_step):
-        config = test_step.find('./con:config', namespaces=self.NAMESPACES)
-        method = config.get('method')
-
-        params = self._parse_parent_resources(config)
-
-        url = self._calc_base_address(test_step) + config.get('resourcePath')
-
-        for param_name in copy.copy(list(params.keys())):
-            template = "{" + param_name + "}"
-            if template in url:
-                param_value = params.pop(param_name)
-                url = url.replace(template, param_value)
-
-        request = {"url": url, "label": test_step.get('name')}
-
-        if method is not None and method != "GET":
-            request["method"] = method
-
-        headers = self._extract_headers(config)
-        assertions = self._extract_assertions(config)
-
-        if headers:
-            request["headers"] = headers
-
-        if assertions:
-            request["assert"] = assertions
-
-        body = {}
-        for key, value in iteritems(params):
-            body[key] = value
-
-        if body:
-            request["body"] = body
-
-        return request
-
-    def _parse_parent_resources(self, config):
-        method_name = config.get('methodName')
-
-        for interface in self.interface:
-            method_obj = interface.find('.//con:method[@name="%s"]' % method_name, namespaces=self.NAMESPACES)
-            if method_obj is not None:
-                break
-
-        params = BetterDict()
-        if method_obj is not None:
-            parent = method_obj.getparent()
-            while parent.tag.endswith('resource'):
-                for param in parent.findall('./con:parameters/con:parameter', namespaces=self.NAMESPACES):
-                    param_name = param.findtext('./con:name', namespaces=self.NAMESPACES)
-                    param_value = param.findtext('./con:value', namespaces=self.NAMESPACES)
-                    def_value = param.findtext('./con:default', namespaces=self.NAMESPACES)
-                    if param_value:
-                        params[param_name] = param_value
-                    elif def_value:
-                        params[param_name] = def_value
-
-                parent = parent.getparent()
-
-        for entry in config.findall('./con:restRequest/con:parameters/con:entry', namespaces=self.NAMESPACES):
-            params.merge({entry.get("key"): entry.get("value")})
-
-        return params
-
-    def _extract_properties(self, block, key_prefix=""):
-        properties = block.findall('./con:properties/con:property', namespaces=self.NAMESPACES)
-        prop_map = {}
-        for prop in properties:
-            key = key_prefix + prop.findtext('./con:name', namespaces=self.NAMESPACES)
-            value = prop.findtext('./con:value', namespaces=self.NAMESPACES)
-            prop_map[key] = value
-        return prop_map
-
-    def _extract_execution(self, test_case):
-        load_exec = {}
-        load_test = test_case.find('./con:loadTest', namespaces=self.NAMESPACES)
-        if load_test is not None:
-            load_exec['concurrency'] = int(load_test.find('./con:threadCount', self.NAMESPACES).text)
-            load_exec['hold-for'] = int(load_test.find('./con:testLimit', self.NAMESPACES).text)
-        else:
-            load_exec['concurrency'] = 1
-        return load_exec
-
-    def _validate_transfer(self, source_type, source_step_name, transfer_type, target_step_name):
-        source_step = self.tree.find("//con:testStep[@name='%s']" % source_step_name, namespaces=self.NAMESPACES)
-        if source_step is None:
-            self.log.warning("Can't find source step (%s) for Property Transfer. Skipping", source_step_name)
-            return False
-
-        source_step_type = source_step.get("type")
-        if source_step_type not in ["httprequest", "restrequest", "request"]:
-            self.log.warning("Unsupported source step type for Property Transfer (%s). Skipping", source_step_type)
-            return False
-
-        if source_type != "Response":
-            self.log.warning("Found Property Transfer with non-response source (%s). Skipping", source_type)
-            return False
-
-        if transfer_type not in ["JSONPATH", "XPATH"]:
-            self.log.warning("Found Property Transfer with unsupported type (%s). Skipping", transfer_type)
-            return False
-
-        target_step = self.tree.find("//con:testStep[@name='%s']" % target_step_name, namespaces=self.NAMESPACES)
-        if target_step is None:
-            self.log.warning("Can't find target step (%s) for Property Transfer. Skipping", target_step_name)
-            return False
-
-        target_step_type = target_step.get("type")
-        if target_step_type != "properties":
-            self.log.warning("Unsupported target step type for Property Transfer (%s). Skipping", target_step_type)
-            return False
-
-        return True
-
-    def _extract_transfer(self, transfer):
-        source_type = transfer.findtext('./con:sourceType', namespaces=self.NAMESPACES)
-        source_step_name = transfer.findtext('./con:sourceStep', namespaces=self.NAMESPACES)
-        query = transfer.findtext('./con:sourcePath', namespaces=self.NAMESPACES)
-        transfer_type = transfer.findtext('./con:type', namespaces=self.NAMESPACES)
-        target_step_name = transfer.findtext('./con:targetStep', namespaces=self.NAMESPACES)
-        target_prop = transfer.findtext('./con:targetType', namespaces=self.NAMESPACES)
-
-        if source_step_name.startswith("#") and source_step_name.endswith("#"):
-            source_step_name = source_step_name[1:-1]
-
-        if not self._validate_transfer(source_type, source_step_name, transfer_type, target_step_name):
-            return None
-
-        extractor = BetterDict()
-        if transfer_type == "JSONPATH":
-            extractor.merge({
-                'extract-jsonpath': {
-                    target_prop: {
-                        'jsonpath': query,
-                        'default': 'NOT_FOUND',
-                    }
-                }
-            })
-        elif transfer_type == "XPATH":
-            extractor.merge({
-                'extract-xpath': {
-                    target_prop: {
-                        'xpath': query,
-                        'default': 'NOT_FOUND',
-                    }
-                }
-            })
-        return {source_step_name: extractor}
-
-    def _extract_property_transfers(self, test_step):
-        extractors = BetterDict()  # label -> {extract-xpath: ..., extract-jsonpath: ...}
-        transfers = test_step.findall('./con:config/con:transfers', namespaces=self.NAMESPACES)
-        if not transfers:
-            return None
-
-        for transfer in transfers:
-            extracted_transfer = self._extract_transfer(transfer)
-            if extracted_transfer is not None:
-                extractors.merge(extracted_transfer)
-
-        return extractors
-
-    def _extract_scenario(self, test_case, case_level_props):
-        variables = BetterDict.from_dict(case_level_props)
-        requests = []
-
-        extractors = BetterDict()
-
-        steps = test_case.findall('.//con:testStep', namespaces=self.NAMESPACES)
-        for step in steps:
-            request = None
-            if step.get("type") == "httprequest":
-                request = self._extract_http_request(step)
-            elif step.get("type") == "restrequest":
-                request = self._extract_rest_request(step)
-            elif step.get("type") == "request":
-                request = self._extract_soap_request(step)
-            elif step.get("type") == "properties":
-                config_block = step.find('./con:config', namespaces=self.NAMESPACES)
-                if config_block is not None:
-                    props = self._extract_properties(config_block)
-                    variables.merge(props)
-            elif step.get("type") == "transfer":
-                extracted_extractors = self._extract_property_transfers(step)  # label -> extractor
-                if extracted_extractors:
-                    extractors.merge(extracted_extractors)
-            elif step.get("type") == "groovy":
-                request = self._extract_script(step)
-
-            if request is not None:
-                requests.append(request)
-
-        for request in requests:
-            label = request["label"]
-            if label in extractors:
-                request.update(extractors[label])
-
-        scenario = {
-            "test-case": test_case.get("name"),
-            "requests": requests
-        }
-        if variables:
-            scenario["variables"] = variables
-
-        return scenario
-
-    def _extract_script(self, test_step):
-        label = test_step.get("name", "Script")
-        script = test_step.find('./con:config/script', namespaces=self.NAMESPACES).text
-        if script is not None:
-            script = script.strip()
-            return {
-                "label": label,
-                "action": "pause",
-                "target": "current-thread",
-                "pause-duration": "0ms",
-                "jsr223": [{
-                    "language": "groovy",
-                    "script-text": script,
-                }]
-            }
-
-    def _extract_test_case(self, test_case, test_suite, suite_level_props):
-        case_name = test_case.get("name")
-        scenario_name = test_suite.get("name") + "-" + case_name
-
-        case_properties = self._extract_properties(test_case)
-        case_properties = {
-            "#TestCase#" + key: value
-            for key, value in iteritems(case_properties)
-        }
-        case_level_props = BetterDict.from_dict(suite_level_props)
-        case_level_props.merge(case_properties)
-
-        scenario = self._extract_scenario(test_case, case_level_props)
-        scenario['test-suite'] = test_suite.get("name")
-
-        return scenario_name, scenario
-
-    def _extract_config(self, project, test_suites, target_test_case=None):
-        execution = []
-        scenarios = {}
-
-        project_properties = self._extract_properties(project, key_prefix="#Project#")
-        project_name = project.get("name")
-
-        interface_exec, interface_scen = self._extract_interface(project_name, self.interface)
-        execution.append(interface_exec)
-        scenarios.update(interface_scen)
-
-        for suite in test_suites:
-            suite_props = BetterDict.from_dict(project_properties)
-            suite_props.merge(self._extract_properties(suite, key_prefix="#TestSuite#"))
-
-            test_cases = suite.findall('.//con:testCase', namespaces=self.NAMESPACES)
-            for case in test_cases:
-                case_name = case.get("name")
-                scenario_name, scenario = self._extract_test_case(case, suite, suite_props)
-
-                load_exec = self._extract_execution(case)
-                load_exec['scenario'] = scenario_name
-                self.log.debug("Extracted execution for scenario %s", scenario_name)
-
-                if not scenario["requests"]:
-                    self.log.warning("No requests extracted for scenario %s, skipping it" % scenario_name)
-                    continue
-
-                if target_test_case is None or target_test_case == case_name:
-                    self.log.debug("Extracted scenario: %s", scenario_name)
-                    scenarios[scenario_name] = scenario
-                    execution.append(load_exec)
-
-        return {
-            "execution": execution,
-            "scenarios": scenarios,
-        }
-
-    def convert_script(self, script_path, target_test_case=None):
-        if not os.path.exists(script_path):
-            raise ValueError("SoapUI script %s doesn't exist" % script_path)
-
-        self.load(script_path)
-
-        self.log.debug("Found namespaces: %s", self.NAMESPACES)
-
-        projects = self.tree.xpath('//con:soapui-project', namespaces=self.NAMESPACES)
-        self.log.debug("Found projects: %s", projects)
-        project = projects[0]
-
-        self.interface = project.findall('.//con:interface', namespaces=self.NAMESPACES)
-        self.log.debug("Found interface: %s", self.interface)
-
-        test_suites = project.findall('.//con:testSuite', namespaces=self.NAMESPACES)
-        self.log.debug("Found test suites: %s", test_suites)
-
-        config = self._extract_config(project, test_suites, target_test_case=target_test_case)
-
-        if not config["scenarios"]:
-            self.log.warning("No scenarios were extracted")
-
-        if not config["execution"]:
-            self.log.warning("No load tests were extracted")
-
-        return config
-
-    def _extract_interface(self, project_name, interfaces):
-        execution = {
-            "concurrency": 1,
-            "iterations": 1,
-            "hold-for": "10s",
-            "scenario": project_name
-        }
-        scenarios = {}
-
-        interface_requests = []
-
-        for interface in interfaces:
-            try:
-                endpoint = interface.find('.//con:endpoint', namespaces=self.NAMESPACES).text
-                resources = interface.findall('.//con:resource', namespaces=self.NAMESPACES)
-                if not resources:
-                    interface_requests.append({
-                        "url": endpoint
-                    })
-                    continue
-            except AttributeError:
-                continue
-
-            for resource in resources:
-                path = resource.get("path")
-                url = endpoint + path
-
-                methods = resource.findall('.//con:method', namespaces=self.NAMESPACES)
-                for method in methods:
-                    method_type = method.get("method")
-
-                    requests = method.findall('con:request', namespaces=self.NAMESPACES)
-                    for request in requests:
-                        request_body = request.find('.//con:request', namespaces=self.NAMESPACES).text
-                        interface_requests.append({
-                            "body": request_body,
-                            "method": method_type,
-                            "url": url
-                        })
-
-        scenarios.update({project_name: {"requests": interface_requests}})
-
-        return execution, scenarios
-
-    def find_soapui_test_case(self, test_case, scenarios):
-        matching_scenarios = [
-            (name, scen)
-            for name, scen in iteritems(scenarios)
-            if scen.get("test-case") == test_case
-        ]
-        if len(matching_scenarios) == 0:
-            sorted_scenarios = sorted((name, scen) for name, scen in iteritems(scenarios))
-            scenario_name, scenario = next(iter(sorted_scenarios))
-            if test_case is None:
-                self.log.warning("No `test-case` specified for SoapUI project, will use '%s'",
-                                 scenario.get("test-case"))
-            else:
-                msg = "No matching test cases found for name '%s', using the '%s'"
-                self.log.warning(msg, test_case, scenario.get("test-case"))
-        elif len(matching_scenarios) > 1:
-            scenario_name, scenario = next(iter(matching_scenarios))
-            msg = "Multiple test cases found for name '%s', using case '%s' from suite '%s'"
-            self.log.warning(msg, test_case, scenario.get('test-case'), scenario.get('test-suite'))
-        else:
-            scenario_name, scenario = next(iter(matching_scenarios))
-        return scenario_name, scenario
@@ -3,12 +3,15 @@ import datetime
 import os
 import random
 import sys
+import threading
+import time
 from _socket import SOCK_STREAM, AF_INET
 from collections import Counter
 from random import random
 
 import requests
 
+from bzt import ToolError
 from bzt.modules import TransactionListener
 from bzt.modules.aggregator import DataPoint, KPISet, ResultsReader, AggregatorListener, ConsolidatingAggregator
 from bzt.modules.functional import FunctionalResultsReader, FunctionalAggregatorListener
@@ -447,6 +450,26 @@ class SingletoneServiceMock(ModuleMock, Singletone, Service):
     pass
 
 
+class SlowPrepareMock(Service):
+    """ takes time to prepare, remembers when and where it happened """
+
+    def __init__(self):
+        super(SlowPrepareMock, self).__init__()
+        self.prepare_thread = None
+        self.prepare_time = None
+
+    def is_prepare_independent(self):
+        return self.parameters.get("independent", True)
+
+    def prepare(self):
+        self.prepare_thread = threading.current_thread().name
+        start = time.time()
+        time.sleep(self.parameters.get("delay", 0.2))
+        self.prepare_time = (start, time.time())
+        if self.parameters.get("fail", False):
+            raise ToolError("failed to prepare %s" % self)
+
+
 class DummyListener(TransactionListener):
     def __init__(self):
         self.transactions = Counter()
@@ -9,6 +9,7 @@ from unittest import skipIf
 import bzt
 from bzt.engine import EXEC
 from bzt.modules import ConsolidatingAggregator
+from bzt.modules.aggregator import KPIFramesReader
 from bzt.modules.functional import FuncSamplesReader, LoadSamplesReader, FunctionalAggregator
 from bzt.modules._apiritif import ApiritifNoseExecutor
 from bzt.modules._pytest import PyTestExecutor
@@ -402,6 +403,16 @@ class TestPyTestExecutor(ExecutorTestCase):
         })
         self.assertTrue(additional_args in " ".join(self.CMD_LINE))
 
+    def test_per_second_stats(self):
+        self.obj.settings["per-second-stats"] = True
+        self.full_run({
+            "scenario": {
+                "script": RESOURCES_DIR + "selenium/pytest/test_single.py"
+            }
+        })
+        self.assertIsInstance(self.obj.reader, KPIFramesReader)
+        self.assertIn('--kpi-frames', self.CMD_LINE)
+
 
 class TestRobotExecutor(ExecutorTestCase):
     EXECUTOR = RobotExecutor
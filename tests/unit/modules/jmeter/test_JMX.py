@@ -1,9 +1,13 @@
 # coding=utf-8
+import time
+
+from lxml import etree
+
 from . import MockJMeterExecutor
 from bzt.engine import Provisioning
 from bzt.utils import BetterDict
-from bzt.jmx import JMX, LoadSettingsProcessor
-from tests.unit import BZTestCase, RESOURCES_DIR, EngineEmul
+from bzt.jmx import JMX, LoadSettingsProcessor, compile_selector
+from tests.unit import BZTestCase, RESOURCES_DIR, EngineEmul, ROOT_LOGGER
 from bzt.jmx.tools import JMeterScenarioBuilder
 from bzt.jmx.mqtt import MQTTProtocolHandler
 from bzt.requests_model import MQTTRequest
@@ -485,3 +489,55 @@ class TestJMX(BZTestCase):
                                     label="label", method="method", timeout=0, body={}, keepalive=True)
         self.assertEqual("/Xhtml;jsessionid=XXXX:XXXX?JacadaApplicationName=XXXX",
                          res.find(".//stringProp[@name='HTTPSampler.path']").text)
+
+    @staticmethod
+    def _get_big_jmx(samplers_count):
+        jmx = JMX()
+        jmx.append(JMX.TEST_PLAN_SEL, JMX.get_thread_group(testname="TG"))
+        samplers = etree.Element("hashTree")
+        jmx.append(JMX.TEST_PLAN_SEL, samplers)
+        for num in range(samplers_count):
+            samplers.append(JMX._get_http_request("http://localhost/%s" % num, "req %s" % num, "GET", None, None, True))
+            samplers.append(etree.Element("hashTree"))
+        return jmx
+
+    def test_compile_selector(self):
+        self.assertIs(compile_selector("[testname='TG']"), compile_selector("[testname='TG']"))
+        jmx = self._get_big_jmx(1)
+        self.assertEqual(1, len(jmx.get("[testname='TG']")))
+
+    def test_get_by_attr(self):
+        jmx = self._get_big_jmx(3)
+        self.assertEqual(jmx.get("[testname='req 1']"), jmx.get_by_attr("testname", "req 1"))
+        self.assertEqual(jmx.get("[testclass=HTTPSamplerProxy]"), jmx.get_by_attr("testclass", "HTTPSamplerProxy"))
+        self.assertEqual(["TG", "req 0", "req 1", "req 2"], sorted(jmx.get_attr_values("testname"))[1:])
+
+        added = JMX._get_http_request("http://localhost/", "added", "GET", None, None, True)
+        jmx.append(JMX.TEST_PLAN_SEL + ">hashTree", added)
+        self.assertEqual([added], jmx.get_by_attr("testname", "added"))
+
+        renamed = jmx.get_by_attr("testname", "req 1")[0]
+        renamed.set("testname", "renamed")
+        removed = jmx.get_by_attr("testname", "req 2")[0]
+        removed.getparent().remove(removed)
+        self.assertEqual([], jmx.get_by_attr("testname", "req 1"))
+        self.assertEqual([], jmx.get_by_attr("testname", "req 2"))
+        self.assertNotIn("req 2", jmx.get_attr_values("testname"))
+
+    def test_big_jmx_speed(self):
+        jmx = self._get_big_jmx(5000)  # about 50k elements
+        names = ["req %s" % num for num in range(0, 5000, 5)]
+
+        start = time.time()
+        found = [jmx.get_by_attr("testname", name) for name in names]
+        index_time = time.time() - start
+
+        start = time.time()
+        selected = [jmx.get("[testname='%s']" % name) for name in names[:20]]
+        select_time = (time.time() - start) * len(names) / 20
+
+        ROOT_LOGGER.debug("Lookup of %s names: %.3fs with index, %.3fs with selectors",
+                          len(names), index_time, select_time)
+        self.assertEqual(selected, found[:20])
+        self.assertTrue(all(len(elements) == 1 for elements in found))
+        self.assertLess(index_time, 1)
@@ -1,5 +1,5 @@
 import os
-from bzt.utils import EXE_SUFFIX, get_full_path, BetterDict
+from bzt.utils import EXE_SUFFIX, get_full_path, BetterDict, ToolProbeCache, temp_file
 from bzt.modules.jmeter import JMeter
 
 from . import MockJMeter
@@ -63,6 +63,21 @@ class TestJMeterTool(BZTestCase):
 
         self.assertIn("Failed to detect plugins", self.log_recorder.warn_buff.getvalue())
 
+    def test_plugins_probe(self):
+        probes_file = temp_file(suffix=".json")
+        self.obj.tool_path = os.path.join(RESOURCES_DIR, "jmeter/jmeter-loader" + EXE_SUFFIX)
+        self.obj.probe_cache = ToolProbeCache(probes_file)
+        try:
+            self.obj.reaction = [{"output": ("one", "two")}, {"output": ("one", "two")}]
+            self.obj.install_for_jmx(RESOURCES_DIR + "/jmeter/jmx/http.jmx")
+            self.obj.install_for_jmx(RESOURCES_DIR + "/jmeter/jmx/http.jmx")
+            self.assertEqual(1, len(self.obj.reaction))  # no need to detect plugins for the same classes again
+
+            self.obj.install_for_jmx(RESOURCES_DIR + "/jmeter/jmx/SteppingThreadGroup.jmx")
+            self.assertEqual(0, len(self.obj.reaction))
+        finally:
+            os.remove(probes_file)
+
     def test_wrong_jmx_name(self):
         self.sniff_log(self.obj.log)
 
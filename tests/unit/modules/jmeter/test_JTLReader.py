@@ -7,7 +7,7 @@ import unittest
 
 from bzt.modules.aggregator import DataPoint, KPISet
 from bzt.modules.jmeter import JTLErrorsReader, JTLReader, FuncJTLReader
-from bzt.utils import to_json
+from bzt.utils import to_json, temp_file
 from tests.unit import BZTestCase, RESOURCES_DIR, close_reader_file, ROOT_LOGGER, EngineEmul
 
 
@@ -258,6 +258,58 @@ class TestJTLErrorsReader(BZTestCase):
         self.assertEquals(KPISet.ERRTYPE_ERROR, values[''][0]['type'])
         self.assertEquals('200', values[''][0]['rc'])
 
+    @staticmethod
+    def write_errors(jtl, samples, body=""):
+        with open(jtl, "w") as fds:
+            fds.write('<?xml version="1.0" encoding="UTF-8"?>\n<testResults version="1.2">\n')
+            for t_stamp, label, url in samples:
+                fds.write('<httpSample t="40" lt="0" ts="%s" s="false" lb="%s" rc="500" rm="Server Error" by="10">\n'
+                          '  <responseData class="java.lang.String">%s</responseData>\n'
+                          '  <java.net.URL>%s</java.net.URL>\n'
+                          '</httpSample>\n' % (t_stamp, label, body, url))
+            fds.write('</testResults>\n')
+
+    def test_huge_response_body(self):
+        jtl = temp_file(suffix=".jtl")
+        self.write_errors(jtl, [(1500000000000, "label", "http://blazedemo.com/")], body="x" * 11 * 1024 * 1024)
+        self.configure(jtl)
+        self.obj.read_file(final_pass=True)
+        values = self.obj.get_data(sys.maxsize)
+        self.assertFalse(self.obj.failed_processing)
+        self.assertEqual("Server Error", values["label"][0]["msg"])
+        self.assertGreater(self.obj.throughput, 0)
+        close_reader_file(self.obj)
+        os.remove(jtl)
+
+    def test_unordered_timestamps(self):
+        jtl = temp_file(suffix=".jtl")
+        stamps = [1000, 2000, 4000, 3000, 1500, 5000, 5000]
+        self.write_errors(jtl, [(t_stamp, "label", "http://blazedemo.com/") for t_stamp in stamps])
+        self.configure(jtl)
+        self.obj.read_file(final_pass=True)
+        self.assertEqual([1.0, 1.5, 2.0, 3.0, 4.0, 5.0], list(self.obj.timeline))
+        self.assertEqual(3, self.obj.get_data(2)["label"][0]["cnt"])
+        self.assertEqual(1, self.obj.get_data(3)["label"][0]["cnt"])
+        self.assertEqual(3, self.obj.get_data(sys.maxsize)["label"][0]["cnt"])
+        self.assertFalse(self.obj.buffer)
+        close_reader_file(self.obj)
+        os.remove(jtl)
+
+    def test_url_variety(self):
+        jtl = temp_file(suffix=".jtl")
+        samples = [(1000 + idx, "label%s" % (idx % 2), "http://blazedemo.com/%s" % idx) for idx in range(300)]
+        self.write_errors(jtl, samples)
+        self.configure(jtl)
+        self.obj.url_variety = 10
+        self.obj.read_file(final_pass=True)
+        values = self.obj.get_data(sys.maxsize)
+        self.assertEqual(10, len(values["label0"][0]["urls"]))
+        self.assertEqual(150, values["label0"][0]["cnt"])
+        self.assertEqual(20, len(values[""][0]["urls"]))
+        self.assertEqual(300, values[""][0]["cnt"])
+        close_reader_file(self.obj)
+        os.remove(jtl)
+
     @unittest.skipUnless(sys.platform == "darwin", "MacOS-only")
     def test_macos_unicode_parsing_is_not_supported(self):
         self.configure(RESOURCES_DIR + "/jmeter/jtl/standard-errors.jtl")
@@ -362,3 +414,72 @@ class TestJTLReader(BZTestCase):
         items = list(subj.items()) + [('concurrency', subj.concurrency)]
         self.assertEqual(exp, enc_dec_iter(items))
         self.assertEqual('{"100.0": 0.1}', to_json(new().get(KPISet.PERCENTILES), indent=None))
+
+    def test_columnar_reader(self):
+        for jtl in ("simple.kpi.jtl", "kpi-pair1.jtl", "tabs.jtl", "unicode.jtl", "doublequoting.jtl"):
+            self.configure(RESOURCES_DIR + "/jmeter/jtl/" + jtl)
+            expected = list(self.obj.datapoints(final_pass=True))
+            close_reader_file(self.obj.csvreader)
+
+            self.configure(RESOURCES_DIR + "/jmeter/jtl/" + jtl)
+            self.obj.columnar = True
+            points = list(self.obj.datapoints(final_pass=True))
+
+            self.assertEqual(len(expected), len(points))
+            for exp_point, point in zip(expected, points):
+                self.assertEqual(exp_point[DataPoint.TIMESTAMP], point[DataPoint.TIMESTAMP])
+                exp_kpis, kpis = exp_point[DataPoint.CUMULATIVE], point[DataPoint.CUMULATIVE]
+                self.assertEqual(set(exp_kpis.keys()), set(kpis.keys()))
+                for label in exp_kpis:
+                    for kpi in (KPISet.SAMPLE_COUNT, KPISet.FAILURES, KPISet.BYTE_COUNT, KPISet.RESP_CODES,
+                                KPISet.PERCENTILES):
+                        self.assertEqual(exp_kpis[label][kpi], kpis[label][kpi])
+                    self.assertEqual(exp_kpis[label].concurrency, kpis[label].concurrency)
+                    self.assertAlmostEqual(exp_kpis[label][KPISet.AVG_RESP_TIME], kpis[label][KPISet.AVG_RESP_TIME])
+                    self.assertEqual(sorted(exp_kpis[label][KPISet.ERRORS], key=lambda x: x['msg']),
+                                     sorted(kpis[label][KPISet.ERRORS], key=lambda x: x['msg']))
+
+    def test_columnar_reader_chunks(self):
+        jtl = temp_file(suffix=".jtl")
+        header = "timeStamp,elapsed,label,responseCode,responseMessage,threadName,success,bytes,allThreads,Latency\n"
+        row = '1500000000%03d,10,label,500,"%s",Thread Group 1-1,false,100,1,5\n'
+        complete = header + row % (0, "first") + '1500000000100,10,broken\n'
+        with open(jtl, "w") as fds:
+            fds.write(complete)
+            fds.write(row % (200, 'multi\n""line""\nmessage'))
+
+        self.configure(jtl)
+        self.obj.columnar = True
+        self.obj.csvreader.read_speed = len(complete) + 70  # chunk ends inside of quoted message
+        columns = self.obj.csvreader.read_columns()
+        self.assertEqual(["first"], list(columns["responseMessage"]))
+        self.assertEqual(1, self.obj.csvreader.skipped_rows)
+
+        columns = self.obj.csvreader.read_columns()
+        self.assertEqual(['multi\n"line"\nmessage'], list(columns["responseMessage"]))
+        self.assertEqual({}, self.obj.csvreader.read_columns(last_pass=True))
+        self.assertEqual(1, self.obj.csvreader.skipped_rows)
+        close_reader_file(self.obj.csvreader)
+        os.remove(jtl)
+
+    def test_columnar_reader_speed(self):
+        jtl = temp_file(suffix=".jtl")
+        with open(jtl, "w") as fds:
+            fds.write("timeStamp,elapsed,label,responseCode,responseMessage,threadName,success,bytes,"
+                      "grpThreads,allThreads,Latency,Connect\n")
+            for idx in range(100000):
+                fds.write("%s,%s,label%s,200,OK,Thread Group 1-1,true,100,10,10,%s,1\n" % (
+                    1500000000000 + idx * 5, idx % 1000, idx % 20, idx % 500))
+
+        res = {}
+        for columnar in (False, True):
+            self.configure(jtl)
+            self.obj.columnar = columnar
+            start = time.time()
+            points = list(self.obj.datapoints(final_pass=True))
+            res[columnar] = time.time() - start
+            self.assertEqual(100000, points[-1][DataPoint.CUMULATIVE][''][KPISet.SAMPLE_COUNT])
+            close_reader_file(self.obj.csvreader)
+
+        ROOT_LOGGER.info("JTL reading time (row-based/columnar): %s / %s", res[False], res[True])
+        os.remove(jtl)
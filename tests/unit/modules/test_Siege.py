@@ -1,8 +1,9 @@
+import os
 import time
 from os.path import join
 
 from bzt import ToolError, TaurusConfigError
-from bzt.utils import EXE_SUFFIX
+from bzt.utils import EXE_SUFFIX, temp_file
 from bzt.modules.siege import SiegeExecutor, DataLogReader
 from bzt.modules.aggregator import ConsolidatingAggregator
 
@@ -132,3 +133,25 @@ class TestDataLogReader(BZTestCase):
 
         for values in list_of_values:
             self.assertTrue(1400000000 < values['ts'] < 1500000000)
+
+    def test_read_speed(self):
+        log_path = temp_file()
+        start_ts = time.mktime(time.strptime("2020-09-13 12:00:00", "%Y-%m-%d %H:%M:%S"))
+        with open(log_path, 'w') as fds:
+            for num in range(100000):  # 1000 requests per second
+                tstamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_ts + num // 1000))
+                fds.write("\x1b[0;34m   4,HTTP/1.1,200,  0.36,   3372,/page%s,0,%s\x1b[0m\n" % (num % 10, tstamp))
+
+        obj = DataLogReader(log_path, ROOT_LOGGER)
+        try:
+            start = time.time()
+            samples = list(obj._read(last_pass=True))
+            duration = time.time() - start
+        finally:
+            close_reader_file(obj)
+            os.remove(log_path)
+
+        ROOT_LOGGER.debug("Siege log read at %d lines/s", len(samples) / duration)
+        self.assertEqual(100000, len(samples))
+        self.assertEqual(start_ts + 99, samples[-1][0])
+        self.assertLess(duration, 5)
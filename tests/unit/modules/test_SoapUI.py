@@ -1,4 +1,4 @@
-from bzt.utils import SoapUIScriptConverter
+from bzt.xml_utils import SoapUIScriptConverter
 from tests.unit import BZTestCase, RESOURCES_DIR, ROOT_LOGGER
 
 
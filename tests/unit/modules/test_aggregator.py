@@ -1,10 +1,18 @@
+import io
 import json
+import os
+import random
 import time
 
-from bzt.utils import to_json
+import numpy
+
+from bzt import TaurusInternalException
+from bzt.utils import to_json, temp_file
 from tests.unit import BZTestCase, ROOT_LOGGER
 
-from bzt.modules.aggregator import ResultsReader, DataPoint, KPISet
+from bzt.modules.aggregator import ResultsReader, DataPoint, KPISet, SamplesBlock, RespTimesCounter, \
+    PointPacker, KPIFramesReader
+from bzt.resources.kpi_frames import KPIFramesWriter, hdr_bucket
 from tests.unit.mocks import r, rc, err, MockReader
 
 
@@ -194,3 +202,386 @@ class TestResultsReader(BZTestCase):
                 rt = float(key)
                 self.assertGreaterEqual(rt, 1.0)
                 self.assertLessEqual(rt, 2.0)
+
+    def test_cumulative_snapshot(self):
+        mock = MockReader()
+        # data format: t_stamp, label, conc, r_time, con_time, latency, r_code, error, trname, byte_count
+        mock.data.append((1, "a", 1, 1, 1, 1, 200, None, '', 0))
+        mock.data.append((2, "b", 1, 2, 2, 2, 200, None, '', 0))
+        mock.data.append((3, "b", 1, 3, 3, 3, 200, None, '', 0))
+
+        first, second, third = list(mock.datapoints(True))
+
+        # unchanged label shares its snapshot, changed ones get new state
+        self.assertIs(first[DataPoint.CUMULATIVE]['a'], third[DataPoint.CUMULATIVE]['a'])
+        self.assertIsNot(second[DataPoint.CUMULATIVE]['b'], third[DataPoint.CUMULATIVE]['b'])
+        self.assertIsNot(first[DataPoint.CUMULATIVE][''], second[DataPoint.CUMULATIVE][''])
+        self.assertEqual(1, second[DataPoint.CUMULATIVE]['b'][KPISet.SAMPLE_COUNT])
+        self.assertEqual(2, third[DataPoint.CUMULATIVE]['b'][KPISet.SAMPLE_COUNT])
+        self.assertEqual(3, third[DataPoint.CUMULATIVE][''][KPISet.SAMPLE_COUNT])
+
+        # merging into snapshot must not affect other datapoints
+        other = DataPoint(3)
+        other.merge_point(third)
+        third.merge_point(other)
+        self.assertEqual(2, third[DataPoint.CUMULATIVE]['a'][KPISet.SAMPLE_COUNT])
+        self.assertEqual(1, first[DataPoint.CUMULATIVE]['a'][KPISet.SAMPLE_COUNT])
+        self.assertEqual(1, mock.cumulative['a'][KPISet.SAMPLE_COUNT])
+
+    def test_cumulative_snapshot_speed(self):
+        res = {}
+        for labels_count in (10, 100, 500):
+            mock = MockReader()
+            mock.generalize_labels = 0
+            for label in range(labels_count):
+                mock.data.append((1, "label%s" % label, 1, r(), r(), r(), 200, None, '', 0))
+            list(mock.datapoints())
+
+            # few labels are changed every second
+            for tstamp in range(2, 200):
+                for label in range(5):
+                    mock.data.append((tstamp, "label%s" % label, 1, r(), r(), r(), 200, None, '', 0))
+
+            before = time.time()
+            points = list(mock.datapoints(True))
+            res[labels_count] = (time.time() - before) / len(points)
+            self.assertEqual(labels_count + 1, len(points[-1][DataPoint.CUMULATIVE]))
+
+        ROOT_LOGGER.info("Time per second by labels count: %s", res)
+
+
+class TestKPISet(BZTestCase):
+    @staticmethod
+    def get_block(count):
+        samples = [(1, "label", int(10 * r(1)), r(3000), r(), r(), rc(), err(), "thread%s" % (idx % 3), 10)
+                   for idx in range(count)]
+        columns = list(zip(*samples))
+        return samples, SamplesBlock(
+            ts=numpy.array(columns[0]),
+            label=numpy.array(columns[1], dtype=object),
+            conc=numpy.array(columns[2]),
+            rt=numpy.array(columns[3]),
+            cn=numpy.array(columns[4]),
+            lt=numpy.array(columns[5]),
+            rc=numpy.array(columns[6], dtype=object),
+            error=numpy.array(columns[7], dtype=object),
+            trname=numpy.array(columns[8], dtype=object),
+            byte_count=numpy.array(columns[9]))
+
+    def test_add_array(self):
+        values = [0, 0.001, 0.5, 1, 2.5, 10.123, 99.9] + [r(3000) for _ in range(1000)]
+        expected = RespTimesCounter(1, 1000, 3)
+        for value in values:
+            expected.add(value)
+
+        counter = RespTimesCounter(1, 1000, 3)
+        counter.add_array(numpy.array(values))
+
+        self.assertEqual(expected.high, counter.high)
+        self.assertEqual(expected.histogram.total_count, counter.histogram.total_count)
+        self.assertEqual(expected.histogram.min_value, counter.histogram.min_value)
+        self.assertEqual(expected.histogram.max_value, counter.histogram.max_value)
+        self.assertEqual(expected.histogram.counts.tolist(), counter.histogram.counts.tolist())
+
+    def test_add_samples(self):
+        samples, block = self.get_block(5000)
+        expected = KPISet(perc_levels=(50.0, 90.0, 100.0))
+        for sample in samples:
+            expected.add_sample(sample[2:])
+        expected.recalculate()
+
+        kpiset = KPISet(perc_levels=(50.0, 90.0, 100.0))
+        kpiset.add_samples(block)
+        kpiset.recalculate()
+
+        for kpi in (KPISet.SAMPLE_COUNT, KPISet.SUCCESSES, KPISet.FAILURES, KPISet.BYTE_COUNT,
+                    KPISet.RESP_CODES, KPISet.PERCENTILES, KPISet.ERRORS):
+            self.assertEqual(expected[kpi], kpiset[kpi])
+        for kpi in (KPISet.AVG_RESP_TIME, KPISet.AVG_LATENCY, KPISet.AVG_CONN_TIME, KPISet.STDEV_RESP_TIME):
+            self.assertAlmostEqual(expected[kpi], kpiset[kpi])
+        self.assertEqual(expected.concurrency, kpiset.concurrency)
+
+    def test_add_samples_speed(self):
+        samples, block = self.get_block(20000)
+        kpiset = KPISet()
+        start = time.time()
+        for sample in samples:
+            kpiset.add_sample(sample[2:])
+        one_by_one = time.time() - start
+
+        kpiset = KPISet()
+        start = time.time()
+        kpiset.add_samples(block)
+        ROOT_LOGGER.info("Adding samples one by one/at once: %s / %s", one_by_one, time.time() - start)
+
+    def test_resp_times_stats(self):
+        levels = (0.0, 50.0, 90.0, 95.0, 99.0, 99.9, 100.0)
+
+        def assert_stats(counter):
+            hist = counter.histogram
+            expected_percentiles = {}
+            itr = hist.get_recorded_iterator()
+            for _ in itr:
+                for level in levels:
+                    if level not in expected_percentiles and level <= itr.get_percentile_iterated_to():
+                        expected_percentiles[level] = itr.value_at_index
+
+            counter.known_mean = r(3000)
+            self.assertEqual(expected_percentiles, counter.get_percentiles_dict())
+            self.assertEqual(hist.get_value_counts(), counter.get_counts())
+            self.assertAlmostEqual(hist.get_stddev(counter.known_mean * 1000) / 1000.0, counter.get_stdev())
+
+        one_by_one = RespTimesCounter(1, 1000, 3, levels)
+        for _ in range(1000):
+            one_by_one.add(r(3000))
+        assert_stats(one_by_one)
+
+        at_once = RespTimesCounter(1, 1000, 3, levels)
+        at_once.add_array(numpy.array([r(5000) for _ in range(1000)]))
+        assert_stats(at_once)
+
+        at_once.merge(one_by_one)
+        assert_stats(at_once)
+
+        one_by_one.merge(at_once)
+        one_by_one.add_array(numpy.array([r(10000) for _ in range(1000)]))
+        assert_stats(one_by_one)
+
+    def test_resp_times_stats_speed(self):
+        counter = RespTimesCounter(1, 1000, 3, (50.0, 90.0, 99.0, 100.0))
+        counter.add_array(numpy.array([r(5000) for _ in range(10000)]))
+        counter.known_mean = 2.5
+
+        start = time.time()
+        for _ in range(100):
+            counter.add(r(5000))
+            counter.get_percentiles_dict()
+            counter.get_stdev()
+        ROOT_LOGGER.info("Time per stats recalculation: %s", (time.time() - start) / 100)
+
+
+class TestPointPacker(BZTestCase):
+    @staticmethod
+    def get_point(labels_count, samples_count, tstamp=1):
+        point = DataPoint(tstamp, [50.0, 90.0, 99.0])
+        point[DataPoint.SOURCE_ID] = "source"
+        for key in (DataPoint.CURRENT, DataPoint.CUMULATIVE):
+            for idx in range(labels_count):
+                samples, block = TestKPISet.get_block(samples_count)
+                kpiset = KPISet(point.perc_levels)
+                kpiset.add_samples(block)
+                point[key]["http://blazedemo.com/label%s" % idx] = kpiset.recalculate()
+        return point
+
+    def test_kpiset(self):
+        kpiset = KPISet([50.0, 99.0])
+        kpiset.add_sample((3, 0.5, 0.01, 0.1, "200", None, "thread", 100))
+        kpiset.add_sample((5, 12.5, 0.02, 0.2, "404", "Not Found", "thread", 50))
+        kpiset.add_sample((2, 1.5, 0.03, 0.3, None, "Timeout", "other", 0))
+        kpiset[KPISet.ERRORS][0]["urls"]["http://blazedemo.com/"] += 1
+        kpiset.recalculate()
+
+        unpacked = PointPacker.unpack_kpiset(PointPacker.pack_kpiset(kpiset))
+        self.assertEqual(to_json(kpiset), to_json(unpacked))
+        self.assertEqual(kpiset.concurrency, unpacked.concurrency)
+        self.assertEqual(kpiset.sum_rt, unpacked.sum_rt)
+        self.assertEqual(kpiset[KPISet.STDEV_RESP_TIME], unpacked[KPISet.STDEV_RESP_TIME])
+
+        unpacked.merge_kpis(kpiset)
+        self.assertEqual(6, unpacked[KPISet.SAMPLE_COUNT])
+        self.assertAlmostEqual(12.5, unpacked[KPISet.PERCENTILES]["99.0"], delta=0.01)
+
+    def test_histogram_bounds(self):
+        kpiset = KPISet()
+        samples, block = TestKPISet.get_block(10)
+        kpiset.add_samples(block)
+        hist = kpiset[KPISet.RESP_TIMES].histogram
+        self.assertIsInstance(hist.min_value, float)
+
+        unpacked = PointPacker.unpack_kpiset(PointPacker.pack_kpiset(kpiset))[KPISet.RESP_TIMES].histogram
+        self.assertEqual((hist.min_value, hist.max_value), (unpacked.min_value, unpacked.max_value))
+
+        empty = PointPacker.unpack_kpiset(PointPacker.pack_kpiset(KPISet()))[KPISet.RESP_TIMES].histogram
+        self.assertEqual((KPISet()[KPISet.RESP_TIMES].histogram.min_value, 0), (empty.min_value, empty.max_value))
+
+    def test_ext_aggregation(self):
+        kpiset = KPISet(ext_aggregation=True)
+        kpiset.add_sample((1, 0.5, 0.01, 0.1, "200", None, "thread1", 100))
+        kpiset.add_sample((1, 0.5, 0.01, 0.1, "200", None, "thread2", 100))
+        unpacked = PointPacker.unpack_kpiset(PointPacker.pack_kpiset(kpiset))
+        self.assertTrue(unpacked.ext_aggregation)
+        self.assertEqual({"thread1", "thread2"}, unpacked._concurrency.concurrencies)
+
+    def test_datapoints(self):
+        points = [self.get_point(5, 100, tstamp) for tstamp in range(1, 4)]
+        fds = io.BytesIO()
+        PointPacker.dump(points, fds)
+        fds.seek(0)
+        loaded = list(PointPacker.load(fds))
+        self.assertEqual(3, len(loaded))
+        for point, unpacked in zip(points, loaded):
+            self.assertEqual(to_json(point), to_json(unpacked))
+            self.assertEqual(point.perc_levels, unpacked.perc_levels)
+
+    def test_wrong_data(self):
+        self.assertRaises(TaurusInternalException, PointPacker.unpack_point, b'{"ts": 1}')
+
+    def test_size_and_speed(self):
+        point = self.get_point(20, 5000)
+
+        start = time.time()
+        for _ in range(3):
+            json_data = to_json(point, indent=False)
+            parsed = json.loads(json_data)
+            for key in (DataPoint.CURRENT, DataPoint.CUMULATIVE):
+                for kpiset in parsed[key].values():
+                    KPISet.from_dict(kpiset)
+        json_time = (time.time() - start) / 3
+
+        start = time.time()
+        for _ in range(3):
+            packed = PointPacker.pack_point(point)
+            PointPacker.unpack_point(packed)
+        packed_time = (time.time() - start) / 3
+
+        ROOT_LOGGER.info("JSON: %s bytes, %.4fs per round-trip; binary: %s bytes, %.4fs per round-trip",
+                         len(json_data), json_time, len(packed), packed_time)
+        self.assertLess(len(packed), len(json_data))
+
+
+class TestKPIFrames(BZTestCase):
+    def test_hdr_bucket(self):
+        self.assertEqual(0, hdr_bucket(0))
+        self.assertEqual(2047, hdr_bucket(2047))
+        self.assertEqual(2048, hdr_bucket(2049))
+        self.assertEqual(123456 >> 6 << 6, hdr_bucket(123456))
+
+        counter = RespTimesCounter(1, 200000, 3)
+        for value in (2049, 5001, 123456):
+            self.assertTrue(counter.histogram.values_are_equivalent(value, hdr_bucket(value)))
+
+    def test_write_read(self):
+        frames_file = temp_file(suffix=".ldjson")
+        with open(frames_file, 'w') as fds:
+            writer = KPIFramesWriter(fds, flush_interval=float('inf'))
+            for idx in range(1000):
+                error = "Not Found" if idx % 10 == 0 else None
+                writer.add_sample(100 + idx // 100, "label%s" % (idx % 3), 0.001 * idx, "404" if error else "200",
+                                  error, 100, concurrency=idx // 100 + 1)
+            writer.flush()
+            self.assertEqual(1, len(writer.seconds))
+            writer.add_sample(100, "label0", 2.5, "200")  # late sample goes into separate frame
+            writer.flush()
+            writer.flush(final=True)
+
+        with open(frames_file) as fds:
+            self.assertEqual(11, len(fds.readlines()))
+
+        reader = KPIFramesReader(frames_file, ROOT_LOGGER)
+        points = list(reader.datapoints(final_pass=True))
+        self.assertEqual(list(range(100, 110)), [point[DataPoint.TIMESTAMP] for point in points])
+
+        first = points[0][DataPoint.CURRENT]
+        self.assertEqual(101, first[''][KPISet.SAMPLE_COUNT])
+        self.assertEqual(35, first['label0'][KPISet.SAMPLE_COUNT])
+        self.assertEqual(1, first[''].concurrency)
+        self.assertEqual(10, points[-1][DataPoint.CURRENT][''].concurrency)
+        self.assertAlmostEqual((sum(range(0, 100, 3)) * 0.001 + 2.5) / 35, first['label0'][KPISet.AVG_RESP_TIME])
+
+        cumulative = points[-1][DataPoint.CUMULATIVE]['']
+        self.assertEqual(1001, cumulative[KPISet.SAMPLE_COUNT])
+        self.assertEqual(100, cumulative[KPISet.FAILURES])
+        self.assertEqual({"200": 901, "404": 100}, cumulative[KPISet.RESP_CODES])
+        self.assertEqual(100, cumulative[KPISet.ERRORS][0]['cnt'])
+        self.assertEqual(100000, cumulative[KPISet.BYTE_COUNT])
+        self.assertAlmostEqual(0.5, cumulative[KPISet.PERCENTILES]["50.0"], 2)
+        self.assertAlmostEqual(2.5, cumulative[KPISet.PERCENTILES]["100.0"], 2)
+
+    def test_incomplete_second(self):
+        frames_file = temp_file(suffix=".ldjson")
+        reader = KPIFramesReader(frames_file, ROOT_LOGGER)
+        with open(frames_file, 'w') as fds:
+            writer = KPIFramesWriter(fds, flush_interval=float('inf'))
+            writer.add_sample(100, "label", 0.1)
+            writer.add_sample(101, "label", 0.1)
+            writer.flush(final=True)
+            self.assertEqual([100], [point[DataPoint.TIMESTAMP] for point in reader.datapoints()])
+
+            writer.add_sample(101, "label", 0.1)  # late sample for second still kept by reader
+            writer.add_sample(102, "label", 0.1)
+            writer.flush(final=True)
+
+        points = list(reader.datapoints(final_pass=True))
+        self.assertEqual([101, 102], [point[DataPoint.TIMESTAMP] for point in points])
+        self.assertEqual(2, points[0][DataPoint.CURRENT]['label'][KPISet.SAMPLE_COUNT])
+
+    @staticmethod
+    def summarize(points):
+        result = []
+        for point in points:
+            labels = {}
+            for label, kpiset in point[DataPoint.CURRENT].items():
+                errors = {error['msg']: error['cnt'] for error in kpiset[KPISet.ERRORS]}
+                labels[label] = (kpiset[KPISet.SAMPLE_COUNT], kpiset[KPISet.FAILURES], kpiset[KPISet.RESP_CODES],
+                                 errors, round(kpiset.sum_rt, 6))
+            result.append((point[DataPoint.TIMESTAMP], labels))
+        return result
+
+    def test_same_as_samples(self):
+        first_part = []
+        for idx in range(300):
+            error = "Failed to get /item/%s" % (idx % 7) if idx % 4 == 0 else None
+            label = "ignored label" if idx % 5 == 0 else "label%s" % (idx % 3)
+            first_part.append((100 + idx // 50, label, 0.001 * idx, "500" if error else "200", error))
+        second_part = [(100, "label0", 1.5, "200", None), (106, "label1", 0.5, "404", "Not Found")]  # first one is late
+
+        samples_reader = MockReader()
+        samples_reader.buffer_len = 1
+        frames_file = temp_file(suffix=".ldjson")
+        frames_reader = KPIFramesReader(frames_file, ROOT_LOGGER)
+        for reader in (samples_reader, frames_reader):
+            reader.ignored_labels = ["ignore"]
+            reader.max_error_count = 4
+            reader.track_percentiles = [50.0, 100.0]
+
+        with open(frames_file, 'w') as fds:
+            writer = KPIFramesWriter(fds, flush_interval=float('inf'))
+            results = []
+            for part, final_pass in ((first_part, False), (second_part, True)):
+                for t_stamp, label, r_time, r_code, error in part:
+                    samples_reader.data.append((t_stamp, label, 1, r_time, 0, 0, r_code, error, '', 0))
+                    writer.add_sample(t_stamp, label, r_time, r_code, error)
+                writer.flush(final=True)
+                results.append([list(samples_reader.datapoints(final_pass)), list(frames_reader.datapoints(final_pass))])
+
+        for samples_points, frames_points in results:
+            self.assertEqual(self.summarize(samples_points), self.summarize(frames_points))
+
+        last = results[-1][1][-1][DataPoint.CUMULATIVE]
+        self.assertEqual({'', 'label0', 'label1', 'label2'}, set(last.keys()))
+        self.assertEqual(["Failed to get /item/4", "Not Found"], [error['msg'] for error in last[''][KPISet.ERRORS]])
+        self.assertEqual([100, 101, 102, 103, 104], [point[DataPoint.TIMESTAMP] for point in results[0][1]])
+        self.assertEqual([105, 106], [point[DataPoint.TIMESTAMP] for point in results[1][1]])
+        self.assertGreater(results[1][1][0][DataPoint.CURRENT]['label0'].sum_rt, 1.5)  # late sample is in 105
+
+    def test_size_and_speed(self):
+        samples_file = temp_file(suffix=".ldjson")
+        frames_file = temp_file(suffix=".ldjson")
+        rnd = random.Random(1)
+        with open(samples_file, 'w') as samples_fds, open(frames_file, 'w') as frames_fds:
+            writer = KPIFramesWriter(frames_fds)
+            for idx in range(100000):
+                t_stamp, label, r_time = 1000 + idx // 10000, "label%s" % (idx % 10), round(rnd.gauss(0.2, 0.02), 3)
+                samples_fds.write(json.dumps({"start_time": t_stamp, "test_case": label, "duration": r_time}) + "\n")
+                writer.add_sample(t_stamp, label, r_time, "200")
+            writer.flush(final=True)
+
+        start = time.time()
+        points = list(KPIFramesReader(frames_file, ROOT_LOGGER).datapoints(final_pass=True))
+        frames_time = time.time() - start
+
+        self.assertEqual(10, len(points))
+        self.assertEqual(100000, points[-1][DataPoint.CUMULATIVE][''][KPISet.SAMPLE_COUNT])
+        ROOT_LOGGER.info("Samples: %s bytes, frames: %s bytes read in %.3fs",
+                         os.path.getsize(samples_file), os.path.getsize(frames_file), frames_time)
+        self.assertLess(os.path.getsize(frames_file) * 10, os.path.getsize(samples_file))
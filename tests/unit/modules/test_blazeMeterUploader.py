@@ -1,8 +1,11 @@
+import copy
+import gzip
 import json
 import logging
 import math
 import os
 import shutil
+import threading
 import time
 from tempfile import mkstemp
 from io import BytesIO
@@ -12,7 +15,7 @@ from bzt import TaurusException
 from bzt.bza import Master, Session
 from bzt.modules.aggregator import DataPoint, KPISet, ConsolidatingAggregator
 from bzt.modules.blazemeter import BlazeMeterUploader
-from bzt.modules.blazemeter.blazemeter_reporter import MonitoringBuffer
+from bzt.modules.blazemeter.blazemeter_reporter import MonitoringBuffer, DatapointSerializer
 from bzt.utils import iteritems, viewvalues
 from tests.unit import BZTestCase, random_datapoint, RESOURCES_DIR, ROOT_LOGGER, EngineEmul, BZMock
 from tests.unit.mocks import MockReader
@@ -203,6 +206,119 @@ class TestBlazeMeterUploader(BZTestCase):
         self.assertEqual(20, len(mock.requests))
         obj.engine.log.parent.removeHandler(handler)
 
+    def test_send_in_background(self):
+        obj = BlazeMeterUploader()
+        obj.engine = EngineEmul()
+        mock = BZMock(obj._user)
+        mock.mock_post.update({
+            'https://data.blazemeter.com/submit.php?session_id=direct&signature=sign&test_id=None&user_id=None&pq=0&target=labels_bulk&update=1': [
+                {"result": {'session': {"statusCode": 140, 'status': 'ENDED'}}},
+                {},
+            ],
+            'https://data.blazemeter.com/api/v4/image/direct/files?signature=sign': {"result": True},
+            'https://data.blazemeter.com/submit.php?session_id=direct&signature=sign&test_id=None&user_id=None&pq=0&target=engine_health&update=1': {
+                'result': {'session': {}}}
+        })
+        obj.parameters['session-id'] = 'direct'
+        obj.parameters['signature'] = 'sign'
+        obj.parameters['upload-artifacts'] = False
+        obj.settings['send-in-background'] = True
+        obj.prepare()
+        self.assertEqual([obj.sender], obj.engine.background_workers)
+        obj.startup()
+        obj.aggregated_second(random_datapoint(1))
+        obj.check()
+        self.assertEqual([], obj.kpi_buffer)
+
+        sender = obj.sender
+        deadline = time.time() + 5
+        while sender.queue_depth and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertRaises(KeyboardInterrupt, obj.check)  # stop through Web UI is noticed by next check
+
+        obj.aggregated_second(random_datapoint(2))
+        obj.shutdown()
+        obj.post_process()
+        self.assertIsNone(obj.sender)
+        self.assertFalse(sender.is_alive())
+        self.assertEqual(0, sender.dropped)
+        self.assertEqual(2, len([req for req in mock.requests if 'labels_bulk' in req['url']]))
+
+    def test_send_in_background_slow(self):
+        obj = BlazeMeterUploader()
+        obj.engine = EngineEmul()
+        BZMock(obj._user)
+        obj.parameters['session-id'] = 'direct'
+        obj.parameters['signature'] = 'sign'
+        obj.parameters['upload-artifacts'] = False
+        obj.settings['send-in-background'] = True
+        obj.settings['send-interval'] = 0
+        obj.settings['send-monitoring'] = False
+        obj.prepare()
+
+        release = threading.Event()
+        bodies = []
+
+        def send_kpi_data(data, is_check_response=True, compress=False):
+            release.wait(5)
+            bodies.append(json.loads(data))
+
+        obj._session.send_kpi_data = send_kpi_data
+        obj._session.stop_anonymous = lambda: None
+        obj.startup()
+        sender = obj.sender
+        for ts in range(1, 11):
+            obj.aggregated_second(random_datapoint(ts))
+            obj.check()
+            self.assertLessEqual(sender.queue_depth, 2)  # one is being sent, one waits, the rest is merged
+
+        release.set()
+        obj.shutdown()
+        obj.post_process()
+        self.assertEqual(0, sender.dropped)
+        self.assertLess(len(bodies), 10)
+        sent = [interval['ts'] for body in bodies for label in body['labels'] for interval in label['intervals']]
+        self.assertEqual(list(range(1, 11)), sent)
+
+    def test_send_in_background_timeout(self):
+        obj = BlazeMeterUploader()
+        obj.engine = EngineEmul()
+        BZMock(obj._user)
+        obj._user.timeout = 0.1
+        obj.parameters['session-id'] = 'direct'
+        obj.parameters['signature'] = 'sign'
+        obj.parameters['upload-artifacts'] = False
+        obj.settings['send-in-background'] = True
+        obj.settings['send-interval'] = 0
+        obj.settings['send-monitoring'] = False
+        obj.prepare()
+
+        release = threading.Event()
+        senders = []
+
+        def send_kpi_data(data, is_check_response=True, compress=False):
+            release.wait(5)
+            senders.append(threading.current_thread())
+
+        obj._session.send_kpi_data = send_kpi_data
+        obj._session.stop_anonymous = lambda: None
+        obj.startup()
+        sender = obj.sender
+        for ts in range(1, 4):
+            obj.aggregated_second(random_datapoint(ts))
+            obj.check()
+            while not sender.busy:  # let the first portion be picked up before the next one is submitted
+                time.sleep(0.01)
+        self.assertEqual(2, sender.queue_depth)  # one is being sent, one waits
+
+        obj.shutdown()
+        threading.Timer(0.5, release.set).start()
+        obj.post_process()
+        self.assertEqual(1, sender.dropped)
+        self.assertEqual([sender, threading.current_thread()], senders)  # nothing is sent after final data
+        sender.join(5)
+        self.assertFalse(sender.is_alive())
+
     def test_monitoring_buffer_limit_option(self):
         obj = BlazeMeterUploader()
         obj.engine = EngineEmul()
@@ -442,6 +558,83 @@ class TestBlazeMeterUploader(BZTestCase):
         obj.post_process()  # no 'Cumulative KPISet is non-consistent' exception here
 
 
+class TestDatapointSerializer(BZTestCase):
+    @staticmethod
+    def get_buffer(start, labels):
+        data_buffer = []
+        for ts in range(start, start + 3):
+            point = random_datapoint(ts)
+            for label in labels:
+                point[DataPoint.CURRENT][label] = copy.deepcopy(point[DataPoint.CURRENT][''])
+            point[DataPoint.CUMULATIVE]['first'] = copy.deepcopy(point[DataPoint.CUMULATIVE][''])
+            data_buffer.append(point)
+        return data_buffer
+
+    def test_changed_labels(self):
+        obj = BlazeMeterUploader()
+        obj.engine = EngineEmul()
+        serializer = DatapointSerializer(obj)
+
+        data = json.loads(serializer.get_kpi_body(self.get_buffer(0, ['first']), False))
+        self.assertEqual(['ALL', 'first'], [label['name'] for label in data['labels']])
+        self.assertEqual(3, len(data['labels'][1]['intervals']))
+
+        data = json.loads(serializer.get_kpi_body(self.get_buffer(3, []), False))
+        self.assertEqual(['ALL'], [label['name'] for label in data['labels']])
+        self.assertEqual(id(obj), data['sourceID'])
+        self.assertNotIn('final', data)
+
+        data = json.loads(serializer.get_kpi_body(self.get_buffer(6, []), True))
+        self.assertEqual(['ALL', 'first'], [label['name'] for label in data['labels']])
+        self.assertEqual([], data['labels'][1]['intervals'])
+        self.assertTrue(data['final'])
+        self.assertEqual(0, data['labels'][0]['summary']['first'])
+        self.assertEqual(8, data['labels'][0]['summary']['last'])
+
+        serializer.changed_only = False
+        data = json.loads(serializer.get_kpi_body(self.get_buffer(9, []), False))
+        self.assertEqual(['ALL', 'first'], [label['name'] for label in data['labels']])
+
+        self.assertEqual('{"labels":[],"sourceID":%s}' % id(obj), serializer.get_kpi_body([], False))
+
+    def test_rc_failures(self):
+        obj = BlazeMeterUploader()
+        serializer = DatapointSerializer(obj)
+        point = random_datapoint(1)
+        kpi_set = point[DataPoint.CURRENT]['']
+        kpi_set[KPISet.RESP_CODES] = {'200': 5, '404': 3, '500': 2}
+        kpi_set[KPISet.ERRORS] = [
+            {'msg': 'Not Found', 'cnt': 2, 'type': KPISet.ERRTYPE_ERROR, 'urls': [], 'rc': '404', 'tag': None},
+            {'msg': 'Not Found 2', 'cnt': 1, 'type': KPISet.ERRTYPE_ERROR, 'urls': [], 'rc': '404', 'tag': None},
+            {'msg': 'Failed', 'cnt': 2, 'type': KPISet.ERRTYPE_ASSERT, 'urls': [], 'rc': 500, 'tag': None},
+        ]
+        data = json.loads(serializer.get_kpi_body([point], False))
+        rc_list = data['labels'][0]['intervals'][0]['rc']
+        self.assertEqual({'200': [], '404': [2, 1], '500': [2]}, {item['rc']: item['f'] for item in rc_list})
+
+    def test_compressed(self):
+        obj = BlazeMeterUploader()
+        obj.engine = EngineEmul()
+        mock = BZMock(obj._user)
+        mock.mock_post.update({
+            'https://data.blazemeter.com/submit.php?session_id=direct&signature=sign&test_id=None&user_id=None&pq=0&target=labels_bulk&update=1': {},
+        })
+        obj.parameters['session-id'] = 'direct'
+        obj.parameters['signature'] = 'sign'
+        obj.settings['compress-kpi-data'] = True
+        obj.settings['send-monitoring'] = False
+        obj.prepare()
+        obj.startup()
+        obj.aggregated_second(random_datapoint(1))
+        obj.last_dispatch = 0
+        obj.check()
+
+        data = mock.requests[-1]['data']
+        self.assertIn('labels_bulk', mock.requests[-1]['url'])
+        data = json.loads(gzip.decompress(data).decode('utf-8'))
+        self.assertEqual('ALL', data['labels'][0]['name'])
+
+
 class TestBlazeMeterClientUnicode(BZTestCase):
     def test_unicode_request(self):
         """
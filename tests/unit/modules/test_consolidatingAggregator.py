@@ -1,13 +1,41 @@
+import os
+import time
+import uuid
 from random import random, choice
 
 from apiritif import random_string
-from bzt.modules.aggregator import ConsolidatingAggregator, DataPoint, KPISet, SAMPLE_STATES, AGGREGATED_STATES
-from bzt.utils import to_json, BetterDict
-from tests.unit import BZTestCase, EngineEmul
+from bzt.modules.aggregator import ConsolidatingAggregator, DataPoint, KPISet, SAMPLE_STATES, AGGREGATED_STATES, \
+    KeysGeneralizer, ResultsReader
+from bzt.utils import to_json, BetterDict, FileReader, temp_file
+from tests.unit import BZTestCase, EngineEmul, ROOT_LOGGER
 
 from tests.unit.mocks import r, MockReader, MockListener
 
 
+class SlowMockReader(MockReader):
+    def _read(self, final_pass=False):
+        for sample in super(SlowMockReader, self)._read(final_pass):
+            time.sleep(0.05)
+            yield sample
+
+
+class OpenerReader(ResultsReader):
+    """ finds its file when opens it, like Gatling's reader """
+    def __init__(self, filename):
+        super(OpenerReader, self).__init__()
+        self.filename = filename
+        self.file = FileReader(file_opener=self.open_fds, parent_logger=self.log)
+
+    def open_fds(self, _):
+        if os.path.exists(self.filename):
+            return open(self.filename, 'rb')
+
+    def _read(self, final_pass=False):
+        for line in self.file.get_lines(last_pass=final_pass):
+            tstamp, label = line.strip().split(',')
+            yield int(tstamp), label, 1, r(), r(), r(), 200, None, '', 0
+
+
 def get_success_reader(offset=0):
     mock = MockReader()
     mock.data.append((1 + offset, "first", 1, r(), r(), r(), 200, None, '', 0))
@@ -355,6 +383,156 @@ class TestConsolidatingAggregator(BZTestCase):
         cum_dict = self.obj.cumulative
         self.assertEqual(len(cum_dict['']['errors']), 3)
 
+    def test_labels_id_segments(self):
+        self.obj.track_percentiles = [50]
+        self.obj.prepare()
+        self.obj.generalize_labels = 20
+        first, second = MockReader(), MockReader()
+        for x in range(1, 200):
+            first.data.append((x, "http://blazedemo.com/users/%s/orders" % x, 1, r(), r(), r(), 200, '', '', 0))
+            second.data.append((x, "http://blazedemo.com/items/%s" % uuid.uuid4(), 1, r(), r(), r(), 200, '', '', 0))
+        self.obj.add_underling(first)
+        self.obj.add_underling(second)
+        self.obj.shutdown()
+        self.obj.post_process()
+        labels = list(self.obj.cumulative.keys())
+        self.assertLessEqual(len(labels), 1 + 2 * self.obj.generalize_labels / 4)
+        self.assertEqual(398, self.obj.cumulative[''][KPISet.SAMPLE_COUNT])
+
+    def test_parallel_reading(self):
+        self.obj.settings['parallel-reading'] = True
+        self.obj.prepare()
+        for offset in range(4):
+            reader = MockReader()
+            for tstamp in range(1, 12):
+                reader.data.append((tstamp + offset, "label", 1, r(), r(), r(), 200, None, '', 0))
+            self.obj.add_underling(reader)
+        listener = MockListener()
+        listener.engine = self.obj.engine
+        self.obj.add_listener(listener)
+        self.obj.startup()
+        self.obj.check()
+        self.assertEqual(4, len(self.obj._readers))
+        self.obj.shutdown()
+        self.obj.post_process()
+        self.assertFalse(any(reader.process.is_alive() for reader in self.obj._readers.values()))
+        self.assertEqual(44, self.obj.cumulative[''][KPISet.SAMPLE_COUNT])
+        self.assertEqual(14, len(listener.results))
+        self.assertEqual(44, sum(point[DataPoint.CURRENT][''][KPISet.SAMPLE_COUNT] for point in listener.results))
+        for underling in self.obj.underlings:
+            self.assertEqual(11, len(underling.results))  # MockReader checks sequence of its datapoints
+            self.assertEqual(11, underling.cumulative['label'][KPISet.SAMPLE_COUNT])
+
+    def test_parallel_reading_folding(self):
+        self.obj.settings['parallel-reading'] = True
+        self.obj.track_percentiles = [50]
+        self.obj.prepare()
+        self.obj.generalize_labels = 25
+        self.obj.max_error_count = 10
+        for offset in range(2):
+            reader = get_success_reader_alot(offset=offset)
+            reader.data.extend(get_fail_reader_alot(offset=offset).data)
+            self.obj.add_underling(reader)
+        self.obj.startup()
+        self.obj.check()
+        self.obj.shutdown()
+        self.obj.post_process()
+        self.assertEqual(2 * (98 + 198), self.obj.cumulative[''][KPISet.SAMPLE_COUNT])
+
+        # generalizers of engine process are shared, so limits are common for all readers
+        labels = [label for label in self.obj.cumulative if label not in ('', 'first')]
+        self.assertLessEqual(len(labels), self.obj.generalize_labels + 1)
+        self.assertLessEqual(len(self.obj.known_errors), self.obj.max_error_count)
+        self.assertGreaterEqual(len(self.obj.known_errors), self.obj.max_error_count / 2)
+        errors = [error['msg'] for error in self.obj.cumulative[''][KPISet.ERRORS]]
+        self.assertEqual(len(errors), len(set(errors)))
+        for underling in self.obj.underlings:
+            self.assertLessEqual(set(underling.cumulative), set(self.obj.cumulative))
+
+    def test_parallel_reading_file_names(self):
+        self.obj.settings['parallel-reading'] = True
+        self.obj.prepare()
+        filename = temp_file()
+        with open(filename, 'w') as fds:
+            fds.writelines("%s,label\n" % tstamp for tstamp in range(1, 6))
+        reader = OpenerReader(filename)
+        self.obj.add_underling(reader)
+        self.obj.startup()
+        deadline = time.time() + 5
+        while not reader.file.name and time.time() < deadline:
+            self.obj.check()
+            time.sleep(0.05)
+
+        self.assertEqual(filename, reader.file.name)  # file is opened in worker process
+        self.assertEqual([filename], self.obj.get_data_files())
+        self.obj.shutdown()
+        self.obj.post_process()
+        self.assertEqual(5, self.obj.cumulative[''][KPISet.SAMPLE_COUNT])
+
+    def test_parallel_reading_slow_reader(self):
+        self.obj.settings['parallel-reading'] = True
+        self.obj.prepare()
+        fast = MockReader()
+        slow = SlowMockReader()
+        for reader in (fast, slow):
+            for tstamp in range(1, 11):
+                reader.data.append((tstamp, "label", 1, r(), r(), r(), 200, None, '', 0))
+            self.obj.add_underling(reader)
+        listener = MockListener()
+        listener.engine = self.obj.engine
+        self.obj.add_listener(listener)
+        self.obj.startup()
+        for _ in range(10):
+            self.obj.check()
+            time.sleep(0.1)
+        self.obj.shutdown()
+        self.obj.post_process()
+        self.assertEqual(list(range(1, 11)), [point[DataPoint.TIMESTAMP] for point in listener.results])
+        for point in listener.results:  # seconds of slow reader are not merged into later ones
+            self.assertEqual(2, point[DataPoint.CURRENT][''][KPISet.SAMPLE_COUNT])
+
+    def test_parallel_reading_buffered(self):
+        self.obj.settings['parallel-reading'] = True
+        self.obj.prepare()
+        self.obj.engine.check_interval = 1
+        fast = get_success_reader()
+        fast.data = [(tstamp, "label", 1, r(), r(), r(), 200, None, '', 0) for tstamp in range(1, 11)]
+        filename = temp_file()
+        with open(filename, 'w') as fds:
+            fds.writelines("%s,label\n" % tstamp for tstamp in range(1, 4))
+        bursty = OpenerReader(filename)  # reads 1-3, keeps 2-3 in its buffer until more data comes
+        self.obj.add_underling(fast)
+        self.obj.add_underling(bursty)
+        listener = MockListener()
+        listener.engine = self.obj.engine
+        self.obj.add_listener(listener)
+        self.obj.startup()
+        for _ in range(5):
+            self.obj.check()
+            time.sleep(0.1)
+
+        with open(filename, 'a') as fds:
+            fds.writelines("%s,label\n" % tstamp for tstamp in range(4, 11))
+
+        for _ in range(15):
+            self.obj.check()
+            time.sleep(0.1)
+        self.obj.shutdown()
+        self.obj.post_process()
+        self.assertEqual(list(range(1, 11)), [point[DataPoint.TIMESTAMP] for point in listener.results])
+        for point in listener.results:  # buffered seconds of bursty reader are not merged into later ones
+            self.assertEqual(2, point[DataPoint.CURRENT][''][KPISet.SAMPLE_COUNT])
+
+    def test_parallel_reading_error(self):
+        self.obj.settings['parallel-reading'] = True
+        self.obj.prepare()
+        reader = get_success_reader()
+        reader.data.append((7, "broken", 1, r(), r(), r(), 200, None))  # malformed sample
+        self.obj.add_underling(reader)
+        self.obj._start_readers()
+        self.obj._readers[reader].process.join(5)
+        self.assertRaises(ValueError, self.obj.check)
+
     def test_set_rtimes_len(self):
         self.obj.settings['histogram-initial'] = 10.0
         self.obj.prepare()
@@ -422,3 +600,39 @@ class TestConsolidatingAggregator(BZTestCase):
         self.obj.shutdown()
         self.obj.post_process()
         self.assertEquals(self.obj.cumulative, {})
+
+
+class TestKeysGeneralizer(BZTestCase):
+    def test_memo(self):
+        obj = KeysGeneralizer(memo_size=3)
+        for _ in range(5):
+            for key in ("first", "second", "third"):
+                self.assertEqual(key, obj.fold(key, 100))
+        self.assertEqual(3, obj.misses)
+        self.assertEqual(12, obj.hits)
+        self.assertEqual(3, len(obj))
+
+        obj.fold("fourth", 100)
+        self.assertEqual(3, len(obj.memo))
+        self.assertNotIn("first", obj.memo)
+
+    def test_id_segments(self):
+        obj = KeysGeneralizer()
+        obj.fold("first", 8)
+        obj.fold("second", 8)
+        self.assertEqual("/user/1/cart?item=1", obj.fold("/user/1/cart?item=1", 8))
+        self.assertEqual("/user/1/cart?item=1", obj.fold("/user/1024/cart?item=81", 8))
+        self.assertEqual("/user/1/cart?item=1", obj.fold("/user/%s/cart?item=2" % uuid.uuid4(), 8))
+        self.assertEqual("/user/1/order", obj.fold("/user/1/order", 8))
+        self.assertEqual(4, len(obj))
+
+    def test_speed(self):
+        obj = KeysGeneralizer()
+        keys = ["http://blazedemo.com/item/%s?page=%s" % (x % 500, x % 7) for x in range(1000)]
+        start = time.time()
+        for _ in range(100):
+            for key in keys:
+                obj.fold(key, 100)
+        ROOT_LOGGER.info("Folded %s keys in %.3fs: %s hits, %s misses, %s known",
+                         100 * len(keys), time.time() - start, obj.hits, obj.misses, len(obj))
+        self.assertLessEqual(len(obj), 100)
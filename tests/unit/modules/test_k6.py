@@ -1,10 +1,12 @@
+import os
+import time
 from os.path import join
 
 import bzt
 
 from bzt.modules.aggregator import DataPoint, KPISet
 from bzt.modules.k6 import K6Executor, K6LogReader
-from bzt.utils import EXE_SUFFIX
+from bzt.utils import EXE_SUFFIX, temp_file
 from tests.unit import BZTestCase, ExecutorTestCase, RESOURCES_DIR, ROOT_LOGGER
 
 TOOL_NAME = join(RESOURCES_DIR, "k6", "k6_mock" + EXE_SUFFIX)
@@ -116,3 +118,59 @@ class TestK6Reader(BZTestCase):
             self.assertTrue(datapoint['ts'] > 1500000000)
         self.assertEqual(points[-1][DataPoint.CUMULATIVE][''][KPISet.SUCCESSES], 2)
         self.assertEqual(points[-1][DataPoint.CUMULATIVE][''][KPISet.FAILURES], 2)
+
+    def test_read_incomplete(self):
+        log_path = join(RESOURCES_DIR, "k6", "k6_kpi.csv")
+        with open(log_path) as fds:
+            lines = fds.readlines()
+
+        out_path = temp_file(suffix=".csv")
+        obj = K6LogReader(out_path, ROOT_LOGGER)
+        samples = []
+        with open(out_path, "w") as fds:
+            for line in lines:
+                fds.write(line[:5])
+                fds.flush()
+                samples.extend(obj._read())
+                fds.write(line[5:])
+                fds.flush()
+                samples.extend(obj._read())
+                self.assertLessEqual(len(obj.requests), 1)
+
+        samples.extend(obj._read(last_pass=True))
+        obj.file.close()
+        os.remove(out_path)
+
+        self.assertEqual(4, len(samples))
+        self.assertEqual((1633706790, "https://blazedemo.com/", 1), samples[0][:3])
+        self.assertAlmostEqual(0.245591442, samples[0][3])
+        self.assertAlmostEqual(0.087972921, samples[0][4])
+        self.assertEqual([None, None, "lookup: no such host", "lookup: no such host"], [x[7] for x in samples])
+
+    def test_read_speed(self):
+        header = "metric_name,timestamp,metric_value,check,error,error_code,expected_response,group,method,name," \
+                 "proto,scenario,service,status,subproto,tls_version,url,extra_tags\n"
+        request = "%s,1633706790,%s,,,,true,,GET,https://blazedemo.com/,HTTP/2.0,default,,200,,tls1.3,https://blazedemo.com/,\n"
+        iteration = "%s,1633706790,%s,,,,,,,,,default,,,,,,\n"
+        request_metrics = ("http_reqs", "http_req_duration", "http_req_blocked", "http_req_connecting",
+                           "http_req_tls_handshaking", "http_req_sending", "http_req_waiting", "http_req_receiving",
+                           "http_req_failed")
+
+        out_path = temp_file(suffix=".csv")
+        with open(out_path, "w") as fds:
+            fds.write(header)
+            for _ in range(10000):
+                for _ in range(4):
+                    for metric in request_metrics:
+                        fds.write(request % (metric, 100.0))
+                fds.write(iteration % ("vus", 4))
+                for _ in range(4):
+                    fds.write(iteration % ("data_received", 1000))
+
+        obj = K6LogReader(out_path, ROOT_LOGGER)
+        start = time.time()
+        samples = list(obj._read(last_pass=True))
+        ROOT_LOGGER.info("Reading of %s k6 samples took %.3fs", len(samples), time.time() - start)
+        obj.file.close()
+        os.remove(out_path)
+        self.assertEqual(40000, len(samples))
@@ -6,7 +6,7 @@ from unittest import mock
 from bzt import ToolError
 from bzt.utils import dehumanize_time, EXE_SUFFIX
 from bzt.modules.jmeter import JTLReader
-from bzt.modules.aggregator import DataPoint, KPISet, ConsolidatingAggregator
+from bzt.modules.aggregator import DataPoint, KPISet, ConsolidatingAggregator, KPIFramesReader
 from bzt.modules._locustio import LocustIOExecutor, WorkersReader
 from bzt.modules.provisioning import Local
 
@@ -139,6 +139,40 @@ class TestLocustIOExecutor(ExecutorTestCase):
         points = [x for x in obj.datapoints(True)]
         self.assertEquals(0, len(points))
 
+    def test_locust_seconds_results(self):
+        obj = KPIFramesReader(RESOURCES_DIR + "locust/locust-kpi.ldjson", ROOT_LOGGER)
+        points = [x for x in obj.datapoints(True)]
+        self.assertEqual(5, len(points))
+
+        second = points[1][DataPoint.CURRENT]
+        self.assertEqual(12, second['/'][KPISet.SAMPLE_COUNT])
+        self.assertEqual(17, second[''][KPISet.SAMPLE_COUNT])
+        self.assertEqual(1, second[''][KPISet.FAILURES])
+        self.assertEqual(10, second[''].concurrency)
+        self.assertEqual({"200": 16, "503": 1}, second[''][KPISet.RESP_CODES])
+        self.assertEqual("Service Unavailable", second[''][KPISet.ERRORS][0]['msg'])
+        self.assertAlmostEqual(6.97 / 12, second['/'][KPISet.AVG_RESP_TIME])
+
+        cumulative = points[-1][DataPoint.CUMULATIVE]['']
+        self.assertEqual(5, cumulative[KPISet.FAILURES])
+        self.assertGreater(cumulative[KPISet.AVG_RESP_TIME], 0.095)
+        self.assertLessEqual(cumulative[KPISet.PERCENTILES]["100.0"], 1.5)
+
+    def test_locust_seconds_incomplete(self):
+        obj = KPIFramesReader(RESOURCES_DIR + "locust/locust-kpi.ldjson", ROOT_LOGGER)
+        points = [x for x in obj.datapoints()]
+        self.assertEqual(4, len(points))  # last second can get late samples yet
+        self.assertEqual(1, len([x for x in obj.datapoints(True)]))
+
+    def test_locust_per_second_stats(self):
+        self.configure({"execution": {
+            "scenario": {"script": RESOURCES_DIR + "locust/simple.py"}}})
+        self.obj.settings["per-second-stats"] = True
+        self.obj_prepare()
+        self.assertIsInstance(self.obj.reader, KPIFramesReader)
+        self.assertIn("KPI_LDJSON", self.obj.env.get())
+        self.assertFalse(self.obj.has_results())
+
     def test_locust_resource_files(self):
         self.configure({"execution": {
             "concurrency": 1,
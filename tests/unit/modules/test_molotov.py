@@ -2,7 +2,7 @@ import sys
 import time
 from os.path import join
 
-from bzt.modules.aggregator import DataPoint, KPISet
+from bzt.modules.aggregator import DataPoint, KPISet, KPIFramesReader
 from bzt.modules._molotov import MolotovExecutor, MolotovReportReader
 from bzt.utils import EXE_SUFFIX
 from tests.unit import BZTestCase, ExecutorTestCase, RESOURCES_DIR, close_reader_file, ROOT_LOGGER
@@ -20,8 +20,10 @@ class TestMolotov(ExecutorTestCase):
         self.CMD_LINE = ' '.join(args)
 
     def tearDown(self):
-        if self.obj.reader:
+        if isinstance(self.obj.reader, MolotovReportReader):
             close_reader_file(self.obj.reader.ldjson_reader)
+        elif self.obj.reader:
+            close_reader_file(self.obj.reader)
         super(TestMolotov, self).tearDown()
 
     def obj_prepare(self):
@@ -125,6 +127,19 @@ class TestMolotov(ExecutorTestCase):
         self.obj.post_process()
         self.assertTrue('--delay 5.0' in self.CMD_LINE)
 
+    def test_per_second_stats(self):
+        self.obj.settings["per-second-stats"] = True
+        self.configure({"execution": {
+            "scenario": {
+                "script": LOADTEST_PY}}})
+        self.obj_prepare()
+        self.obj.engine.start_subprocess = self.start_subprocess
+        self.obj.startup()
+        self.obj.post_process()
+
+        self.assertIsInstance(self.obj.reader, KPIFramesReader)
+        self.assertEqual("1", self.obj.env.get("MOLOTOV_TAURUS_KPI_FRAMES"))
+
 
 class TestReportReader(BZTestCase):
     def test_read(self):
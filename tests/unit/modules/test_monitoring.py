@@ -1,12 +1,15 @@
 import csv
+import os
+import subprocess
+import sys
 import time
 import unittest
 
 from bzt.modules.monitoring import Monitoring, MonitoringListener, MonitoringCriteria
-from bzt.modules.monitoring import ServerAgentClient, GraphiteClient, LocalClient, LocalMonitor
+from bzt.modules.monitoring import ServerAgentClient, GraphiteClient, LocalClient, LocalMonitor, MonitoringLogs
 from bzt.utils import b, BetterDict
 from tests.unit import BZTestCase, ROOT_LOGGER, EngineEmul
-from tests.unit.mocks import SocketEmul
+from tests.unit.mocks import SocketEmul, ModuleMock
 
 
 class TestMonitoring(BZTestCase):
@@ -197,6 +200,7 @@ class TestMonitoring(BZTestCase):
             obj.get_data()
         finally:
             obj._get_resource_stats = patch
+            obj.disconnect()
         self.assertIn('logging', obj.config)
         self.assertEqual(['bytes-sent', 'cpu', 'mem'], sorted(obj.config['metrics']))
         self.assertIsNotNone(obj.logs_file)
@@ -206,6 +210,49 @@ class TestMonitoring(BZTestCase):
         self.assertEqual(['ts', 'bytes-sent', 'cpu', 'mem'], logs_reader[0])
         self.assertEqual(['2', '3', '4'], logs_reader[1][1:])
 
+    def test_consolidated_logs(self):
+        obj = Monitoring()
+        obj.engine = EngineEmul()
+        obj.parameters.merge({
+            "logs": {"consolidated": True, "flush-interval": "1h"},
+            "server-agent": [{"address": "127.0.0.1:4444", "logging": True, "metrics": ["cpu", "disks"]}],
+            "local": [{"logging": True, "metrics": ["cpu", "mem"]}],
+        })
+        obj.client_classes = {'server-agent': ServerAgentClientEmul, 'local': LocalClient}
+        obj.prepare()
+        obj.clients[0].socket.recv_data += b("1\t10\t\n")
+        obj.check()
+
+        self.assertEqual(obj.clients[0].logs_file, obj.clients[1].logs_file)
+        with open(obj.clients[0].logs_file) as monitoring_logs:
+            self.assertEqual(1, len(list(csv.reader(monitoring_logs))))  # nothing is flushed but header
+
+        obj.shutdown()
+        with open(obj.clients[0].logs_file) as monitoring_logs:
+            logs_reader = list(csv.reader(monitoring_logs))
+        self.assertEqual(['ts', 'source', 'metric', 'value'], logs_reader[0])
+        self.assertEqual([['127.0.0.1:4444', 'cpu', '1'], ['127.0.0.1:4444', 'disks', '10']],
+                         [row[1:] for row in logs_reader[1:3]])
+        self.assertEqual({('local', 'cpu'), ('local', 'mem')}, {(row[1], row[2]) for row in logs_reader[3:]})
+
+    def test_logs_rotation(self):
+        logs = MonitoringLogs(ROOT_LOGGER, EngineEmul(), {"rotate-size": 0.0001, "flush-interval": 0})
+        channel = logs.open("rotated", "source", ["first", "second"])
+        for i in range(20):
+            channel.write(i, [i, i * 2])
+        logs.close()
+        channel.write(20, [20, 40])  # ignored after close
+
+        rows = []
+        self.assertNotEqual(channel.filename, channel.log_file.filename)
+        for filename in os.listdir(logs.engine.artifacts_dir):
+            if filename.startswith("rotated"):
+                with open(os.path.join(logs.engine.artifacts_dir, filename)) as fds:
+                    content = list(csv.reader(fds))
+                self.assertEqual(['ts', 'first', 'second'], content[0])
+                rows.extend(content[1:])
+        self.assertEqual([[str(i), str(i), str(i * 2)] for i in range(20)], sorted(rows, key=lambda x: int(x[0])))
+
     def test_server_agent_encoding(self):
         obj = Monitoring()
         obj.engine = EngineEmul()
@@ -224,6 +271,55 @@ class TestMonitoring(BZTestCase):
 
         self.assertEquals(b("test\n"), obj.clients[0].socket.sent_data)
 
+    def test_local_background(self):
+        config = {'interval': '10ms', 'metrics': ['cpu', 'mem', 'engine-loop']}
+        obj = LocalClient(ROOT_LOGGER, 'label', config, EngineEmul())
+        obj.connect()
+        obj.start()
+        try:
+            first = obj.monitor.resource_stats()
+            self.assertEqual({'cpu', 'mem', 'engine-loop'}, set(first.keys()))
+            for _ in range(100):
+                if obj.monitor.resource_stats() is not first:
+                    break
+                time.sleep(0.01)
+            self.assertIsNot(first, obj.monitor.resource_stats())
+            self.assertEqual(3, len(obj.get_data()))
+        finally:
+            obj.disconnect()
+        self.assertIsNone(obj.monitor._sampler)
+
+    def test_conn_all_proc(self):
+        tcp = EngineEmul().create_artifact("tcp", "")
+        with open(tcp, "w") as fds:
+            fds.write("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n")
+            fds.write("   0: 0100007F:0CEA 00000000:0000 0A 00000000:00000000 00:00000000 00000000  1000 0 1 1\n")
+            fds.write("   1: 0100007F:A1B2 0100007F:0CEA 01 00000000:00000000 00:00000000 00000000  1000 0 2 1\n")
+            fds.write("   2: 0100007F:0CEA 0100007F:A1B2 01 00000000:00000000 00:00000000 00000000  1000 0 3 1\n")
+            fds.write("   3: 0100007F:A1B3 0100007F:0CEA 06 00000000:00000000 00:00000000 00000000  1000 0 4 1\n")
+
+        monitor = LocalMonitor(ROOT_LOGGER, ['conn-all'], EngineEmul())
+        monitor.PROC_NET_TCP = (tcp, tcp + "-not-found")
+        self.assertEqual({'conn-all': 2}, monitor.resource_stats())
+
+    def test_executors_usage(self):
+        engine = EngineEmul()
+        executor = ModuleMock()
+        executor.process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+        engine.provisioning.executors = [executor, ModuleMock()]
+        try:
+            monitor = LocalMonitor(ROOT_LOGGER, ['executors-cpu', 'executors-rss'], engine)
+            stats = monitor.resource_stats()
+            self.assertGreater(stats['executors-rss'], 0)
+            self.assertIn(executor.process.pid, monitor._processes)
+        finally:
+            executor.process.kill()
+            executor.process.wait()
+
+        stats = monitor.resource_stats()
+        self.assertEqual({'executors-cpu': 0, 'executors-rss': 0}, stats)
+        self.assertEqual({}, monitor._processes)
+
     def test_psutil_potential_bugs(self):
         conf = {'metrics': ['cpu', 'mem', 'disks', 'conn-all']}
         client = LocalClient(ROOT_LOGGER, 'label', conf, EngineEmul())
@@ -272,6 +272,54 @@ class TestPassFailStatus(BZTestCase):
         self.assertFalse(self.obj.criteria[0].is_triggered)
         self.assertTrue(self.obj.criteria[1].is_triggered)
 
+    def test_percentile_within(self):
+        self.configure({"criteria": ["p95>500ms within 3s"]})
+        self.obj.prepare()
+        criterion = self.obj.criteria[0]
+
+        for n in range(0, 10):
+            point = DataPoint(n)
+            kpiset = point[DataPoint.CURRENT].setdefault('', KPISet(perc_levels=[95.0]))
+            slow = 50 if n == 5 else 0
+            for i in range(100):
+                kpiset.add_sample((1, 1.0 if i < slow else 0.01, 0, 0, '200', None, '', 0))
+            kpiset.recalculate()
+            self.obj.aggregated_second(point)
+
+            if n == 5:  # average of seconds' percentiles is (1 + 0.01 + 0.01) / 3 but merged p95 is 1s
+                self.assertTrue(criterion.is_triggered)
+                self.assertAlmostEqual(1.0, criterion.agg_logic(n, kpiset), delta=0.01)
+            elif n < 5:
+                self.assertFalse(criterion.is_triggered)
+
+        self.assertEqual(3, len(criterion.agg_buffer))
+        self.assertEqual(300, len(criterion._window_hist))
+        self.assertRaises(AutomatedShutdown, self.obj.check)
+
+    def test_window_speed(self):
+        criteria = ["avg-rt of label%s>100ms within 5m" % i for i in range(20)]
+        criteria += ["fail of label%s>50%% over 5m" % i for i in range(20)]
+        self.configure({"criteria": criteria})
+        self.obj.prepare()
+
+        points = []
+        for n in range(0, 900):
+            point = random_datapoint(n)
+            for i in range(20):
+                point[DataPoint.CURRENT]['label%s' % i] = point[DataPoint.CURRENT]['']
+            points.append(point)
+
+        start = time.time()
+        for point in points:
+            self.obj.aggregated_second(point)
+        ROOT_LOGGER.info("Criteria processing of %s seconds took %.3fs", len(points), time.time() - start)
+
+        criterion = self.obj.criteria[0]
+        window = points[-300:]
+        expected = sum(point[DataPoint.CURRENT][''][KPISet.AVG_RESP_TIME] for point in window) / len(window)
+        self.assertEqual(300, len(criterion.agg_buffer))
+        self.assertAlmostEqual(expected, criterion._window_sum / len(criterion.agg_buffer))
+
     def test_rc_over1(self):
         self.configure({"criteria": [
             "rc200<8 over 5s",
@@ -6,6 +6,8 @@ import sys
 import zipfile
 from os.path import join
 
+import pytest
+
 import bzt.modules.services
 from bzt import NormalShutdown, ToolError, TaurusConfigError
 from bzt.engine import Service, Provisioning, EngineModule
@@ -13,6 +15,7 @@ from bzt.modules._locustio import LocustIOExecutor
 from bzt.modules.blazemeter import CloudProvisioning
 from bzt.modules.javascript import NPM
 from bzt.modules.services import Unpacker, InstallChecker, AndroidEmulatorLoader, AppiumLoader, PipInstaller, PythonTool
+from bzt.modules.services import PackageInventory
 from bzt.utils import get_files_recursive, EXE_SUFFIX, JavaVM, Node, is_windows
 from tests.unit import BZTestCase, RESOURCES_DIR, EngineEmul
 from tests.unit.mocks import ModuleMock, BZMock
@@ -58,6 +61,64 @@ class TestPipInstaller(BZTestCase):
         self.assertEqual(self.obj.get_version('installed'), "0")
 
 
+class TestPackageInventory(BZTestCase):
+    def setUp(self):
+        super(TestPackageInventory, self).setUp()
+        self.engine = EngineEmul()
+
+    def test_in_process(self):
+        inventory = PackageInventory.get(self.engine, [sys.executable, "-m", "pip"])
+        self.assertTrue(inventory.in_process)
+        installer = PipInstaller()
+        installer.engine = self.engine
+        self.assertIs(inventory, installer.get_inventory())
+
+        inventory.check_pip()
+        installed = inventory.get_installed()
+        self.assertEqual(pytest.__version__, inventory.get_version("PyTest"))
+        self.assertIs(installed, inventory.get_installed())
+
+        inventory.invalidate()
+        self.assertIsNot(installed, inventory.get_installed())
+        self.assertEqual(installed, inventory.get_installed())
+
+    def test_pip_list(self):
+        inventory = PackageInventory.get(self.engine, [join(RESOURCES_DIR, "python-pip", 'python-pip' + EXE_SUFFIX)])
+        self.assertFalse(inventory.in_process)
+        self.assertEqual("0", inventory.get_version("New_Version"))
+        self.assertIsNone(inventory.get_version("not-installed"))
+
+    def test_batch_install(self):
+        calls = []
+
+        def exec_and_communicate(cmdline, **kwargs):
+            calls.append(cmdline)
+            return "", ""
+
+        installers = []
+        for packages in (['one', 'two==2'], ['two==2', 'three'], ['two==3']):
+            installer = PipInstaller()
+            installer.engine = self.engine
+            installer.parameters['packages'] = packages
+            installer.prepare_pip()
+            installers.append(installer)
+
+        inventory = installers[0].get_inventory()
+        installed = inventory.get_installed()
+        orig_exec = bzt.modules.services.exec_and_communicate
+        bzt.modules.services.exec_and_communicate = exec_and_communicate
+        try:
+            PipInstaller.install_batch(installers)
+        finally:
+            bzt.modules.services.exec_and_communicate = orig_exec
+
+        self.assertEqual(2, len(calls))
+        self.assertIn("install", calls[0])
+        self.assertEqual(['one', 'two==2', 'three', '--upgrade'], calls[0][-4:])
+        self.assertEqual(['two==3', '--upgrade'], calls[1][-2:])
+        self.assertIsNot(installed, inventory.get_installed())
+
+
 class TestPythonTool(BZTestCase):
     class PythonToolExample(PythonTool):
         PACKAGES = ['test-package']
@@ -3,9 +3,11 @@ import logging
 import os
 import re
 import shutil
+import subprocess
+import sys
 
 from bzt import TaurusException
-from tests.unit import BZTestCase, RESOURCES_DIR, BUILD_DIR
+from tests.unit import BZTestCase, RESOURCES_DIR, BUILD_DIR, BZT_DIR, ROOT_LOGGER
 
 from bzt.cli import CLI, ConfigOverrider, get_option_parser
 from bzt.engine import Configuration
@@ -345,3 +347,35 @@ class TestConfigOverrider(BZTestCase):
             "dicts_list": [{"k1": "v2"}, {"k2": "v2"}, {"k3": "v3"}],
             "k1": "v2",
             "bool_value": True})
+
+
+class TestImportTime(BZTestCase):
+    HEAVY_MODULES = ("distutils", "numpy", "psutil", "requests", "urwid", "lxml", "cssselect")
+
+    @staticmethod
+    def _get_imports(module):
+        """
+        Import module in fresh interpreter with -X importtime
+        :return: imported module name -> cumulative import time, us
+        """
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([BZT_DIR, env.get("PYTHONPATH", "")])
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        imports = {}
+        for line in proc.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line[len("import time:"):].split("|")
+                if cumulative.strip().isdigit():
+                    imports[name.strip()] = int(cumulative)
+        return imports
+
+    def test_cli(self):
+        imports = self._get_imports("bzt.cli")
+        ROOT_LOGGER.debug("bzt.cli imported in %.3fs", imports["bzt.cli"] / 1000000.0)
+        self.assertEqual([], [name for name in self.HEAVY_MODULES if name in imports])
+
+    def test_modules(self):
+        imports = self._get_imports("bzt.modules")
+        ROOT_LOGGER.debug("bzt.modules imported in %.3fs", imports["bzt.modules"] / 1000000.0)
+        self.assertFalse("urwid" in imports, "urwid is imported with bzt.modules")
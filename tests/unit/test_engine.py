@@ -1,16 +1,23 @@
 """ unit test """
 import os
+import shutil
 import sys
+import json
+import threading
+import time
 
 import yaml
 
 import bzt
 import bzt.modules._apiritif
-from bzt import TaurusConfigError
-from bzt.engine import Configuration, EXEC
+from bzt import TaurusConfigError, ToolError
+from bzt.engine import Configuration, Engine, EXEC
+from bzt.modules.aggregator import ConsolidatingAggregator, KPIFramesReader
 from bzt.modules._selenium import SeleniumExecutor
-from bzt.utils import BetterDict, is_windows, get_full_path, get_uniq_name, communicate
-from tests.unit import local_paths_config, RESOURCES_DIR, BZTestCase, ExecutorTestCase, TEST_DIR, EngineEmul
+from bzt.utils import BetterDict, is_windows, get_full_path, get_uniq_name, communicate, FileReader, temp_file
+from tests.unit import local_paths_config, RESOURCES_DIR, BZTestCase, ExecutorTestCase, TEST_DIR, EngineEmul, \
+    ROOT_LOGGER
+from tests.unit.mocks import SlowPrepareMock
 from tests.unit.modules._selenium import MockPythonTool
 
 
@@ -291,6 +298,133 @@ class TestEngine(BZTestCase):
         finally:
             sys.path.remove(RESOURCES_DIR + "plugins")
 
+    def test_base_configs_cache(self):
+        self.sniff_log(self.obj.log)
+        plugins_dir = self.obj.create_artifact("plugins", "")
+        shutil.copytree(RESOURCES_DIR + "plugins", plugins_dir)
+        plugin_config = os.path.join(plugins_dir, "bzt_plugin_dummy", "50-dummy.yml")
+        sys.path.append(plugins_dir)
+        try:
+            engine = Engine(self.obj.log)
+            engine._load_base_configs()
+            expected = engine.config
+
+            cache_file = self.obj.create_artifact("base-configs-cache", ".json")
+            for _ in range(2):
+                engine = Engine(self.obj.log)
+                engine.base_configs_cache = cache_file
+                engine._load_base_configs()
+                self.assertEqual(expected, engine.config)
+
+            self.assertIn("Using cached list of package configs", self.log_recorder.debug_buff.getvalue())
+            self.assertIn(plugin_config, json.load(open(cache_file))["parsed"])
+
+            with open(plugin_config, "a") as fds:
+                fds.write("    changed: true\n")
+
+            with open(os.path.join(plugins_dir, "bzt_plugin_invalid", "bzt-configs.json"), "w") as fds:
+                fds.write("[]")
+
+            engine = Engine(self.obj.log)
+            engine.base_configs_cache = cache_file
+            engine._load_base_configs()
+            self.assertTrue(engine.config["modules"]["dummy"]["changed"])
+            indexes = [index[0] for index in json.load(open(cache_file))["discovery"]["indexes"]]
+            self.assertIn(os.path.join(plugins_dir, "bzt_plugin_invalid", "bzt-configs.json"), indexes)
+        finally:
+            sys.path.remove(plugins_dir)
+
+    def test_wakeup_on_data(self):
+        self.obj.wakeup_on_data = True
+        self.obj.wakeup_interval = 0.01
+        filename = temp_file()
+        self.obj.aggregator = ConsolidatingAggregator()
+        self.obj.aggregator.add_underling(KPIFramesReader(filename, ROOT_LOGGER))
+        FileReader(temp_file())  # not registered in aggregator, isn't watched
+        self.assertEqual([filename], self.obj.aggregator.get_data_files())
+
+        def append(delay):
+            time.sleep(delay)
+            with open(filename, 'a') as fds:
+                fds.write("new data\n")
+
+        self.obj._sleep_until_data(5)  # remember states of files
+        thread = threading.Thread(target=append, args=(0.2,))
+        thread.start()
+        start = time.time()
+        self.obj._sleep_until_data(5)
+        self.assertLess(time.time() - start, 2)
+        thread.join()
+
+        thread = threading.Thread(target=append, args=(0.05,))
+        thread.start()
+        start = time.time()
+        self.obj._sleep_until_data(5, min_sleep=0.5)  # data doesn't wake up engine before min_sleep
+        self.assertGreaterEqual(time.time() - start, 0.5)
+        self.assertLess(time.time() - start, 2)
+        thread.join()
+
+        start = time.time()
+        self.obj._sleep_until_data(0.1)  # nothing new, sleep until timeout
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+        self.obj.interrupted = True
+        start = time.time()
+        self.obj._sleep_until_data(5)
+        self.assertLess(time.time() - start, 1)
+
+    def _get_slow_modules(self, *params):
+        modules = []
+        for module_params in params:
+            module = SlowPrepareMock()
+            module.engine = self.obj
+            module.parameters.merge(module_params)
+            modules.append(module)
+        return modules
+
+    def test_parallel_prepare(self):
+        self.obj.prepare_workers = 4
+        modules = self._get_slow_modules({}, {}, {}, {"independent": False}, {}, {})
+        prepared = []
+        start = time.time()
+        self.obj.prepare_modules(modules, prepared)
+        self.assertLess(time.time() - start, 1.0)  # 1.2s if sequential
+        self.assertEqual(modules, prepared)
+
+        first_batch, dependent, second_batch = modules[:3], modules[3], modules[4:]
+        self.assertEqual(3, len(set(module.prepare_thread for module in first_batch)))
+        self.assertTrue(all(module.prepare_thread.startswith("prepare") for module in first_batch + second_batch))
+        self.assertEqual(threading.current_thread().name, dependent.prepare_thread)
+        self.assertGreaterEqual(dependent.prepare_time[0], max(module.prepare_time[1] for module in first_batch))
+        self.assertGreaterEqual(min(module.prepare_time[0] for module in second_batch), dependent.prepare_time[1])
+        self.assertEqual(6, len(self.obj.prepare_times))
+
+    def test_parallel_prepare_failure(self):
+        self.obj.prepare_workers = 4
+        modules = self._get_slow_modules({"delay": 0}, {"delay": 0.1, "fail": True}, {"delay": 0.3}, {})
+        prepared = []
+        self.assertRaises(ToolError, self.obj.prepare_modules, modules, prepared)
+        self.assertEqual(modules, prepared)
+        self.assertIsNotNone(modules[2].prepare_time)  # the rest of batch isn't interrupted
+
+    def test_sequential_prepare(self):
+        modules = self._get_slow_modules({"delay": 0}, {"delay": 0})
+        self.obj.prepare_modules(modules)
+        self.assertEqual({threading.current_thread().name}, set(module.prepare_thread for module in modules))
+
+    def test_prepare_times(self):
+        configs = [
+            RESOURCES_DIR + "yaml/singletone-service.yml",
+        ]
+        self.obj.configure(configs, read_config_files=False)
+        self.obj.prepare()
+        with open(os.path.join(self.obj.artifacts_dir, "prepare-times.json")) as fds:
+            prepare_times = json.load(fds)
+
+        self.assertEqual(6, len(prepare_times))  # aggregator, two services, provisioning and two reporters
+        self.assertEqual("Aggregator", prepare_times[0]["module"])
+        self.assertTrue(all(item["duration"] >= 0 for item in prepare_times))
+
 
 class TestScenarioExecutor(ExecutorTestCase):
     def test_timers(self):
@@ -2,15 +2,18 @@
 """ unit test """
 import os
 import sys
+import time
 import logging
 
 from psutil import Popen
+from requests.adapters import BaseAdapter
 from os.path import join
 
 from bzt import TaurusNetworkError
 from bzt.utils import log_std_streams, get_uniq_name, JavaVM, ToolError, is_windows, HTTPClient, BetterDict
-from bzt.utils import ensure_is_dict, Environment, temp_file, communicate
-from tests.unit import BZTestCase, RESOURCES_DIR
+from bzt.utils import ensure_is_dict, Environment, temp_file, communicate, BackgroundWorker, ToolProbeCache
+from bzt.utils import TimestampParser
+from tests.unit import BZTestCase, RESOURCES_DIR, ROOT_LOGGER
 from tests.unit.mocks import MockFileReader
 
 
@@ -219,6 +222,85 @@ class TestJavaVM(BZTestCase):
         self.assertEqual("8", self.obj._get_version(out2))
 
 
+class TestToolProbeCache(BZTestCase):
+    def setUp(self):
+        super(TestToolProbeCache, self).setUp()
+        self.tool_path = temp_file()
+        os.chmod(self.tool_path, 0o755)
+        self.probes_file = temp_file(suffix=".json")
+        os.remove(self.probes_file)
+
+    def tearDown(self):
+        for fname in (self.tool_path, self.probes_file):
+            if os.path.exists(fname):
+                os.remove(fname)
+        super(TestToolProbeCache, self).tearDown()
+
+    def test_probes(self):
+        obj = ToolProbeCache(self.probes_file, ROOT_LOGGER)
+        self.assertIsNone(obj.get("Tool", self.tool_path, "1.0"))
+        obj.put("Tool", self.tool_path, "1.0", version="1.0.1")
+        self.assertEqual({"version": "1.0.1"}, obj.get("Tool", self.tool_path, "1.0"))
+        self.assertIsNone(obj.get("Tool", self.tool_path, "2.0"))
+
+        obj = ToolProbeCache(self.probes_file, ROOT_LOGGER)  # next run
+        self.assertEqual({"version": "1.0.1"}, obj.get("Tool", self.tool_path, "1.0"))
+
+        with open(self.tool_path, 'a') as fds:
+            fds.write("updated")
+        self.assertIsNone(obj.get("Tool", self.tool_path, "1.0"))
+
+        obj.put("Tool", self.tool_path, "1.0")
+        obj.put("OtherTool", self.tool_path, None)
+        obj.invalidate("Tool")
+        self.assertIsNone(obj.get("Tool", self.tool_path, "1.0"))
+        self.assertEqual({}, obj.get("OtherTool", self.tool_path, None))
+        obj.invalidate()
+        self.assertIsNone(ToolProbeCache(self.probes_file).get("OtherTool", self.tool_path, None))
+
+    def test_missing_tool(self):
+        obj = ToolProbeCache(self.probes_file, ROOT_LOGGER)
+        obj.put("Tool", "tool-not-found", None)
+        self.assertIsNone(obj.get("Tool", "tool-not-found", None))
+        self.assertFalse(os.path.exists(self.probes_file))
+
+    def test_tool_check(self):
+        calls = []
+
+        def call(*args, **kwargs):
+            calls.append(args)
+            return "", 'openjdk version "11.0.2" 2019-01-15'
+
+        for _ in range(2):
+            tool = JavaVM()
+            tool.tool_path = self.tool_path
+            tool.call = call
+            tool.probe_cache = ToolProbeCache(self.probes_file, ROOT_LOGGER)
+            self.assertTrue(tool.check_if_installed())
+            self.assertEqual("11", tool.version)
+
+        self.assertEqual(1, len(calls))
+
+
+class TestTimestampParser(BZTestCase):
+    def test_parse(self):
+        calls = []
+
+        def converter(value):
+            calls.append(value)
+            return int(value)
+
+        obj = TimestampParser(converter, cache_size=2)
+        self.assertEqual([1, 1, 2, 1, 3, 1, 2], [obj.parse(val) for val in ("1", "1", "2", "1", "3", "1", "2")])
+        self.assertEqual(["1", "2", "3", "2"], calls)  # "2" was dropped from cache by "3"
+
+    def test_from_format(self):
+        obj = TimestampParser.from_format("%Y-%m-%d %H:%M:%S")
+        expected = int(time.mktime((2015, 12, 20, 21, 30, 13, 0, 0, -1)))
+        self.assertEqual(expected, obj.parse("2015-12-20 21:30:13"))
+        self.assertEqual(expected + 1, obj.parse("2015-12-20 21:30:14"))
+
+
 class TestLogStreams(BZTestCase):
     def test_streams(self):
         self.sniff_log()
@@ -312,8 +394,140 @@ class TestFileReader(BZTestCase):
         self.configure(join(RESOURCES_DIR, 'jmeter', 'jtl', 'unicode.jtl'))
         self.obj.get_bytes(size=180)  # shouldn't crash with UnicodeDecodeError
 
+    def test_complete_lines(self):
+        gen_file_name = temp_file()
+        try:
+            self.configure(gen_file_name)
+            with open(gen_file_name, 'wb') as fds:
+                fds.write("first\nТест.Эхо\nthi".encode('utf-8'))
+
+            self.assertEqual(["first\n"], list(self.obj.get_complete_lines(size=8)))
+            self.assertEqual(["Тест.Эхо\n"], list(self.obj.get_complete_lines(size=4)))  # line longer than size
+            self.assertEqual([], list(self.obj.get_complete_lines(size=1024)))
+
+            with open(gen_file_name, 'ab') as fds:
+                fds.write(b"rd\nfourth\nfif")
+
+            self.assertEqual([b"third\n", b"fourth\n"], list(self.obj.get_complete_lines(size=1024, decode=False)))
+            self.assertEqual("", self.obj.get_complete_bytes(last_pass=True))
+            self.assertEqual("fif", self.obj.get_bytes(last_pass=True))
+        finally:
+            self.obj.close()
+            os.remove(gen_file_name)
+
+    def test_complete_lines_quoted(self):
+        gen_file_name = temp_file()
+        try:
+            self.configure(gen_file_name)
+            with open(gen_file_name, 'wb') as fds:
+                fds.write(b'1,"one\n""two""\n')
+
+            self.assertEqual([], list(self.obj.get_complete_lines(size=1024, quotechar=b'"')))
+
+            with open(gen_file_name, 'ab') as fds:
+                fds.write(b'three",x\n2,"a')
+
+            self.assertEqual('1,"one\n""two""\nthree",x\n', self.obj.get_complete_bytes(size=8, quotechar=b'"'))
+            self.assertEqual("", self.obj.get_complete_bytes(last_pass=True, quotechar=b'"'))
+        finally:
+            self.obj.close()
+            os.remove(gen_file_name)
+
+    def test_complete_lines_speed(self):
+        gen_file_name = temp_file()
+        with open(gen_file_name, 'w') as fds:
+            for idx in range(500000):
+                fds.write("%s,%s,label%s,200,OK,Thread Group 1-1,true,100,10,10,1,1\n" % (idx, idx % 1000, idx % 20))
+
+        try:
+            self.configure(gen_file_name)
+            start = time.time()
+            partial = ""
+            lines_count = 0
+            for _ in range(100):
+                for line in self.obj.get_lines(size=1024 * 1024):
+                    if not line.endswith("\n"):
+                        partial += line
+                        continue
+                    line = partial + line
+                    partial = ""
+                    lines_count += 1
+            lines_time = time.time() - start
+            self.assertEqual(500000, lines_count)
+
+            self.obj.offset = 0
+            start = time.time()
+            lines_count = 0
+            for _ in range(100):
+                for _ in self.obj.get_complete_lines(size=1024 * 1024):
+                    lines_count += 1
+            complete_lines_time = time.time() - start
+            self.assertEqual(500000, lines_count)
+
+            ROOT_LOGGER.info("Lines reading time (get_lines/get_complete_lines): %.3f / %.3f",
+                             lines_time, complete_lines_time)
+        finally:
+            self.obj.close()
+            os.remove(gen_file_name)
+
+
+class TestBackgroundWorker(BZTestCase):
+    def test_queue(self):
+        results = []
+
+        def task(value):
+            time.sleep(0.05)
+            results.append(value)
+
+        worker = BackgroundWorker("test", ROOT_LOGGER, queue_size=2)
+        start = time.time()
+        for value in range(5):
+            worker.submit(task, value)
+        self.assertLess(time.time() - start, 0.05)  # nothing is run in caller thread
+        self.assertEqual(2, worker.queue_depth)
+        self.assertEqual(3, worker.dropped)
+
+        worker.start()
+        self.assertTrue(worker.stop(timeout=5))
+        self.assertEqual([3, 4], results)
+        self.assertEqual(0, worker.queue_depth)
+        self.assertEqual(2, worker.done)
+
+    def test_error(self):
+        def task():
+            raise TaurusNetworkError("failed")
+
+        worker = BackgroundWorker("test", ROOT_LOGGER)
+        worker.start()
+        worker.submit(task)
+        worker.submit(lambda: None)
+        self.assertTrue(worker.stop(timeout=5))
+        self.assertRaises(TaurusNetworkError, worker.check)
+        worker.check()  # error is raised only once
+
+    def test_clear(self):
+        results = []
+        worker = BackgroundWorker("test", ROOT_LOGGER)
+        for value in range(3):
+            worker.submit(results.append, value)
+        self.assertEqual(3, worker.clear())
+        self.assertEqual(3, worker.dropped)
+
+        worker.start()
+        worker.submit(results.append, 3)
+        self.assertTrue(worker.stop(timeout=5))
+        self.assertEqual([3], results)
+
 
 class TestHTTPClient(BZTestCase):
+    def test_local_file(self):
+        obj = HTTPClient()
+        self.assertIsInstance(obj.session.get_adapter("file:///"), BaseAdapter)
+        filename, _ = obj.download_file("file://" + os.path.abspath(__file__), temp_file())
+        with open(filename) as fds:
+            self.assertIn("test_local_file", fds.read())
+        os.remove(filename)
+
     def test_proxy_setup(self):
         obj = HTTPClient()
         obj.add_proxy_settings({"address": "http://localhost:3128",